@@ -0,0 +1,42 @@
+#! /usr/bin/env python3
+
+"""Times delta-stepping against Dijkstra's algorithm on a random graph.
+
+Usage: sssp_benchmark.py [order] [size]
+"""
+
+import random
+import sys
+import time
+
+from graph.base import Graph
+from graph.extras.sssp import delta_stepping
+
+def build_graph(order, size):
+	"""A random sparse graph with small integer weights."""
+	g = Graph()
+	for i in range(order):
+		g.add_node(i)
+	for i in range(size):
+		g.add_edge(random.randrange(order), random.randrange(order), name=("e", i), weight=random.randint(1, 100))
+	return g
+
+if __name__ == "__main__":
+	order = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	size = int(sys.argv[2]) if len(sys.argv) > 2 else 5 * order
+	random.seed(0)
+	g = build_graph(order, size)
+	get_weight = lambda e: e.weight
+	snapshot = g.snapshot(get_weight=get_weight)
+	began = time.perf_counter()
+	paths = g.get_shortest_paths(0, get_weight=get_weight, pretty=False)
+	baseline = time.perf_counter() - began
+	print("dijkstra: %.2fs" % baseline)
+	expected = {node.name: length for node, (length, path) in paths.items()}
+	for processes in (1, 2, 4, 8):
+		began = time.perf_counter()
+		result = delta_stepping(snapshot, 0, processes=processes)
+		elapsed = time.perf_counter() - began
+		found = {snapshot.nodes[i].name: d for i, d in enumerate(result.distances.tolist()) if d != float("inf")}
+		assert found == expected
+		print("delta-stepping, %d workers: %.2fs (%.2fx)" % (processes, elapsed, baseline / elapsed))
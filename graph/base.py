@@ -350,11 +350,19 @@ mechanisms provided, so check your assumptions carefully before
 using an unlimited walk on a graph whose properties you are
 unsure of.
 
-The walks are implemented as wrapped generators, with each step 
-yielding a set of nodes (for walk_nodes) or edges (for walk_edges) 
-that are potentially "next" in terms of adjacency. The application
-should select one of those and use send() to send it back. As an
-example, we can implement an endless B-C-A-B loop as follows:
+Walks are driven by walk(), which takes a selector: a callable that
+is handed a view of the nodes (or edges) that are potentially "next"
+in terms of adjacency and returns the one to step to, or None to
+stop. The Walker it returns can be iterated one step at a time, or
+asked for a batch of steps with take(). As an example, we can take
+the first six steps of an endless B-C-A-B loop as follows:
+
+	>>> w = G.walk("A", lambda adjacent: adjacent[0])
+	>>> w.take(6)
+
+The older walk_nodes, walk_edges and walk_path generators remain, 
+each step yielding a list of candidates that the application
+selects from and uses send() to send back:
 
 	>>> w = G.walk_nodes("A")
 	>>> for adjacent in w:
@@ -397,6 +405,39 @@ connected components.
 a (length, [path]) pair, where path is a sequence of edges
 connecting the given endpoints.
 
+.k_shortest_paths(source, target, k) yields the k shortest
+loopless paths between two nodes, in the same form.
+
+.eulerian_circuit() and .eulerian_path() yield the edges of a route
+using every edge exactly once, even in mixed graphs.
+
+For DAGs, .transitive_closure() and .transitive_reduction() return
+a new graph with the same reachability but every implied edge added
+or every redundant edge removed. Pass view=True to get a lazy
+EdgeSetView of (start, end) pairs instead.
+
+If you need to ask whether one node can reach another many times
+over, a ReachabilityIndex precomputes the answers and keeps them
+up to date as the graph changes:
+
+	>>> index = ReachabilityIndex(G)
+	>>> index.can_reach("A", "C")
+	True
+
+Structures like this one follow the graph by registering a
+GraphObserver with .add_observer(). For algorithms which want
+plain integers rather than elements, .snapshot() returns a
+frozen Snapshot of the graph's adjacency in array form.
+
+Programs that ask the same questions of a graph over and over can
+call .enable_cache(), after which results such as shortest paths
+and components are remembered until the structure next changes,
+and handed out read-only so they can safely be shared:
+
+	>>> cache = G.enable_cache(maxsize=64)
+	>>> G.get_connected_components() is G.get_connected_components()
+	True
+
 Binary Graph Operations
 -----------------------
 
@@ -439,9 +480,14 @@ individual docstrings.
 # along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
 
 
-from collections import deque, namedtuple, defaultdict
+from collections import deque, namedtuple, defaultdict, OrderedDict
+from collections.abc import Set
+from functools import wraps
+from types import MappingProxyType
 import heapq
+import inspect
 import copy
+from array import array
 from itertools import chain, count
 
 class GraphElement:
@@ -704,6 +750,308 @@ class Edge(GraphElement):
 		return self._directed
 
 
+class AdjacencyView:
+	"""A read-only view of the edges, or neighbours, leaving a node.
+
+	The view reads the node's own edge lists rather than copying
+	them, and a Walker points the same view at each node it reaches,
+	so hold on to its contents rather than the view itself if you
+	need them after the walk moves on.
+
+	If ends is True the view holds the node at the other end of each
+	edge instead of the edge, so a neighbour joined by several edges
+	appears once per edge. If reverse is True, incoming edges are
+	listed instead of outgoing ones. Bidirectional edges are always
+	included.
+	"""
+
+	__slots__ = ("node", "_first", "_second", "_ends", "_reverse")
+
+	def __init__(self, node, ends=False, reverse=False):
+		self._ends = ends
+		self._reverse = reverse
+		self.point(node)
+
+	def point(self, node):
+		"""Retargets the view at node."""
+		self.node = node
+		self._first = node._incoming if self._reverse else node._outgoing
+		self._second = node._bidirectional
+
+	def _end(self, edge):
+		"""Returns what the view holds for edge."""
+		if not self._ends:
+			return edge
+		if edge._directed:
+			return edge._start if self._reverse else edge._end
+		return edge._end if edge._start is self.node else edge._start
+
+	def __len__(self):
+		return len(self._first) + len(self._second)
+
+	def __bool__(self):
+		return bool(self._first) or bool(self._second)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+		if index < 0:
+			index += len(self)
+		if 0 <= index < len(self._first):
+			return self._end(self._first[index])
+		index -= len(self._first)
+		if 0 <= index < len(self._second):
+			return self._end(self._second[index])
+		raise IndexError("adjacency index out of range")
+
+	def __iter__(self):
+		if not self._ends:
+			return chain(self._first, self._second)
+		return map(self._end, chain(self._first, self._second))
+
+	def __contains__(self, item):
+		return any(item is x for x in self)
+
+
+class Walker:
+	"""Walks a graph one step per call, under the control of a selector.
+
+	At each step the selector is called with an AdjacencyView of the
+	candidates for the next step and returns the one it wants, which
+	the walker moves to and returns. The walk ends when there are no
+	candidates or the selector returns None.
+
+	Walkers are made with Graph.walk, which describes the kinds of
+	walk available. They are iterators, and take(count) returns a
+	batch of steps at once.
+	"""
+
+	def __init__(self, start, selector=None, edges=False, reverse=False):
+		"""Positions the walker at start, which must be a real element."""
+		self.selector = selector
+		if isinstance(start, Edge):
+			edges = True
+			start = start._start if reverse else start._end
+		self.position = start
+		self._edges = edges
+		self.candidates = AdjacencyView(start, ends=not edges, reverse=reverse)
+
+	def move(self, selection):
+		"""Steps to the selected candidate without consulting the selector."""
+		if self._edges:
+			# walking backwards, a directed edge is left by its start
+			if selection._end is self.position:
+				selection = selection._start
+			else:
+				selection = selection._end
+		self.position = selection
+		self.candidates.point(selection)
+
+	def __iter__(self):
+		return self
+
+	def __next__(self):
+		candidates = self.candidates
+		if not candidates:
+			raise StopIteration
+		selection = self.selector(candidates)
+		if selection is None:
+			raise StopIteration
+		self.move(selection)
+		return selection
+
+	def take(self, count):
+		"""Returns a list of up to count steps, fewer if the walk ends."""
+		steps = []
+		candidates = self.candidates
+		selector = self.selector
+		for i in range(count):
+			if not candidates: break
+			selection = selector(candidates)
+			if selection is None: break
+			self.move(selection)
+			steps.append(selection)
+		return steps
+
+
+class GraphObserver:
+	"""Base class for structures that follow a Graph's mutations.
+
+	Observers are registered with Graph.add_observer, after which the
+	graph calls the hooks below as its structure changes. Each hook is
+	called before the change is committed, so an observer that raises
+	will stop the change from happening. Observers that had already
+	been told about it are then told it was undone, through the
+	opposite hook (edge_removed for edge_added and so on).
+
+	The default hooks do nothing, so subclasses only need to override
+	the ones they care about.
+	"""
+
+	def node_added(self, node):
+		"""Called when node is about to be added to the graph."""
+		pass
+
+	def node_removed(self, node):
+		"""Called when node is about to be removed from the graph.
+
+		All of its edges will already have been removed.
+		"""
+		pass
+
+	def edge_added(self, edge):
+		"""Called when edge is about to be added to the graph.
+
+		Both of its endpoints are already in the graph.
+		"""
+		pass
+
+	def edge_removed(self, edge):
+		"""Called when edge is about to be removed from the graph."""
+		pass
+
+	def graph_transposed(self):
+		"""Called when every edge in the graph is about to be reversed."""
+		pass
+
+
+# stands in for a missing element, since elements may be falsy
+_MISSING = object()
+
+CacheInfo = namedtuple("CacheInfo", "hits misses maxsize currsize")
+
+class ResultCache:
+	"""A size-bounded LRU cache of the results a Graph has derived.
+
+	Entries are keyed by the algorithm's name and arguments, and the
+	whole cache belongs to one version of its graph's structure: the
+	first lookup or store after the version changes empties it.
+
+	Use Graph.enable_cache() rather than building one of these.
+	"""
+
+	def __init__(self, maxsize=128):
+		"""Makes an empty cache holding at most maxsize results."""
+		if maxsize < 1:
+			raise ValueError("maxsize must be at least 1")
+		self.maxsize = maxsize
+		self.version = None
+		self.hits = 0
+		self.misses = 0
+		self._results = OrderedDict()
+
+	def lookup(self, key, version):
+		"""Returns the result stored under key, or raises KeyError."""
+		if version != self.version:
+			self.clear()
+			self.version = version
+		try:
+			result = self._results[key]
+		except KeyError:
+			self.misses += 1
+			raise
+		self._results.move_to_end(key)
+		self.hits += 1
+		return result
+
+	def store(self, key, version, result):
+		"""Stores result under key, evicting the least recently used."""
+		if version != self.version:
+			self.clear()
+			self.version = version
+		self._results[key] = result
+		if len(self._results) > self.maxsize:
+			self._results.popitem(last=False)
+
+	def clear(self):
+		"""Throws away every stored result."""
+		self._results.clear()
+
+	def info(self):
+		"""Returns a CacheInfo of the hit and miss counts and the size."""
+		return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
+
+
+class _FrozenGuard(GraphObserver):
+	"""Refuses every change to a graph handed out by a ResultCache."""
+
+	def _refuse(self, *args):
+		raise TypeError("cached results are read-only")
+
+	node_added = node_removed = edge_added = edge_removed = graph_transposed = _refuse
+
+
+def _freeze(result):
+	"""Returns an immutable copy of a derived result.
+
+	Mappings become read-only proxies (keeping a defaultdict's
+	default), lists and tuples become tuples and sets become
+	frozensets, all the way down. Graphs are guarded against changes
+	rather than copied. Anything else is returned as it is.
+	"""
+	if isinstance(result, dict):
+		frozen = {key: _freeze(value) for key, value in result.items()}
+		if isinstance(result, defaultdict) and result.default_factory is not None:
+			factory = result.default_factory
+			frozen = defaultdict(lambda: _freeze(factory()), frozen)
+		return MappingProxyType(frozen)
+	if isinstance(result, (list, tuple)):
+		return tuple(_freeze(item) for item in result)
+	if isinstance(result, (set, frozenset)):
+		return frozenset(result)
+	if isinstance(result, Graph):
+		if not any(isinstance(o, _FrozenGuard) for o in result._observers):
+			result.add_observer(_FrozenGuard())
+	return result
+
+def _cache_key(method, signature, self, args, kwargs):
+	"""Keys a call by its arguments, however they were passed."""
+	bound = signature.bind(self, *args, **kwargs)
+	bound.apply_defaults()
+	return (method.__name__, bound.args[1:], tuple(sorted(bound.kwargs.items())))
+
+def _cached(method):
+	"""Makes a Graph method use the graph's ResultCache, if it has one."""
+	signature = inspect.signature(method)
+	@wraps(method)
+	def wrapper(self, *args, **kwargs):
+		cache = self._cache
+		if cache is None:
+			return method(self, *args, **kwargs)
+		try:
+			key = _cache_key(method, signature, self, args, kwargs)
+			return cache.lookup(key, self._version)
+		except KeyError:
+			pass
+		except TypeError:
+			# unhashable or unbindable arguments can't be cached
+			return method(self, *args, **kwargs)
+		result = _freeze(method(self, *args, **kwargs))
+		cache.store(key, self._version, result)
+		return result
+	return wrapper
+
+def _cached_iterator(method):
+	"""Like _cached, but for methods that yield their results."""
+	signature = inspect.signature(method)
+	@wraps(method)
+	def wrapper(self, *args, **kwargs):
+		cache = self._cache
+		if cache is None:
+			return method(self, *args, **kwargs)
+		try:
+			key = _cache_key(method, signature, self, args, kwargs)
+			return iter(cache.lookup(key, self._version))
+		except KeyError:
+			pass
+		except TypeError:
+			return method(self, *args, **kwargs)
+		result = _freeze(list(method(self, *args, **kwargs)))
+		cache.store(key, self._version, result)
+		return iter(result)
+	return wrapper
+
+
 class Graph:
 
 	"""A basic graph class, and base for all Graph mixins.
@@ -774,6 +1122,12 @@ class Graph:
 		self._edges = {}
 		# the counter is a thread-safe way to track default names
 		self._counter = count()
+		# structures which need to hear about changes to the graph
+		self._observers = []
+		# bumped by every structural change, and the optional cache
+		# of results derived from the current structure
+		self._version = 0
+		self._cache = None
 		# add the nodes and edges specified by kwargs
 		for node in nodes:
 			try: self.add_node(node, **nodes[node])
@@ -811,11 +1165,12 @@ class Graph:
 
 		Raises KeyError if it is not found.
 		"""
-		name = self.get_name(name)
-		# get the element if it exists
-		element = self._nodes.get(name, False)
-		element = element or self._edges.get(name, False)
-		if not element: raise KeyError("%s not in %s" % (name, self))
+		if isinstance(name, GraphElement): name = name._name
+		# nodes take precedence over edges of the same name
+		element = self._nodes.get(name, _MISSING)
+		if element is _MISSING:
+			element = self._edges.get(name, _MISSING)
+			if element is _MISSING: raise KeyError("%s not in %s" % (name, self))
 		return element
 
 	def __and__(self, other):
@@ -873,18 +1228,48 @@ class Graph:
 		"""Takes an element or a name and returns an element.
 
 		If no element corresponds to the given name, raises
-		KeyError.
+		KeyError. Where a node and an edge share a name, the edge
+		is returned; when only one kind will do, get_node and
+		get_edge are both quicker and unambiguous.
 		"""
-		if isinstance(item, GraphElement):
-			element = self._edges.get(item.name, False)
-			element = element or self._nodes.get(item.name, False)
-			if not element: raise KeyError("%s not in %s" % (item, self))
-			return element
-		else:
-			element = self._edges.get(item, False)
-			element = element or self._nodes.get(item, False)
-			if not element: raise KeyError("%s not in %s" % (item, self))
-			return element
+		if isinstance(item, GraphElement): item = item._name
+		element = self._edges.get(item, _MISSING)
+		if element is _MISSING:
+			element = self._nodes.get(item, _MISSING)
+			if element is _MISSING: raise KeyError("%s not in %s" % (item, self))
+		return element
+
+	def get_node(self, item):
+		"""Takes a node or a node name and returns the node.
+
+		This costs a single lookup, and never returns an edge. If no
+		node corresponds to the given name, raises KeyError.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b')})
+			>>> g.get_node('a')
+			Node(name=a)
+		"""
+		if isinstance(item, GraphElement): item = item._name
+		node = self._nodes.get(item, _MISSING)
+		if node is _MISSING: raise KeyError("%s not in %s" % (item, self))
+		return node
+
+	def get_edge(self, item):
+		"""Takes an edge or an edge name and returns the edge.
+
+		This costs a single lookup, and never returns a node. If no
+		edge corresponds to the given name, raises KeyError.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b')})
+			>>> g.get_edge(('a', 'b'))
+			Edge(name=('a', 'b'))
+		"""
+		if isinstance(item, GraphElement): item = item._name
+		edge = self._edges.get(item, _MISSING)
+		if edge is _MISSING: raise KeyError("%s not in %s" % (item, self))
+		return edge
 
 	def get_name(self, item):
 		"""Takes an element or a name and returns a name.
@@ -892,14 +1277,126 @@ class Graph:
 		If no element corresponds to the given name, raises
 		KeyError
 		"""
-		if isinstance(item, GraphElement):
-			item = item.name
-		else:
-			item = item
-		if item in self._nodes: return item
-		if item in self._edges: return item
+		if isinstance(item, GraphElement): item = item._name
+		if item in self._nodes or item in self._edges: return item
 		raise KeyError("%s not in %s" % (item, self))
 
+	def add_observer(self, observer):
+		"""Registers a GraphObserver to be told about structural changes.
+
+		Usage:
+			>>> g = Graph()
+			>>> o = g.add_observer(GraphObserver())
+		"""
+		self._observers.append(observer)
+		return observer
+
+	def remove_observer(self, observer):
+		"""Stops the given observer from being told about changes.
+
+		Raises ValueError if it was never registered.
+		"""
+		self._observers.remove(observer)
+
+	def _notify(self, hook, undo, *args):
+		"""Tells every observer about a change, or none of them.
+
+		If an observer raises, the ones that already accepted the
+		change are called back through undo before re-raising.
+		"""
+		accepted = []
+		try:
+			for observer in self._observers:
+				getattr(observer, hook)(*args)
+				accepted.append(observer)
+		except:
+			for observer in reversed(accepted):
+				try: getattr(observer, undo)(*args)
+				except: pass
+			raise
+
+	@property
+	def version(self):
+		"""Reports a counter bumped by every change to the graph's structure."""
+		return self._version
+
+	def enable_cache(self, maxsize=128):
+		"""Starts caching the results of this graph's algorithms.
+
+		Once enabled, methods such as get_shortest_paths,
+		get_connected_components and topological_traversal remember
+		up to maxsize results, keyed by their arguments, until the
+		graph's structure next changes. Results are handed out
+		immutable: dicts become read-only mappings, lists tuples and
+		sets frozensets, and graphs refuse changes.
+
+		Only structure is tracked, so results that depend on element
+		attributes, such as weights, go stale if those change. Call
+		disable_cache() or enable_cache() again to start afresh. Pass
+		the same get_weight callable each time to hit the cache.
+
+		Returns the ResultCache.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('c', 'd')})
+			>>> cache = g.enable_cache()
+			>>> components = g.get_connected_components()
+			>>> components is g.get_connected_components()
+			True
+			>>> g.cache_info()
+			CacheInfo(hits=1, misses=1, maxsize=128, currsize=1)
+		"""
+		self._cache = ResultCache(maxsize)
+		return self._cache
+
+	def disable_cache(self):
+		"""Stops caching results and throws away any already cached."""
+		self._cache = None
+
+	def cache_info(self):
+		"""Returns the CacheInfo of the result cache, or None if it is off."""
+		if self._cache is None:
+			return None
+		return self._cache.info()
+
+	def snapshot(self, get_weight=None, undirected=False):
+		"""Returns a frozen, integer-indexed Snapshot of this graph.
+
+		The optional get_weight argument should be a callable that
+		accepts an edge and returns its weight. If undirected is True,
+		directed edges are recorded in both directions as well.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+			>>> s = g.snapshot()
+			>>> [s.nodes[i] for i in s.successors(s.get_id('a'))]
+			[Node(name=b)]
+		"""
+		return Snapshot(self, get_weight=get_weight, undirected=undirected)
+
+	def get_dominators(self, root, reverse=False):
+		"""Returns a mapping of each node reachable from root to its immediate dominator.
+
+		See Snapshot.get_dominators, which this calls on a fresh
+		snapshot of the graph.
+
+		Usage:
+			>>> g = Graph(edges={('entry', 'a'), ('a', 'b'), ('a', 'c'), ('b', 'exit'), ('c', 'exit')})
+			>>> g.get_dominators('entry')[g['exit']]
+			Node(name=a)
+			>>> g.get_dominators('exit', reverse=True)[g['entry']]
+			Node(name=a)
+		"""
+		return self.snapshot().get_dominators(root, reverse)
+
+	def get_dominance_frontiers(self, root, reverse=False):
+		"""Returns a mapping of each node reachable from root to its dominance frontier.
+
+		See Snapshot.get_dominance_frontiers, which this calls on a
+		fresh snapshot of the graph.
+		"""
+		return self.snapshot().get_dominance_frontiers(root, reverse)
+
 	#################################################################
 	#		    Graph Construction Tools			#
 	#################################################################
@@ -921,8 +1418,10 @@ class Graph:
 		# remove any otherwise identical nodes
 		try: self.remove_node(node)
 		except: pass
+		self._notify("node_added", "node_removed", node)
 		# add the node to the backing data store
 		self._nodes[node._name] = node
+		self._version += 1
 		return node
 
 	def add_edge(self, start, end, name=None, is_directed=True, **kwargs):
@@ -944,27 +1443,44 @@ class Graph:
 			Edge(weight=5)			
 		"""
 		# get the start and end points, and create them if they don't exist
-		try: start = self.get_element(start)
-		except: start = self.add_node(start)
-		try: end = self.get_element(end)
-		except: end = self.add_node(end)
+		created = []
+		try: start = self.get_node(start)
+		except KeyError:
+			start = self.add_node(start)
+			created.append(start)
+		try: end = self.get_node(end)
+		except KeyError:
+			end = self.add_node(end)
+			created.append(end)
 		# build the edge
 		edge = self.Edge(start, end, name, is_directed=is_directed, **kwargs)
-		# remove any otherwise identical edges
-		try: self.remove_edge(edge)
-		except: pass
+		old = self._edges.get(edge._name)
+		try:
+			# remove any otherwise identical edge first, so that observers
+			# see the new one replace it rather than join it
+			if old is not None:
+				self.remove_edge(old)
+			try:
+				self._notify("edge_added", "edge_removed", edge)
+			except:
+				# put the old edge back the way it was; observers have
+				# accepted it once already, so can't object to it now
+				if old is not None:
+					self._edges[old._name] = old
+					self._link_edge(old)
+					for observer in self._observers:
+						try: observer.edge_added(old)
+						except: pass
+				raise
+		except:
+			# and drop any endpoints this call made
+			for node in reversed(created):
+				self.remove_node(node)
+			raise
 		# and add the edge to the backing data store
 		self._edges[edge.name] = edge
 		# now take care of adjacency tracking
-		if is_directed:
-			start._outgoing.append(edge)
-			end._incoming.append(edge)
-		else:
-			start._bidirectional.append(edge)
-			# stops the edge from being added twice if it is an undirected
-			# loop
-			if start is not end:
-				end._bidirectional.append(edge)
+		self._link_edge(edge)
 		return edge
 
 	def remove_node(self, node):
@@ -978,12 +1494,14 @@ class Graph:
 			False
 		"""
 		# get the actual node if a name is passed in
-		node = self.get_element(node)
+		node = self.get_node(node)
 		# remove it from adjacency tracking
 		for edge in node.edges:
 			self.remove_edge(edge)
+		self._notify("node_removed", "node_added", node)
 		# remove it from storage
 		n = self._nodes.pop(node.name)
+		self._version += 1
 		return n
 
 	def remove_edge(self, edge):
@@ -998,11 +1516,35 @@ class Graph:
 			False
 		"""
 		# get the actual edge if a name is passed
-		edge = self.get_element(edge)
+		edge = self.get_edge(edge)
+		self._notify("edge_removed", "edge_added", edge)
 		# remove it from adjacency tracking
-		start = edge.start
-		end = edge.end
-		if edge.is_directed:
+		self._unlink_edge(edge)
+		# remove it from storage
+		e = self._edges.pop(edge.name)
+		return e
+
+	def _link_edge(self, edge):
+		"""Adds the edge to its endpoints' adjacency lists."""
+		self._version += 1
+		start = edge._start
+		end = edge._end
+		if edge._directed:
+			start._outgoing.append(edge)
+			end._incoming.append(edge)
+		else:
+			start._bidirectional.append(edge)
+			# stops the edge from being added twice if it is an undirected
+			# loop
+			if start is not end:
+				end._bidirectional.append(edge)
+
+	def _unlink_edge(self, edge):
+		"""Removes the edge from its endpoints' adjacency lists."""
+		self._version += 1
+		start = edge._start
+		end = edge._end
+		if edge._directed:
 			start._outgoing.remove(edge)
 			end._incoming.remove(edge)
 		else:
@@ -1010,9 +1552,6 @@ class Graph:
 			# fix the undirected loop problem
 			if start is not end:
 				end._bidirectional.remove(edge)
-		# remove it from storage
-		e = self._edges.pop(edge.name)
-		return e
 
 	#########################################################################
 	#			Graph Inspection Tools  			#
@@ -1050,9 +1589,9 @@ class Graph:
 			Edge(name=n1->n2, weight=5)
 		"""
 		if "start" in kwargs:
-			kwargs["start"] = self.get_element(kwargs["start"])
+			kwargs["start"] = self.get_node(kwargs["start"])
 		if "end" in kwargs:
-			kwargs["end"] = self.get_element(kwargs["end"])
+			kwargs["end"] = self.get_node(kwargs["end"])
 		desired_properties = set(kwargs.items())
 		for edge in self.edges:
 			attrs = set(edge.data.items())
@@ -1079,12 +1618,49 @@ class Graph:
 			{Edge(name="Fluffy")}
 		"""
 		# get the actual nodes if names are passed in
-		n1 = self.get_element(n1)
-		n2 = self.get_element(n2)
+		n1 = self.get_node(n1)
+		n2 = self.get_node(n2)
 		n1_edges = set(n1.edges)
 		n2_edges = set(n2.edges)
 		return n1_edges & n2_edges
 
+	def walk(self, start, selector=None, edges=False, reverse=False):
+		"""Returns a Walker that steps through the graph from start.
+
+		With a node as start, the walker steps from node to node and
+		the selector chooses among the neighbours of the current node,
+		or among the edges leaving it if edges is True. With an edge
+		as start, it begins at that edge's end (or its start, for a
+		reverse walk) and steps along edges.
+
+		The optional reverse argument walks down incoming edges
+		instead of outgoing ones. Bidirectional edges can always be
+		followed.
+
+		selector should accept an AdjacencyView of the candidates and
+		return one of them, or None to end the walk. It may be left
+		out if the application will step the walker itself with
+		move().
+
+		Usage:
+			>>> g = Graph(edges={('A', 'B'), ('B', 'C'), ('C', 'A')})
+			>>> w = g.walk("A", lambda candidates: candidates[0])
+			>>> w.take(4)
+			[Node(name=B), Node(name=C), Node(name=A), Node(name=B)]
+		"""
+		return Walker(self.get_element(start), selector, edges, reverse)
+
+	def _walk_protocol(self, start, edges, reverse):
+		"""Adapts a Walker to the old send()-driven walk protocol."""
+		walker = self.walk(start, edges=edges, reverse=reverse)
+		candidates = walker.candidates
+		while candidates:
+			# the old walks hand out a list of distinct candidates to pick from
+			selection = (yield list(dict.fromkeys(candidates)))
+			yield
+			if selection is None: return
+			walker.move(selection)
+
 	def walk_nodes(self, start, reverse=False):
 		"""Provides a generator for application-defined walks.
 
@@ -1093,6 +1669,9 @@ class Graph:
 		The optional reverse argument can be used to do a reverse
 		walk, ie, only walking down incoming edges.
 
+		This is the older, send()-driven interface to walk(), which
+		costs two generator resumptions and a list per step.
+
 		Usage:
 			>>> g = Graph()
 			>>> n1 = g.add_node()
@@ -1103,22 +1682,7 @@ class Graph:
 			>>> 	next_node = adjacent_nodes.pop()
 			>>>	w.send(next_node)
 		"""
-		# make sure we have a real node
-		start = self.get_element(start)
-		# the actual generator function, wrapped for prettitude
-		def walker():
-			next = start
-			while next:
-				if not reverse: adjacent = next.get_adjacent()
-				else: adjacent = next.get_adjacent(outgoing=False, incoming=True)
-				next = yield(adjacent)
-		# the wrapper
-		w = walker()
-		candidates = next(w)
-		while candidates:
-			selection = (yield candidates)
-			candidates = w.send(selection)
-			yield
+		return self._walk_protocol(start, False, reverse)
 
 	def walk_edges(self, start):
 		"""Provides a generator for application-defined walks.
@@ -1126,21 +1690,7 @@ class Graph:
 		Usage is identical to walk_nodes, excepting only that it accepts,
 		and yields, Edges in the place of Nodes.
 		"""
-		# make sure we have a real edge
-		start = self.get_element(start)
-		# the actual generator function
-		def walker():
-			next = start
-			while next:
-				incident = list(next.other_end(next.start).outgoing)
-				next = yield(incident)
-		# convenience wrapper
-		w = walker()
-		candidates = next(w)
-		while candidates:
-			selection = (yield candidates)
-			candidates = w.send(selection)
-			yield
+		return self._walk_protocol(start, True, False)
 
 	def walk_path(self, start, reverse=False):
 		"""Provides a generator for application-defined walks.
@@ -1163,22 +1713,7 @@ class Graph:
 			Edge(name=AB)
 			Edge(name=BC)
 		"""
-		# make sure we have a real node
-		start = self.get_element(start)
-		def walker():
-			next = start
-			while next:
-				candidates = list(next.outgoing)
-				next = yield(candidates)
-		# convenience wrapper
-		w = walker()
-		previous = start
-		candidates = next(w)
-		while candidates:
-			selection = (yield candidates).other_end(previous)
-			previous = selection
-			candidates = w.send(selection)
-			yield
+		return self._walk_protocol(start, True, reverse)
 
 	def heuristic_walk(self, start, selector, reverse=False):
 		"""Traverses the graph using selector as a selection filter on the adjacent nodes.
@@ -1186,6 +1721,9 @@ class Graph:
 		The optional reverse argument allows you to do a reverse walk, ie, only finding
 		adjacencies according to incoming edges rather than outgoing edges.
 
+		selector is handed a fresh list of the distinct adjacent nodes,
+		so it may modify it. The walk ends when selector returns None.
+
 		Usage:
 			>>> g = Graph()
 			>>> g.add_node("A")
@@ -1198,11 +1736,7 @@ class Graph:
 			... 	print(node.name)
 			B
 		"""
-		w = self.walk_nodes(start, reverse=reverse)
-		for candidates in w:
-			selection = selector(candidates)
-			w.send(selection)
-			yield selection
+		yield from self.walk(start, lambda candidates: selector(list(dict.fromkeys(candidates))), reverse=reverse)
 			
 	def heuristic_traversal(self, root, selector):
 		"""Traverses the graph using selector as a selection filter on the unvisited nodes.
@@ -1217,7 +1751,7 @@ class Graph:
 			Node(name="B")
 		"""
 		# handle the its-a-name case
-		root = self.get_element(root)
+		root = self.get_node(root)
 		# stores nodes that are known to the algorithm but not yet visited
 		discovered = []
 		visited = set()
@@ -1252,7 +1786,7 @@ class Graph:
 			Edge(name='ab')
 		"""
 		# handle the its-a-name case
-		root = self.get_element(root)
+		root = self.get_node(root)
 		# stores edges that are known to the algorithm but not yet visited
 		discovered = [edge for edge in root.outgoing]
 		visited = set()
@@ -1327,6 +1861,7 @@ class Graph:
 		for edge in self.heuristic_edge_traversal(root, lambda s: s.pop(0)):
 			yield edge
 
+	@_cached_iterator
 	def topological_traversal(self):
 		"""Traverses the graph, yielding nodes in topological order.
 
@@ -1338,6 +1873,9 @@ class Graph:
 		project, and like his, simply fails to return all the nodes
 		if it encounters a cycle.
 
+		If a TopologicalOrder is following this graph, its order is
+		used rather than being recomputed.
+
 		Usage:
 			>>> g = Graph(edges={('a','b'),('a','c'),('b','c')})
 			>>> for node in g.topological_traversal():
@@ -1346,15 +1884,22 @@ class Graph:
 			Node(name=b)
 			Node(name=c)
 		"""
+		# use a maintained order if there is one
+		for observer in self._observers:
+			if isinstance(observer, TopologicalOrder):
+				for n in list(observer):
+					yield n
+				return
 		# build a dictionary mapping nodes to their incoming degree
-		nodes_to_degrees = {n:len(n.incoming) for n in self.nodes}
+		nodes_to_degrees = {n:len(n._incoming) + len(n._bidirectional) for n in self.nodes}
 		# get a queue of source nodes, ie, those with 0 incoming edges.
 		queue = deque(n for n, degree in nodes_to_degrees.items() if not degree)
 		while queue:
 			n = queue.popleft()
 			yield n
-			# get the nodes which n is outgoing adjacent to
-			for destination in n.get_adjacent(outgoing=True, incoming=False):
+			# get the nodes which n is outgoing adjacent to, once per edge
+			for edge in chain(n._outgoing, n._bidirectional):
+				destination = edge._end if edge._start is n else edge._start
 				nodes_to_degrees[destination] -= 1
 				# if the destination is now a source
 				if not nodes_to_degrees[destination]:
@@ -1374,14 +1919,22 @@ class Graph:
 			{Node('b'), Node('c')}
 			{Node('d')}
 		"""
-		paths = self.get_shortest_paths(root)
-		levels = []
-		for end, path in paths.items():
-			while path.weight >= len(levels):
-				levels.append(set())
-			levels[path.weight].add(end)
-		for i in levels: yield i
+		root = self.get_node(root)
+		level = {root}
+		seen = {root}
+		# breadth first, one level at a time
+		while level:
+			yield level
+			next_level = set()
+			for node in level:
+				for edge in chain(node._outgoing, node._bidirectional):
+					end = edge.other_end(node)
+					if end not in seen:
+						seen.add(end)
+						next_level.add(end)
+			level = next_level
 			
+	@_cached
 	def get_connected_components(self):
 		"""Gets all the connected components from the graph.
 
@@ -1427,36 +1980,520 @@ class Graph:
 				connected.append(discovered)
 		return connected
 
+	@_cached
 	def get_strongly_connected(self):
 		"""Returns a list of all strongly connected components.
 
-		Each SCC is expressed as a set of vertices.
+		Each SCC is expressed as a set of vertices. They are found by
+		Tarjan's algorithm over a snapshot, so the graph is only read.
 
 		Usage is identical to get_connected_components.
 		"""
-		# list of all SCCs
-		strongly_connected_components = []
-		# iterate over all connected components
-		for c in self.get_connected_components():
-			# get an arbitrary node
-			arbitrary = c.pop()
-			# get all the nodes visitable from there
-			visited = [node for node in self.depth_first_traversal(arbitrary)]
-			# reverse the direction of the edges in the graph
-			self.transpose()
-			# while there are still elements which aren't reachable
-			while visited:
-				current_component = set()
-				for node in self.depth_first_traversal(visited.pop(0)):
-					current_component.add(node)
-					try:
-						visited.remove(node)
-					except:
-						pass
-			strongly_connected_components.append(current_component)
-			self.transpose()
-		return strongly_connected_components
+		snapshot = self.snapshot()
+		component, count = _strongly_connected(snapshot.successor_lists())
+		components = [set() for i in range(count)]
+		for node, c in zip(snapshot.nodes, component):
+			components[c].add(node)
+		return components
+
+	@_cached
+	def get_articulation_points(self):
+		"""Returns the set of nodes whose removal would disconnect the graph.
+
+		Like the other biconnectivity tools, this ignores edge direction-
+		directed and undirected edges both join their endpoints- and
+		ignores loops.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> g.get_articulation_points()
+			{Node(name=c)}
+		"""
+		articulation_points, bridges, components = self._get_biconnected()
+		return articulation_points
+
+	@_cached
+	def get_bridges(self):
+		"""Returns the set of edges whose removal would disconnect the graph.
+
+		An edge with a parallel twin is never a bridge, since removing
+		it leaves its endpoints connected by the twin.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> g.get_bridges()
+			{Edge(name=('c', 'd'))}
+		"""
+		articulation_points, bridges, components = self._get_biconnected()
+		return bridges
+
+	@_cached
+	def get_biconnected_components(self):
+		"""Returns a list of the graph's biconnected components.
+
+		Each component is expressed as a set of vertices, and is a
+		maximal set that stays connected if any one of them is
+		removed. Articulation points belong to every component they
+		join. Nodes with no edges other than loops are in no component.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> g.get_biconnected_components()
+			[{Node(name=c), Node(name=d)}, {Node(name=a), Node(name=b), Node(name=c)}]
+		"""
+		articulation_points, bridges, components = self._get_biconnected()
+		return components
+
+	def _get_biconnected(self):
+		"""Finds articulation points, bridges and biconnected components.
+
+		This is an iterative version of the Hopcroft-Tarjan algorithm
+		over an undirected snapshot of the graph. The DFS remembers the
+		edge it arrived by rather than the node, so a parallel edge back
+		to the parent counts as a back edge.
+		"""
+		snapshot = self.snapshot(undirected=True)
+		nodes = snapshot.nodes
+		edges = snapshot.edges
+		offsets = snapshot.offsets
+		targets = snapshot.targets
+		edge_ids = snapshot.edge_ids
+		n = len(nodes)
+		discovered = [-1] * n
+		low = [0] * n
+		counter = 0
+		articulation_points = set()
+		bridges = set()
+		components = []
+		edge_stack = []
+		for root in range(n):
+			if discovered[root] != -1: continue
+			discovered[root] = low[root] = counter
+			counter += 1
+			children = 0
+			work = [(root, -1, offsets[root])]
+			while work:
+				v, parent_edge, i = work[-1]
+				if i < offsets[v+1]:
+					work[-1] = (v, parent_edge, i + 1)
+					w = targets[i]
+					e = edge_ids[i]
+					# skip loops and the edge we arrived by
+					if w == v or e == parent_edge: continue
+					if discovered[w] == -1:
+						discovered[w] = low[w] = counter
+						counter += 1
+						if v == root: children += 1
+						edge_stack.append(e)
+						work.append((w, e, offsets[w]))
+					elif discovered[w] < discovered[v]:
+						# a back edge to an ancestor
+						if discovered[w] < low[v]: low[v] = discovered[w]
+						edge_stack.append(e)
+				else:
+					work.pop()
+					if not work: continue
+					u = work[-1][0]
+					if low[v] < low[u]: low[u] = low[v]
+					if low[v] > discovered[u]:
+						bridges.add(edges[parent_edge])
+					if low[v] >= discovered[u]:
+						if u != root or children > 1:
+							articulation_points.add(nodes[u])
+						# everything above the tree edge is one component
+						component = set()
+						while True:
+							e = edge_stack.pop()
+							component.add(edges[e]._start)
+							component.add(edges[e]._end)
+							if e == parent_edge: break
+						components.append(component)
+		return articulation_points, bridges, components
+
+	@_cached
+	def get_triangle_counts(self):
+		"""Returns a mapping of each node to the number of triangles it is part of.
+
+		Like the other clustering tools, this treats the graph as simple
+		and undirected: edge direction is ignored, as are loops, and
+		parallel edges count once.
+
+		Each edge is oriented from its lower to its higher degree
+		endpoint, so every triangle is found exactly once by
+		intersecting two short neighbour sets, giving the usual
+		O(E^1.5) bound.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> {n.name: t for n, t in g.get_triangle_counts().items()}
+			{'a': 1, 'b': 1, 'c': 1, 'd': 0}
+		"""
+		nodes, neighbours = self._get_simple_neighbours()
+		counts = _count_triangles(neighbours)
+		return {nodes[i]: counts[i] for i in range(len(nodes))}
+
+	@_cached
+	def get_clustering_coefficients(self):
+		"""Returns a mapping of each node to its local clustering coefficient.
+
+		This is the fraction of pairs of a node's neighbours which are
+		themselves adjacent, and is 0 for nodes with fewer than two
+		neighbours.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> g.get_clustering_coefficients()[g['c']]
+			0.3333333333333333
+		"""
+		nodes, neighbours = self._get_simple_neighbours()
+		counts = _count_triangles(neighbours)
+		coefficients = {}
+		for i, node in enumerate(nodes):
+			degree = len(neighbours[i])
+			if degree < 2:
+				coefficients[node] = 0.0
+			else:
+				coefficients[node] = 2.0 * counts[i] / (degree * (degree - 1))
+		return coefficients
+
+	@_cached
+	def get_core_numbers(self):
+		"""Returns a mapping of each node to its core number.
+
+		The k-core of a graph is its largest subgraph in which every
+		node has at least k neighbours, and a node's core number is the
+		largest k for which it is in the k-core.
+
+		This is the bucket-based algorithm of Batagelj and Zaversnik,
+		which peels nodes in order of their remaining degree in O(E).
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> {n.name: k for n, k in g.get_core_numbers().items()}
+			{'a': 2, 'b': 2, 'c': 2, 'd': 1}
+		"""
+		nodes, neighbours = self._get_simple_neighbours()
+		n = len(nodes)
+		degree = [len(adjacent) for adjacent in neighbours]
+		# bucket sort the nodes by degree
+		maximum = max(degree, default=0)
+		bins = [0] * (maximum + 1)
+		for d in degree:
+			bins[d] += 1
+		start = 0
+		for d in range(maximum + 1):
+			bins[d], start = start, start + bins[d]
+		order = [0] * n
+		position = [0] * n
+		for v in range(n):
+			position[v] = bins[degree[v]]
+			order[position[v]] = v
+			bins[degree[v]] += 1
+		for d in range(maximum, 0, -1):
+			bins[d] = bins[d-1]
+		if bins: bins[0] = 0
+		# peel off the lowest degree node, moving its neighbours down a bucket
+		for v in order:
+			for u in neighbours[v]:
+				if degree[u] > degree[v]:
+					du = degree[u]
+					pu = position[u]
+					pw = bins[du]
+					w = order[pw]
+					if u != w:
+						order[pu], order[pw] = w, u
+						position[u], position[w] = pw, pu
+					bins[du] += 1
+					degree[u] -= 1
+		return {nodes[i]: degree[i] for i in range(n)}
+
+	def _get_simple_neighbours(self):
+		"""Returns the nodes and a list of sets of neighbour ids.
+
+		Direction is ignored and loops and parallel edges are dropped.
+		"""
+		snapshot = self.snapshot(undirected=True)
+		neighbours = []
+		for i, adjacent in enumerate(snapshot.successor_lists()):
+			adjacent = set(adjacent)
+			adjacent.discard(i)
+			neighbours.append(adjacent)
+		return snapshot.nodes, neighbours
+
+	@_cached
+	def transitive_closure(self, view=False):
+		"""Returns the transitive closure of this DAG.
+
+		The closure has an edge from a to b wherever there is a path
+		from a to b. By default it is returned as a new graph with the
+		same nodes, holding one copy of each existing edge and a new
+		edge for every other reachable pair. If view is True, an
+		EdgeSetView of (start, end) pairs is returned instead, which
+		answers membership tests without building any edges.
+
+		Raises ValueError if the graph has a cycle; undirected edges
+		count as cycles.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+			>>> ('a', 'c') in g.transitive_closure(view=True)
+			True
+			>>> g.transitive_closure().size
+			3
+		"""
+		snapshot, successors, reach = self._get_reach()
+		if view:
+			return EdgeSetView(snapshot.nodes, reach)
+		return self._copy_pairs(snapshot, reach, True)
+
+	@_cached
+	def transitive_reduction(self, view=False):
+		"""Returns the transitive reduction of this DAG.
+
+		The reduction is the smallest graph with the same reachability,
+		which for a DAG means dropping every edge from a to b where
+		some other path leads from a to b. Parallel edges are dropped
+		too. By default it is returned as a new graph holding copies of
+		the surviving edges; if view is True, an EdgeSetView of their
+		(start, end) pairs is returned instead.
+
+		Raises ValueError if the graph has a cycle; undirected edges
+		count as cycles.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('a', 'c')})
+			>>> sorted((a.name, b.name) for a, b in g.transitive_reduction(view=True))
+			[('a', 'b'), ('b', 'c')]
+		"""
+		snapshot, successors, reach = self._get_reach()
+		kept = []
+		for v, adjacent in enumerate(successors):
+			# anything reachable from a successor needs no edge of its own
+			covered = 0
+			for w in adjacent:
+				covered |= reach[w]
+			ends = 0
+			for w in adjacent:
+				if not covered >> w & 1:
+					ends |= 1 << w
+			kept.append(ends)
+		if view:
+			return EdgeSetView(snapshot.nodes, kept)
+		return self._copy_pairs(snapshot, kept, False)
+
+	def _get_reach(self):
+		"""Returns a snapshot, its successor lists and their descendants.
+
+		The descendants of each node are an int bitset of node ids,
+		built by working back from the sinks in topological order.
+		"""
+		snapshot = self.snapshot()
+		successors = snapshot.successor_lists()
+		n = len(successors)
+		degree = [0] * n
+		for adjacent in successors:
+			for w in adjacent:
+				degree[w] += 1
+		order = [v for v in range(n) if not degree[v]]
+		for v in order:
+			for w in successors[v]:
+				degree[w] -= 1
+				if not degree[w]:
+					order.append(w)
+		if len(order) < n:
+			raise ValueError("the graph is not a DAG")
+		reach = [0] * n
+		for v in reversed(order):
+			bits = 0
+			for w in successors[v]:
+				bits |= reach[w] | 1 << w
+			reach[v] = bits
+		return snapshot, successors, reach
+
+	def _copy_pairs(self, snapshot, pairs, fill):
+		"""Builds a new graph with an edge for every pair in the bitsets.
+
+		The first existing edge for a pair is copied; if fill is True,
+		pairs without one get a new edge, otherwise they are skipped.
+		"""
+		g = type(self)()
+		for node in snapshot.nodes:
+			g.add_node(node.name, **node.data)
+		nodes, edges = snapshot.nodes, snapshot.edges
+		offsets, targets, edge_ids = snapshot.offsets, snapshot.targets, snapshot.edge_ids
+		for v, bits in enumerate(pairs):
+			start = nodes[v].name
+			for j in range(offsets[v], offsets[v+1]):
+				w = targets[j]
+				if bits >> w & 1:
+					bits ^= 1 << w
+					edge = edges[edge_ids[j]]
+					g.add_edge(start, nodes[w].name, edge.name, **edge.data)
+			if fill:
+				while bits:
+					low = bits & -bits
+					bits ^= low
+					g.add_edge(start, nodes[low.bit_length() - 1].name)
+		return g
+
+	def eulerian_circuit(self, start=None):
+		"""Yields the edges of a route that uses every edge exactly once
+		and ends where it began.
+
+		start can be a node or node name, and must have edges unless
+		the graph has none; if it is not given, an arbitrary node is
+		used. Directed and undirected edges can be mixed freely, and
+		undirected edges are crossed in whichever direction the route
+		needs.
 
+		The degree conditions and connectivity are checked before
+		anything is yielded, raising ValueError if there is no such
+		route. After that the edges are consumed from per-node cursors
+		and yielded as the route is unwound, in O(E) overall.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a')})
+			>>> [(e.start.name, e.end.name) for e in g.eulerian_circuit('a')]
+			[('a', 'b'), ('b', 'c'), ('c', 'a')]
+		"""
+		if start is not None:
+			start = self.get_node(start)._name
+		arcs, index, virtual = self._get_eulerian_arcs(False)
+		if start is not None:
+			start = index[start]
+		return self._unwind_eulerian(arcs, len(index), start, virtual)
+
+	def eulerian_path(self):
+		"""Yields the edges of a route that uses every edge exactly once.
+
+		The route starts and ends at the only two nodes of odd degree,
+		or is a circuit if there are none. Like eulerian_circuit(), it
+		handles mixed graphs, raises ValueError up front if there is no
+		such route, and then yields the edges in O(E).
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+			>>> [(e.start.name, e.end.name) for e in g.eulerian_path()]
+			[('c', 'a'), ('a', 'b'), ('b', 'c'), ('c', 'd')]
+		"""
+		arcs, index, virtual = self._get_eulerian_arcs(True)
+		return self._unwind_eulerian(arcs, len(index), None, virtual)
+
+	def _get_eulerian_arcs(self, path):
+		"""Orients every edge so that each node has as many in as out.
+
+		Returns the arcs as parallel lists of tails, heads and edges, a
+		mapping of node names to the ids used in them, and the position
+		of the virtual arc closing a path into a circuit, or None if
+		there is none. Raises ValueError if no orientation works.
+		"""
+		index = {name: i for i, name in enumerate(self._nodes)}
+		n = len(index)
+		tails, heads, edges = [], [], []
+		undirected = []
+		# the balance of out and in arcs, and the parity of every degree
+		balance = [0] * n
+		parity = [0] * n
+		for edge in self._edges.values():
+			u, v = index[edge._start._name], index[edge._end._name]
+			if u != v:
+				parity[u] ^= 1
+				parity[v] ^= 1
+				if edge._directed:
+					balance[u] += 1
+					balance[v] -= 1
+				else:
+					undirected.append(len(edges))
+			tails.append(u)
+			heads.append(v)
+			edges.append(edge)
+		odd = [v for v in range(n) if parity[v]]
+		virtual = None
+		if path and len(odd) == 2:
+			# close the path with an undirected arc between its ends
+			virtual = len(edges)
+			undirected.append(virtual)
+			tails.append(odd[0])
+			heads.append(odd[1])
+			edges.append(None)
+		elif odd:
+			raise ValueError("no Eulerian %s: %d nodes of odd degree" % ("path" if path else "circuit", len(odd)))
+		# every edge must be in the same connected component
+		parent = list(range(n))
+		def find(v):
+			while parent[v] != v:
+				parent[v] = parent[parent[v]]
+				v = parent[v]
+			return v
+		for u, v in zip(tails, heads):
+			parent[find(u)] = find(v)
+		if len({find(u) for u in tails}) > 1:
+			raise ValueError("no Eulerian route: the edges are not connected")
+		# point each undirected arc away from the less loaded end, which
+		# leaves little for the balancing below to do
+		for a in undirected:
+			u, v = tails[a], heads[a]
+			if balance[v] < balance[u]:
+				tails[a], heads[a] = u, v = v, u
+			balance[u] += 1
+			balance[v] -= 1
+		# then turn undirected arcs around along paths from nodes with
+		# too many out arcs to those with too few, two at a time
+		leaving = [set() for v in range(n)]
+		for a in undirected:
+			leaving[tails[a]].add(a)
+		for source in range(n):
+			while balance[source] > 0:
+				previous = {source: None}
+				queue = deque([source])
+				sink = None
+				while queue and sink is None:
+					u = queue.popleft()
+					for a in leaving[u]:
+						v = heads[a]
+						if v not in previous:
+							previous[v] = a
+							if balance[v] < 0:
+								sink = v
+								break
+							queue.append(v)
+				if sink is None:
+					raise ValueError("no Eulerian route: the directed edges can't be balanced")
+				v = sink
+				while v != source:
+					a = previous[v]
+					u = tails[a]
+					leaving[u].remove(a)
+					leaving[v].add(a)
+					tails[a], heads[a] = v, u
+					v = u
+				balance[source] -= 2
+				balance[sink] += 2
+		return (tails, heads, edges), index, virtual
+
+	def _unwind_eulerian(self, arcs, n, start, virtual):
+		"""Checks the start node and returns the generator of edges.
+
+		The arcs are filed under their heads, with the virtual arc, if
+		any, put where it will be taken first; the start of a path is
+		the head of the virtual arc.
+		"""
+		tails, heads, edges = arcs
+		incoming = [[] for v in range(n)]
+		for a, head in enumerate(heads):
+			if a != virtual:
+				incoming[head].append(a)
+		if virtual is not None:
+			start = heads[virtual]
+			incoming[start].append(virtual)
+		if edges:
+			if start is None:
+				start = heads[0]
+			elif not incoming[start]:
+				raise ValueError("no Eulerian circuit passes through the start node")
+		return _hierholzer(tails, edges, incoming, start, virtual)
+
+	@_cached
 	def get_cycles(self):
 		"""Finds and returns a list of cycles in the current graph.
 
@@ -1484,8 +2521,8 @@ class Graph:
 			>>> g.get_path('a', 'd')
 			... <Graph object at 0x1da73d0>
 		"""
-		start = self[start]
-		end = self[end]
+		start = self.get_node(start)
+		end = self.get_node(end)
 		path = []
 		for edge in self.depth_first_edge_traversal(start):
 			if not path: path = [edge]
@@ -1500,6 +2537,7 @@ class Graph:
 					path += [edge]
 		raise ValueError("No path from %s to %s found" % (start, end))
 
+	@_cached
 	def get_shortest_paths(self, source, get_weight=lambda e: 1, pretty=True):
 		"""Finds the shortest path to all connected nodes from source.
 
@@ -1510,6 +2548,11 @@ class Graph:
 		Each subgraph has an additional 'weight' attribute
 		that specifies the total weight of the path.
 
+		If every weight is a non-negative integer, the search uses a
+		bucket queue (for weights up to DIAL_LIMIT) or a radix heap
+		instead of a binary heap. Either way nodes are only ever
+		compared by the integer ids the search gives them.
+
 		Usage:
 			>>> g = Graph()
 			>>> n1 = g.add_node("A")
@@ -1531,29 +2574,30 @@ class Graph:
 			(1, [Edge(weight=1)])
 		"""
 		# handle the its-a-name case
-		source = self.get_element(source)
-		# create the paths table
+		source = self.get_node(source)
+		nodes, adjacency, integral, heaviest = self._get_weighted_adjacency(source, get_weight)
+		# choose the cheapest queue the weights allow
+		if integral and heaviest <= DIAL_LIMIT:
+			distances, predecessors = _dial(adjacency, heaviest)
+		elif integral:
+			distances, predecessors = _radix(adjacency)
+		else:
+			distances, predecessors = _dijkstra(adjacency)
+		# create the paths table from the predecessor edges
 		paths = defaultdict(lambda: (float("inf"), []))
-		paths[source] = (0, [])
-		# create the minimum distance heap
-		unoptomized = [(0, source)]
-		# main loop
-		while unoptomized:
-			# pop the minimum distanced node
-			distance, current = heapq.heappop(unoptomized)
-			# iterate over its outgoing edges
-			for edge in current.outgoing:
-				# get the old path to the endpoint
-				old_weight, old_path = paths[edge.other_end(current)]
-				# get the weight of this path to the edge's end
-				weight, path = paths[current]
-				weight += get_weight(edge)
-				# if the new path is better than the old path
-				if weight < old_weight:
-					# relax it
-					paths[edge.other_end(current)] = (weight, path + [edge])
-					# and put it on the heap
-					heapq.heappush(unoptomized, (weight, edge.other_end(current)))
+		edge_paths = [None] * len(nodes)
+		edge_paths[0] = []
+		for v in range(len(nodes)):
+			# climb to the nearest ancestor whose path is known
+			unknown = []
+			u = v
+			while edge_paths[u] is None:
+				unknown.append(u)
+				u = predecessors[u][0]
+			for u in reversed(unknown):
+				parent, edge = predecessors[u]
+				edge_paths[u] = edge_paths[parent] + [edge]
+			paths[nodes[v]] = (distances[v], edge_paths[v])
 		# this preserves compatibility with the old way
 		if not pretty:
 			return paths
@@ -1571,6 +2615,90 @@ class Graph:
 				processed_paths[endpoint] = induced_path
 			return processed_paths
 
+	def k_shortest_paths(self, source, target, k=None, get_weight=lambda e: 1):
+		"""Yields the k shortest loopless paths from source to target.
+
+		The optional get_weight argument should be a callable that
+		accepts an edge and returns a non-negative weight. If k is not
+		given, every loopless path is eventually yielded.
+
+		Paths are yielded lazily, cheapest first, as (length, [path])
+		pairs like those of get_shortest_paths(pretty=False). Paths
+		through different parallel edges count as different paths.
+
+		This is Yen's algorithm. Each candidate is found by a search
+		that skips the nodes and edges it has to avoid, so the graph
+		is never copied or modified.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('b', 'd'), ('a', 'c'), ('c', 'd'), ('a', 'd')})
+			>>> [length for length, path in g.k_shortest_paths('a', 'd', 3)]
+			[1, 2, 2]
+		"""
+		source = self.get_node(source)
+		target = self.get_node(target)
+		if k is not None and k <= 0: return
+		nodes, adjacency, integral, heaviest = self._get_weighted_adjacency(source, get_weight)
+		goal = next((i for i, node in enumerate(nodes) if node is target), None)
+		if goal is None: return
+		first = _masked_dijkstra(adjacency, 0, goal, set(), set())
+		# each path is a (length, node ids, edges, running lengths) tuple
+		found = [first]
+		seen = {tuple(map(id, first[2]))}
+		candidates = []
+		tiebreak = count()
+		while True:
+			length, path_nodes, path_edges, lengths = found[-1]
+			yield length, list(path_edges)
+			if k is not None and len(found) >= k: return
+			# branch off the last path at each of its nodes in turn
+			for i in range(len(path_edges)):
+				root = path_nodes[:i+1]
+				# paths through parallel edges have different roots
+				banned_edges = {id(p[2][i]) for p in found if len(p[2]) > i and p[2][:i] == path_edges[:i]}
+				spur = _masked_dijkstra(adjacency, root[-1], goal, set(root[:-1]), banned_edges)
+				if spur is None: continue
+				edges = path_edges[:i] + spur[2]
+				key = tuple(map(id, edges))
+				if key in seen: continue
+				seen.add(key)
+				offset = lengths[i]
+				candidate = (offset + spur[0], root[:-1] + spur[1], edges, lengths[:i] + [offset + l for l in spur[3]])
+				heapq.heappush(candidates, (candidate[0], next(tiebreak), candidate))
+			if not candidates: return
+			found.append(heapq.heappop(candidates)[2])
+
+	def _get_weighted_adjacency(self, source, get_weight):
+		"""Numbers the nodes reachable from source and weighs their edges.
+
+		Returns the nodes in order of discovery (source first), a list
+		holding parallel (targets, weights, edges) lists for each of
+		them, whether every weight was a non-negative integer, and the
+		largest weight. get_weight is called once per edge.
+		"""
+		# names hash faster than the elements themselves
+		ids = {source._name: 0}
+		nodes = [source]
+		adjacency = []
+		for node in nodes:
+			edges = node._outgoing + node._bidirectional
+			ends = [edge._end for edge in node._outgoing]
+			if node._bidirectional:
+				ends += [edge._start if edge._end is node else edge._end for edge in node._bidirectional]
+			targets = []
+			for end in ends:
+				name = end._name
+				if name not in ids:
+					ids[name] = len(nodes)
+					nodes.append(end)
+				targets.append(ids[name])
+			adjacency.append((targets, list(map(get_weight, edges)), edges))
+		weights = list(chain.from_iterable(arcs[1] for arcs in adjacency))
+		integral = all(type(w) is int for w in weights) and min(weights, default=0) >= 0
+		heaviest = max(weights, default=0) if integral else None
+		return nodes, adjacency, integral, heaviest
+
+	@_cached
 	def minimum_span(self, weight=lambda e: 1):
 		"""Returns the minimum spanning tree/forest for a given graph.
 
@@ -1629,27 +2757,28 @@ class Graph:
 
 		Does not change a directed edge into an undirected edge.
 		"""
-		# get the edge if its a name
-		edge = self.get_element(edge)
-		if edge.is_directed:
-			edge.start._outgoing.remove(edge)
-			edge.end._incoming.remove(edge)
-		else:
-			try:	# to fix the problem with undirected loops
-				edge.start._bidirectional.remove(edge)
-				edge.end._bidirectional.remove(edge)
-			except:
-				pass
-		edge._start = start or edge.start
-		edge._end = end or edge.end
-		if edge.is_directed:
-			edge.start._outgoing.append(edge)
-			edge.end._incoming.append(edge)
-		else:
-			edge.start._bidirectional.append(edge)
-			# fix the problem with undirected loops
-			if start is not end:
-				edge.end._bidirectional.append(edge)
+		# get the edge and its new endpoints if names are passed
+		edge = self.get_edge(edge)
+		old_start, old_end = edge._start, edge._end
+		if start is not None: start = self.get_node(start)
+		else: start = old_start
+		if end is not None: end = self.get_node(end)
+		else: end = old_end
+		self._notify("edge_removed", "edge_added", edge)
+		self._unlink_edge(edge)
+		edge._start, edge._end = start, end
+		try:
+			self._notify("edge_added", "edge_removed", edge)
+		except:
+			# put things back the way they were, and tell the
+			# observers the edge is where it used to be
+			edge._start, edge._end = old_start, old_end
+			self._link_edge(edge)
+			for observer in self._observers:
+				try: observer.edge_added(edge)
+				except: pass
+			raise
+		self._link_edge(edge)
 		return edge
 
 	def contract_edge(self, edge, node_data):
@@ -1670,7 +2799,7 @@ class Graph:
 		   this will still contract them!
 		"""
 		# get the edge if its a name
-		edge = self.get_element(edge)
+		edge = self.get_edge(edge)
 		# check to make sure that the given edge is the only edge between
 		# it endpoints
 		start = edge.start
@@ -1696,8 +2825,12 @@ class Graph:
 
 	def transpose(self):
 		"""Reverses the directions on all edges in the current graph"""
+		self._notify("graph_transposed", "graph_transposed")
+		self._version += 1
 		for e in self.edges:
-			self.move_edge(e, start=e.end, end=e.start)
+			e._start, e._end = e._end, e._start
+		for n in self.nodes:
+			n._incoming, n._outgoing = n._outgoing, n._incoming
 			
 	def induce_subgraph(self, *nodes):
 		"""Returns a new graph composed of only the specified nodes and their mutual edges.
@@ -1734,7 +2867,7 @@ class Graph:
 		"""	
 		g = type(self)()
 		for node in nodes:
-			node = self.get_element(node)
+			node = self.get_node(node)
 			name = node.name
 			data = node.data
 			n = g.add_node(name, **data)
@@ -1754,7 +2887,7 @@ class Graph:
 		# create the new graph
 		g = type(self)()
 		for edge in edges:
-			edge = self.get_element(edge)
+			edge = self.get_edge(edge)
 			# and add them if they don't already exist
 			if edge.start not in g:
 				g.add_node(edge.start.name, **edge.start.data)
@@ -1906,3 +3039,833 @@ class Graph:
 			if set(self.edges).issuperset(other.edges):
 				return True
 		return False
+
+
+class Snapshot:
+	"""A frozen, integer-indexed copy of a Graph's structure.
+
+	Nodes are numbered [0, order), in the order given by nodes, and
+	index maps node names back to those numbers. The adjacency is kept
+	in compressed sparse row form: the successors of node i are
+	targets[offsets[i]:offsets[i+1]], and the matching entries of
+	edge_ids give the position in edges of the edge that was followed.
+	Undirected edges appear in both directions, except for loops,
+	which appear once. If a get_weight callable was given, weights
+	holds the weight of every entry in the same layout; otherwise it
+	is None.
+
+	The arrays are array.array('q') and array.array('d') instances,
+	so they can be handed to numpy or shared memory without copying.
+
+	Snapshots do not follow later changes to the graph they came from.
+	"""
+
+	def __init__(self, graph, get_weight=None, undirected=False):
+		"""Builds the snapshot from the given graph.
+
+		Usage:
+			>>> s = Snapshot(Graph(edges={('a', 'b')}))
+			>>> s.order, s.size
+			(2, 1)
+		"""
+		nodes = list(graph.nodes)
+		edges = list(graph.edges)
+		index = {node._name: i for i, node in enumerate(nodes)}
+		sources = array('q')
+		targets = array('q')
+		edge_ids = array('q')
+		weights = None if get_weight is None else array('d')
+		for i, edge in enumerate(edges):
+			start = index[edge._start._name]
+			end = index[edge._end._name]
+			sources.append(start)
+			targets.append(end)
+			edge_ids.append(i)
+			if weights is not None:
+				weight = get_weight(edge)
+				weights.append(weight)
+			if (undirected or not edge._directed) and start != end:
+				sources.append(end)
+				targets.append(start)
+				edge_ids.append(i)
+				if weights is not None:
+					weights.append(weight)
+		self._build(nodes, edges, index, sources, targets, edge_ids, weights)
+
+	def _build(self, nodes, edges, index, sources, targets, edge_ids, weights):
+		"""Sorts the given arcs into compressed sparse row form."""
+		self.nodes = nodes
+		self.edges = edges
+		self.index = index
+		n = len(nodes)
+		# count the arcs leaving each node
+		offsets = array('q', bytes(8 * (n + 1)))
+		for source in sources:
+			offsets[source + 1] += 1
+		for i in range(n):
+			offsets[i + 1] += offsets[i]
+		# and drop each arc into its slot
+		cursor = array('q', offsets)
+		self.offsets = offsets
+		self.targets = array('q', bytes(8 * len(targets)))
+		self.edge_ids = array('q', bytes(8 * len(targets)))
+		self.weights = None if weights is None else array('d', bytes(8 * len(targets)))
+		for arc, source in enumerate(sources):
+			slot = cursor[source]
+			cursor[source] = slot + 1
+			self.targets[slot] = targets[arc]
+			self.edge_ids[slot] = edge_ids[arc]
+			if weights is not None:
+				self.weights[slot] = weights[arc]
+
+	@property
+	def order(self):
+		"""Reports the number of nodes in the snapshot."""
+		return len(self.nodes)
+
+	@property
+	def size(self):
+		"""Reports the number of edges in the snapshot."""
+		return len(self.edges)
+
+	def get_id(self, item):
+		"""Takes a node or a node name and returns its integer id.
+
+		Raises KeyError if it is not in the snapshot.
+		"""
+		if isinstance(item, GraphElement):
+			item = item._name
+		return self.index[item]
+
+	def successors(self, i):
+		"""Returns the ids of the nodes reachable in one step from node i."""
+		return self.targets[self.offsets[i]:self.offsets[i+1]]
+
+	def successor_lists(self):
+		"""Returns a list holding a list of successor ids for every node.
+
+		This trades memory for speed in pure-Python algorithms, which
+		index lists faster than they slice arrays.
+		"""
+		targets = self.targets.tolist()
+		offsets = self.offsets
+		return [targets[offsets[i]:offsets[i+1]] for i in range(len(self.nodes))]
+
+	def transpose(self):
+		"""Returns a snapshot of the same graph with every arc reversed."""
+		sources = array('q')
+		for i in range(len(self.nodes)):
+			sources.extend([i] * (self.offsets[i+1] - self.offsets[i]))
+		reverse = Snapshot.__new__(Snapshot)
+		reverse._build(self.nodes, self.edges, self.index, self.targets, sources, self.edge_ids, self.weights)
+		return reverse
+
+	def get_dominators(self, root, reverse=False):
+		"""Returns a mapping of each node reachable from root to its immediate dominator.
+
+		A node d dominates n if every path from root to n passes
+		through d; the immediate dominator of n is the dominator
+		closest to it. The root maps to None, and following the
+		mapping from any node leads back to the root, so it also
+		describes the dominator tree.
+
+		If reverse is True, edges are followed backwards, which gives
+		the post-dominators of a graph whose exit node is root.
+
+		This uses the iterative algorithm of Cooper, Harvey and Kennedy,
+		which usually converges in two or three passes.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')})
+			>>> s = g.snapshot()
+			>>> {n.name: d and d.name for n, d in s.get_dominators('a').items()}
+			{'a': None, 'b': 'a', 'c': 'a', 'd': 'a'}
+		"""
+		idom, order, predecessors = self._dominators(root, reverse)
+		nodes = self.nodes
+		dominators = {nodes[order[0]]: None}
+		for v in order[1:]:
+			dominators[nodes[v]] = nodes[idom[v]]
+		return dominators
+
+	def get_dominance_frontiers(self, root, reverse=False):
+		"""Returns a mapping of each node reachable from root to its dominance frontier.
+
+		The dominance frontier of d is the set of nodes that d does
+		not strictly dominate, but which have a predecessor that d
+		dominates- ie, the places where d's dominance ends.
+
+		The reverse argument has the same meaning as in get_dominators.
+
+		Usage:
+			>>> g = Graph(edges={('a', 'b'), ('a', 'c'), ('b', 'd'), ('c', 'd')})
+			>>> s = g.snapshot()
+			>>> {n.name: {f.name for f in d} for n, d in s.get_dominance_frontiers('a').items()}
+			{'a': set(), 'b': {'d'}, 'c': {'d'}, 'd': set()}
+		"""
+		idom, order, predecessors = self._dominators(root, reverse)
+		root = order[0]
+		frontiers = {v: set() for v in order}
+		for v in order:
+			# the root has no dominator, so runners go all the way up
+			stop = -1 if v == root else idom[v]
+			for runner in predecessors[v]:
+				while runner != stop:
+					frontiers[runner].add(v)
+					runner = -1 if runner == root else idom[runner]
+		nodes = self.nodes
+		return {nodes[v]: {nodes[w] for w in frontier} for v, frontier in frontiers.items()}
+
+	def _dominators(self, root, reverse):
+		"""Computes immediate dominators by node id.
+
+		Returns the idom list, the reachable nodes in reverse postorder
+		and, for each reachable node, its reachable predecessors.
+		"""
+		forward = self.transpose() if reverse else self
+		backward = self if reverse else self.transpose()
+		successors = forward.successor_lists()
+		root = self.get_id(root)
+		# number the nodes reachable from root in postorder
+		n = len(self.nodes)
+		postorder = [-1] * n
+		order = []
+		visited = [False] * n
+		visited[root] = True
+		work = [(root, 0)]
+		while work:
+			v, i = work[-1]
+			adjacent = successors[v]
+			if i < len(adjacent):
+				work[-1] = (v, i + 1)
+				w = adjacent[i]
+				if not visited[w]:
+					visited[w] = True
+					work.append((w, 0))
+			else:
+				work.pop()
+				postorder[v] = len(order)
+				order.append(v)
+		order.reverse()
+		# only reachable predecessors take part
+		predecessors = {}
+		for v in order:
+			adjacent = backward.successors(v)
+			predecessors[v] = [p for p in set(adjacent) if visited[p]]
+		idom = [-1] * n
+		idom[root] = root
+		changed = True
+		while changed:
+			changed = False
+			for v in order[1:]:
+				new = -1
+				for p in predecessors[v]:
+					if idom[p] == -1: continue
+					if new == -1:
+						new = p
+						continue
+					# walk both fingers up the tree until they meet
+					a, b = p, new
+					while a != b:
+						while postorder[a] < postorder[b]:
+							a = idom[a]
+						while postorder[b] < postorder[a]:
+							b = idom[b]
+					new = a
+				if idom[v] != new:
+					idom[v] = new
+					changed = True
+		return idom, order, predecessors
+
+
+class EdgeSetView(Set):
+	"""A read-only set of (start, end) node pairs.
+
+	Each start node's ends are held as a single int bitset, and the
+	pairs are only turned into node tuples as they are iterated over,
+	so a large closure costs one int per node rather than one tuple
+	per pair. Membership tests accept nodes or node names.
+
+	Like a Snapshot, the view does not follow later changes to the
+	graph it came from.
+	"""
+
+	def __init__(self, nodes, bits):
+		"""Wraps the given nodes and one bitset of end ids per node."""
+		self.nodes = nodes
+		self.bits = bits
+		self.index = {node._name: i for i, node in enumerate(nodes)}
+
+	@classmethod
+	def _from_iterable(cls, pairs):
+		"""Set operations on views return plain sets."""
+		return set(pairs)
+
+	def __contains__(self, pair):
+		"""Tests whether the (start, end) pair is in the view."""
+		try:
+			start, end = pair
+		except (TypeError, ValueError):
+			return False
+		if isinstance(start, GraphElement): start = start._name
+		if isinstance(end, GraphElement): end = end._name
+		try:
+			return bool(self.bits[self.index[start]] >> self.index[end] & 1)
+		except (KeyError, TypeError):
+			return False
+
+	def __iter__(self):
+		"""Yields each (start, end) pair of nodes."""
+		nodes = self.nodes
+		for v, bits in enumerate(self.bits):
+			while bits:
+				low = bits & -bits
+				bits ^= low
+				yield nodes[v], nodes[low.bit_length() - 1]
+
+	def __len__(self):
+		"""Returns the number of pairs."""
+		return sum(bin(bits).count("1") for bits in self.bits)
+
+	def get_ends(self, start):
+		"""Returns the list of nodes paired with the given start node."""
+		if isinstance(start, GraphElement): start = start._name
+		bits = self.bits[self.index[start]]
+		ends = []
+		while bits:
+			low = bits & -bits
+			bits ^= low
+			ends.append(self.nodes[low.bit_length() - 1])
+		return ends
+
+
+# the largest integer weight Dial's algorithm is used for; beyond it
+# the bucket array gets large and mostly empty, so a radix heap wins
+DIAL_LIMIT = 1024
+
+def _dial(adjacency, heaviest):
+	"""Dijkstra's algorithm for small non-negative integer weights.
+
+	adjacency holds parallel (targets, weights, edges) lists for each
+	vertex, as made by Graph._get_weighted_adjacency, and the source
+	is vertex 0. Tentative distances are kept in a circular array of
+	heaviest + 1 buckets, so each step is constant time and vertices
+	are never compared. Returns the distance to each vertex and its
+	(parent, edge) on a shortest path, or None for the source.
+	"""
+	n = len(adjacency)
+	distances = [None] * n
+	predecessors = [None] * n
+	distances[0] = 0
+	width = heaviest + 1
+	buckets = [[] for i in range(width)]
+	buckets[0].append(0)
+	pending = 1
+	d = 0
+	while pending:
+		bucket = buckets[d % width]
+		while bucket:
+			v = bucket.pop()
+			pending -= 1
+			# skip entries superseded by a shorter distance
+			if distances[v] != d: continue
+			for w, weight, edge in zip(*adjacency[v]):
+				new = d + weight
+				old = distances[w]
+				if old is None or new < old:
+					distances[w] = new
+					predecessors[w] = (v, edge)
+					buckets[new % width].append(w)
+					pending += 1
+		d += 1
+	return distances, predecessors
+
+def _radix(adjacency):
+	"""Dijkstra's algorithm for arbitrary non-negative integer weights.
+
+	Takes and returns the same things as _dial, but keeps the queue in
+	a radix heap, whose buckets are indexed by the highest bit in
+	which a key differs from the last key removed.
+	"""
+	n = len(adjacency)
+	distances = [None] * n
+	predecessors = [None] * n
+	distances[0] = 0
+	buckets = [[(0, 0)]]
+	last = 0
+	pending = 1
+	while pending:
+		if not buckets[0]:
+			# refill bucket 0 from the first non-empty bucket
+			i = 1
+			while not buckets[i]:
+				i += 1
+			entries = buckets[i]
+			buckets[i] = []
+			last = min(entries)[0]
+			for entry in entries:
+				j = (entry[0] ^ last).bit_length()
+				buckets[j].append(entry)
+		d, v = buckets[0].pop()
+		pending -= 1
+		if distances[v] != d: continue
+		for w, weight, edge in zip(*adjacency[v]):
+			new = d + weight
+			old = distances[w]
+			if old is None or new < old:
+				distances[w] = new
+				predecessors[w] = (v, edge)
+				j = (new ^ last).bit_length()
+				while len(buckets) <= j:
+					buckets.append([])
+				buckets[j].append((new, w))
+				pending += 1
+	return distances, predecessors
+
+def _dijkstra(adjacency):
+	"""Dijkstra's algorithm for any other weights.
+
+	Takes and returns the same things as _dial. Heap entries are
+	(distance, vertex) pairs, so ties fall back on the integer vertex
+	ids rather than on the elements. A vertex whose distance drops
+	after it was taken off the heap is simply pushed again, which
+	keeps the old label-correcting behaviour for negative weights.
+	"""
+	n = len(adjacency)
+	distances = [None] * n
+	predecessors = [None] * n
+	distances[0] = 0
+	heap = [(0, 0)]
+	while heap:
+		d, v = heapq.heappop(heap)
+		if d != distances[v]: continue
+		for w, weight, edge in zip(*adjacency[v]):
+			new = d + weight
+			old = distances[w]
+			if old is None or new < old:
+				distances[w] = new
+				predecessors[w] = (v, edge)
+				heapq.heappush(heap, (new, w))
+	return distances, predecessors
+
+def _masked_dijkstra(adjacency, start, goal, banned_nodes, banned_edges):
+	"""Finds a shortest path from start to goal that avoids some vertices and edges.
+
+	adjacency is as for _dial; banned_nodes holds vertex ids and
+	banned_edges the id()s of edges. Returns (length, vertices,
+	edges, running lengths) for the path, where the running lengths
+	are the distances to each vertex along it, or None if goal
+	cannot be reached.
+	"""
+	distances = {start: 0}
+	predecessors = {start: None}
+	settled = set()
+	heap = [(0, start)]
+	while heap:
+		d, v = heapq.heappop(heap)
+		if v in settled: continue
+		settled.add(v)
+		if v == goal:
+			vertices, edges = [v], []
+			while predecessors[v] is not None:
+				v, edge = predecessors[v]
+				vertices.append(v)
+				edges.append(edge)
+			vertices.reverse()
+			edges.reverse()
+			return d, vertices, edges, [distances[u] for u in vertices]
+		for w, weight, edge in zip(*adjacency[v]):
+			if w in banned_nodes or w in settled or id(edge) in banned_edges: continue
+			new = d + weight
+			if w not in distances or new < distances[w]:
+				distances[w] = new
+				predecessors[w] = (v, edge)
+				heapq.heappush(heap, (new, w))
+	return None
+
+def _strongly_connected(successors):
+	"""Labels each vertex with its strongly connected component.
+
+	successors is a list of successor lists. Returns a list mapping
+	each vertex to its component number and the number of components.
+	This is an iterative version of Tarjan's algorithm, and so numbers
+	the components in reverse topological order: if a vertex in
+	component c can reach a vertex in component d, then d <= c.
+	"""
+	n = len(successors)
+	preorder = [-1] * n
+	low = [0] * n
+	component = [-1] * n
+	stack = []
+	counter = 0
+	components = 0
+	for root in range(n):
+		if preorder[root] != -1: continue
+		preorder[root] = low[root] = counter
+		counter += 1
+		stack.append(root)
+		work = [(root, 0)]
+		while work:
+			v, i = work[-1]
+			adjacent = successors[v]
+			if i < len(adjacent):
+				work[-1] = (v, i + 1)
+				w = adjacent[i]
+				if preorder[w] == -1:
+					preorder[w] = low[w] = counter
+					counter += 1
+					stack.append(w)
+					work.append((w, 0))
+				# w is still on the stack if it has no component yet
+				elif component[w] == -1 and preorder[w] < low[v]:
+					low[v] = preorder[w]
+			else:
+				work.pop()
+				if work:
+					parent = work[-1][0]
+					if low[v] < low[parent]:
+						low[parent] = low[v]
+				if low[v] == preorder[v]:
+					while True:
+						w = stack.pop()
+						component[w] = components
+						if w == v: break
+					components += 1
+	return component, components
+
+
+def _hierholzer(tails, edges, incoming, start, virtual):
+	"""Yields the edges of an Eulerian circuit from start.
+
+	This is Hierholzer's algorithm run backwards along the arcs, so
+	that edges come off its stack in forward order. Each node's
+	incoming arcs are consumed from the end of its list, and the
+	first arc taken comes off last; if that is the virtual arc it is
+	dropped.
+	"""
+	if not edges: return
+	cursor = [len(adjacent) for adjacent in incoming]
+	# the stack holds nodes and the arcs that led back to them
+	nodes = [start]
+	taken = [virtual]
+	while nodes:
+		v = nodes[-1]
+		if cursor[v]:
+			cursor[v] -= 1
+			a = incoming[v][cursor[v]]
+			nodes.append(tails[a])
+			taken.append(a)
+		else:
+			nodes.pop()
+			a = taken.pop()
+			if a != virtual:
+				yield edges[a]
+
+def _count_triangles(neighbours):
+	"""Counts the triangles at each node of a simple graph."""
+	n = len(neighbours)
+	rank = sorted(range(n), key=lambda v: len(neighbours[v]))
+	position = [0] * n
+	for p, v in enumerate(rank):
+		position[v] = p
+	# keep only the neighbours that come later in the degree order
+	forward = [{u for u in neighbours[v] if position[u] > position[v]} for v in range(n)]
+	counts = [0] * n
+	for v in range(n):
+		later = forward[v]
+		for u in later:
+			for w in later & forward[u]:
+				counts[v] += 1
+				counts[u] += 1
+				counts[w] += 1
+	return counts
+
+
+class ReachabilityIndex(GraphObserver):
+	"""Answers repeated "can A reach B" queries against a Graph.
+
+	The index is built on the condensation of the graph, ie, the DAG
+	of its strongly connected components. For graphs with at most
+	BITSET_LIMIT components it stores the full transitive closure of
+	the condensation as one Python int bitset per component, so
+	queries are a pair of dict lookups and a bit test. Larger graphs
+	get interval labels instead, which answer most negative queries
+	immediately and prune the search for the rest.
+
+	The index registers itself as an observer of the graph. Adding
+	nodes, and adding edges that don't merge components, update the
+	bitset closure in place; every other change marks the index as
+	stale, and it is rebuilt on the next query.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+		>>> index = ReachabilityIndex(g)
+		>>> index.can_reach('a', 'c')
+		True
+		>>> index.can_reach('c', 'a')
+		False
+		>>> e = g.add_edge('c', 'd')
+		>>> index.can_reach('a', 'd')
+		True
+	"""
+
+	BITSET_LIMIT = 10000
+
+	def __init__(self, graph):
+		"""Builds the index and attaches it to graph."""
+		self.graph = graph
+		self.stale = True
+		self.rebuild()
+		graph.add_observer(self)
+
+	def detach(self):
+		"""Stops the index from following changes to its graph."""
+		self.graph.remove_observer(self)
+
+	def rebuild(self):
+		"""Recomputes the index from scratch."""
+		snapshot = self.graph.snapshot()
+		successors = snapshot.successor_lists()
+		component, count = _strongly_connected(successors)
+		self._components = {node._name: component[i] for i, node in enumerate(snapshot.nodes)}
+		# build the condensation's adjacency
+		dag = [set() for c in range(count)]
+		for v, adjacent in enumerate(successors):
+			c = component[v]
+			for w in adjacent:
+				if component[w] != c:
+					dag[c].add(component[w])
+		if count <= self.BITSET_LIMIT:
+			# components come out of Tarjan's algorithm sinks first,
+			# so every successor's closure is finished before it is used
+			reach = []
+			for c in range(count):
+				closure = 1 << c
+				for d in dag[c]:
+					closure |= reach[d]
+				reach.append(closure)
+			self._reach = reach
+			self._dag = self._low = None
+		else:
+			# the component numbers double as a postorder, so each
+			# component covers the interval [low, c] of its descendants
+			low = list(range(count))
+			for c in range(count):
+				for d in dag[c]:
+					if low[d] < low[c]:
+						low[c] = low[d]
+			self._dag = [list(adjacent) for adjacent in dag]
+			self._low = low
+			self._reach = None
+		self.stale = False
+
+	def can_reach(self, start, end):
+		"""Returns True if there is a path from start to end.
+
+		start and end can be either nodes or node names. Every node
+		can reach itself. Raises KeyError if either is not in the graph.
+		"""
+		if self.stale:
+			self.rebuild()
+		if isinstance(start, GraphElement): start = start._name
+		if isinstance(end, GraphElement): end = end._name
+		source = self._components[start]
+		target = self._components[end]
+		if self._reach is not None:
+			return bool(self._reach[source] >> target & 1)
+		return self._search(source, target)
+
+	def _search(self, source, target):
+		"""Searches the condensation, pruned by the interval labels."""
+		low = self._low
+		dag = self._dag
+		def may_reach(c):
+			return low[c] <= low[target] and target <= c
+		if not may_reach(source): return False
+		stack = [source]
+		seen = {source}
+		while stack:
+			c = stack.pop()
+			if c == target: return True
+			for d in dag[c]:
+				if d not in seen and may_reach(d):
+					seen.add(d)
+					stack.append(d)
+		return False
+
+	def node_added(self, node):
+		"""Gives a new node a component of its own."""
+		if self.stale: return
+		if self._reach is not None:
+			c = len(self._reach)
+			self._reach.append(1 << c)
+		else:
+			c = len(self._low)
+			self._dag.append([])
+			self._low.append(c)
+		self._components[node._name] = c
+
+	def edge_added(self, edge):
+		"""Extends the closure across the new edge where possible."""
+		if self.stale: return
+		start = self._components[edge._start._name]
+		end = self._components[edge._end._name]
+		if start == end: return
+		if self._reach is None or not edge._directed or self._reach[end] >> start & 1:
+			# this merges components or needs new labels
+			self.stale = True
+			return
+		# everything that reaches the start now reaches all the end reaches
+		reach = self._reach
+		closure = reach[end]
+		for c, bits in enumerate(reach):
+			if bits >> start & 1:
+				reach[c] = bits | closure
+
+	def node_removed(self, node):
+		"""Marks the index as stale."""
+		self.stale = True
+
+	def edge_removed(self, edge):
+		"""Marks the index as stale."""
+		self.stale = True
+
+	def graph_transposed(self):
+		"""Marks the index as stale."""
+		self.stale = True
+
+
+class TopologicalOrder(GraphObserver):
+	"""Keeps a topological order of an acyclic Graph as it changes.
+
+	The order is computed once and then repaired on each edge
+	insertion with the Pearce-Kelly algorithm, which only reorders
+	the nodes between the new edge's endpoints that are actually
+	affected by it. Removing edges never invalidates the order, and
+	new nodes simply go at the end.
+
+	Since an order only exists for acyclic graphs, adding an edge
+	that would create a cycle- including undirected edges and loops,
+	which can be followed both ways- raises ValueError naming the
+	cycle, and the edge is not added.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+		>>> order = TopologicalOrder(g)
+		>>> [n.name for n in order]
+		['a', 'b', 'c']
+		>>> e = g.add_edge('c', 'd')
+		>>> e = g.add_edge('d', 'a')
+		...
+		ValueError: adding an edge from d to a would create the cycle d -> a -> b -> c -> d
+	"""
+
+	def __init__(self, graph):
+		"""Computes the initial order and attaches it to graph.
+
+		Raises ValueError if graph already has a cycle.
+		"""
+		self.graph = graph
+		self._order = list(graph.topological_traversal())
+		if len(self._order) != graph.order:
+			raise ValueError("%s has a cycle and so has no topological order" % graph)
+		self._positions = {node._name: i for i, node in enumerate(self._order)}
+		graph.add_observer(self)
+
+	def detach(self):
+		"""Stops the order from following changes to its graph."""
+		self.graph.remove_observer(self)
+
+	def __iter__(self):
+		"""Iterates over the nodes in topological order."""
+		for node in self._order:
+			if node is not None:
+				yield node
+
+	def __len__(self):
+		"""Returns the number of nodes in the order."""
+		return len(self._positions)
+
+	def get_position(self, node):
+		"""Returns a number that increases along the order.
+
+		The numbers are not contiguous, and change as the order is
+		repaired, so they should only be compared with each other.
+		"""
+		if isinstance(node, GraphElement): node = node._name
+		return self._positions[node]
+
+	def node_added(self, node):
+		"""Puts the new node at the end of the order."""
+		self._positions[node._name] = len(self._order)
+		self._order.append(node)
+
+	def node_removed(self, node):
+		"""Leaves a hole where the node was, compacting if needed."""
+		self._order[self._positions.pop(node._name)] = None
+		if len(self._order) > 2 * len(self._positions) + 16:
+			self._order = list(self)
+			self._positions = {n._name: i for i, n in enumerate(self._order)}
+
+	def edge_added(self, edge):
+		"""Repairs the order around the new edge, or raises ValueError."""
+		start = edge._start
+		end = edge._end
+		if start is end or not edge._directed:
+			raise ValueError("adding %s would create a cycle between %s and %s" % (edge, start.name, end.name))
+		positions = self._positions
+		lower = positions[end._name]
+		upper = positions[start._name]
+		# the order already agrees with the edge
+		if lower > upper: return
+		# find everything after end that must move back...
+		forward = self._search(end, upper, start, True)
+		# ...and everything before start that must move forward
+		backward = self._search(start, lower, None, False)
+		# then give them the same set of positions, predecessors first
+		key = lambda n: positions[n._name]
+		backward.sort(key=key)
+		forward.sort(key=key)
+		affected = backward + forward
+		slots = sorted(positions[n._name] for n in affected)
+		for node, slot in zip(affected, slots):
+			positions[node._name] = slot
+			self._order[slot] = node
+
+	def _search(self, root, bound, target, forward):
+		"""Collects the nodes reachable from root within bound.
+
+		Going forward, this follows outgoing edges to nodes placed
+		before bound, and raises ValueError if it finds target. Going
+		backward, it follows incoming edges to nodes placed after bound.
+		"""
+		positions = self._positions
+		parents = {root: None}
+		stack = [root]
+		while stack:
+			node = stack.pop()
+			edges = node._outgoing if forward else node._incoming
+			for edge in edges:
+				other = edge._end if forward else edge._start
+				if other is target:
+					self._report(parents, node, target)
+				if other in parents: continue
+				position = positions[other._name]
+				if (forward and position < bound) or (not forward and position > bound):
+					parents[other] = node
+					stack.append(other)
+		return list(parents)
+
+	def _report(self, parents, last, start):
+		"""Raises ValueError describing the cycle through start."""
+		path = [last]
+		while parents[path[-1]] is not None:
+			path.append(parents[path[-1]])
+		path.reverse()
+		names = [str(start.name)] + [str(n.name) for n in path] + [str(start.name)]
+		raise ValueError("adding an edge from %s to %s would create the cycle %s" % (start.name, path[0].name, " -> ".join(names)))
+
+	def graph_transposed(self):
+		"""Reverses the order to match the reversed edges."""
+		self._order.reverse()
+		self._positions = {n._name: i for i, n in enumerate(self._order) if n is not None}
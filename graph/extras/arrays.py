@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+"""
+arrays.py
+
+Licensed under GPLv3
+
+This module contains the glue between Graphine's Snapshots and
+NumPy, for the extras which do their work with vectorized array
+operations. It requires NumPy.
+
+The main entry point is csr(), which takes a Snapshot (or a Graph,
+which will be snapshotted) and returns its adjacency as NumPy arrays
+without copying the snapshot's buffers.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+
+import numpy
+
+from graph.base import Snapshot
+
+CSR = namedtuple("CSR", "snapshot offsets targets edge_ids weights sources")
+CSR.__doc__ = """NumPy arrays describing a Snapshot's adjacency.
+
+offsets, targets, edge_ids and weights mirror the snapshot's arrays
+(weights is None if the snapshot has none); sources gives the source
+node of every entry in targets, which is what most vectorized
+scatter/gather operations want.
+"""
+
+def _view(buffer, dtype):
+	"""Returns a NumPy view of an array.array, or an empty array."""
+	if not len(buffer):
+		return numpy.zeros(0, dtype=dtype)
+	return numpy.frombuffer(buffer, dtype=dtype)
+
+def csr(graph, get_weight=None, undirected=False):
+	"""Returns the CSR arrays for the given Graph or Snapshot.
+
+	If graph is a Graph, it is snapshotted first with the given
+	get_weight and undirected arguments; otherwise those are ignored.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('a', 'c')})
+		>>> arrays = csr(g)
+		>>> arrays.targets
+		array([1, 2])
+	"""
+	if isinstance(graph, Snapshot):
+		snapshot = graph
+	else:
+		snapshot = graph.snapshot(get_weight=get_weight, undirected=undirected)
+	offsets = _view(snapshot.offsets, numpy.int64)
+	targets = _view(snapshot.targets, numpy.int64)
+	edge_ids = _view(snapshot.edge_ids, numpy.int64)
+	weights = None if snapshot.weights is None else _view(snapshot.weights, numpy.float64)
+	sources = numpy.repeat(numpy.arange(snapshot.order, dtype=numpy.int64), numpy.diff(offsets))
+	return CSR(snapshot, offsets, targets, edge_ids, weights, sources)
@@ -0,0 +1,177 @@
+#! /usr/bin/env python3
+
+"""
+centrality.py
+
+Licensed under GPLv3
+
+This module contains betweenness centrality for Graphine graphs.
+
+betweenness_centrality() is Brandes' algorithm over the integer
+adjacency of a Snapshot. Each source node contributes independently,
+so the sources can be split across a process pool which shares one
+read-only copy of the snapshot (see graph.extras.parallel), and a
+random sample of sources gives a cheaper approximation.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+import random
+from collections import deque
+
+from graph.base import Snapshot
+from graph.extras.parallel import SharedSnapshot, run, chunk
+
+def betweenness_centrality(graph, k=None, get_weight=None, normalized=True, processes=1, seed=None):
+	"""Returns a mapping of every node to its betweenness centrality.
+
+	The betweenness of v is the sum, over ordered pairs of other nodes
+	(s, t), of the fraction of shortest paths from s to t that pass
+	through v. Undirected edges can be followed either way, and
+	parallel edges count as distinct paths.
+
+	graph can be a Graph or a Snapshot. If get_weight is given it
+	should be a callable that accepts an edge and returns a
+	non-negative weight, and paths are found with Dijkstra's
+	algorithm; otherwise every edge counts as 1 and breadth first
+	search is used. get_weight is ignored for snapshots, which use
+	their own weights if they have any.
+
+	If k is given, only k randomly chosen sources are used and the
+	scores are scaled up to estimate the full result; seed makes the
+	choice reproducible. If normalized is True the scores are divided
+	by (n-1)(n-2), the number of ordered pairs that could pass
+	through a node.
+
+	processes sets how many worker processes to split the sources
+	over.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+		>>> scores = betweenness_centrality(g, normalized=False)
+		>>> scores[g['b']]
+		1.0
+	"""
+	if isinstance(graph, Snapshot):
+		snapshot = graph
+	else:
+		snapshot = graph.snapshot(get_weight=get_weight)
+	n = snapshot.order
+	sources = list(range(n))
+	scale = 1.0
+	if k is not None and k < n:
+		sources = random.Random(seed).sample(sources, k)
+		scale = n / k
+	if normalized and n > 2:
+		scale /= (n - 1) * (n - 2)
+	chunks = chunk(sources, 4 * processes)
+	if processes == 1:
+		partials = run(_accumulate, chunks, snapshot, 1, _setup)
+	else:
+		with SharedSnapshot(snapshot) as shared:
+			partials = run(_accumulate, chunks, shared, processes, _setup)
+	scores = [0.0] * n
+	for partial in partials:
+		for i, value in enumerate(partial):
+			scores[i] += value
+	nodes = snapshot.nodes
+	return {nodes[i]: scores[i] * scale for i in range(n)}
+
+def _setup(shared):
+	"""Builds the successor lists a worker searches over."""
+	successors = shared.successor_lists()
+	if shared.weights is None:
+		return successors, None
+	weights = shared.weights.tolist()
+	offsets = shared.offsets
+	return successors, [weights[offsets[i]:offsets[i+1]] for i in range(shared.order)]
+
+def _accumulate(state, sources):
+	"""Returns the dependencies accumulated from the given sources."""
+	successors, weights = state
+	n = len(successors)
+	centrality = [0.0] * n
+	for s in sources:
+		if weights is None:
+			order, predecessors, sigma = _breadth_first(successors, s)
+		else:
+			order, predecessors, sigma = _dijkstra(successors, weights, s)
+		# walk back from the farthest nodes, accumulating dependencies
+		delta = dict.fromkeys(order, 0.0)
+		while order:
+			w = order.pop()
+			coefficient = (1.0 + delta[w]) / sigma[w]
+			for v in predecessors[w]:
+				delta[v] += sigma[v] * coefficient
+			if w != s:
+				centrality[w] += delta[w]
+	return centrality
+
+def _breadth_first(successors, s):
+	"""Counts the shortest paths from s in an unweighted graph.
+
+	Returns the nodes in order of distance, their predecessors on
+	shortest paths (once per parallel edge) and their path counts.
+	"""
+	order = []
+	predecessors = {s: []}
+	sigma = {s: 1}
+	distance = {s: 0}
+	queue = deque([s])
+	while queue:
+		v = queue.popleft()
+		order.append(v)
+		next_distance = distance[v] + 1
+		for w in successors[v]:
+			if w not in distance:
+				distance[w] = next_distance
+				sigma[w] = 0
+				predecessors[w] = []
+				queue.append(w)
+			if distance[w] == next_distance:
+				sigma[w] += sigma[v]
+				predecessors[w].append(v)
+	return order, predecessors, sigma
+
+def _dijkstra(successors, weights, s):
+	"""Counts the shortest paths from s in a weighted graph.
+
+	Returns the same things as _breadth_first.
+	"""
+	order = []
+	predecessors = {s: []}
+	sigma = {s: 1}
+	distance = {s: 0}
+	settled = set()
+	heap = [(0, s)]
+	while heap:
+		d, v = heapq.heappop(heap)
+		if v in settled: continue
+		settled.add(v)
+		order.append(v)
+		for w, weight in zip(successors[v], weights[v]):
+			new = d + weight
+			old = distance.get(w)
+			if old is None or new < old:
+				distance[w] = new
+				sigma[w] = sigma[v]
+				predecessors[w] = [v]
+				heapq.heappush(heap, (new, w))
+			elif new == old and w not in settled:
+				sigma[w] += sigma[v]
+				predecessors[w].append(v)
+	return order, predecessors, sigma
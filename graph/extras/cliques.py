@@ -0,0 +1,264 @@
+#! /usr/bin/env python3
+
+"""
+cliques.py
+
+Licensed under GPLv3
+
+This module contains clique enumeration for Graphine graphs.
+
+maximal_cliques() lazily yields every maximal clique using the
+Bron-Kerbosch algorithm with Tomita's pivoting rule, started from
+each node in degeneracy order so that the top-level candidate sets
+stay small. maximum_clique() runs a branch and bound search instead,
+using greedy colourings to skip branches that cannot beat the best
+clique found so far.
+
+Neighbourhoods are held as Python ints used as bitsets, so that the
+set intersections at the heart of the search are single machine
+operations on small graphs and a few word operations on larger ones.
+Dense graphs can use NumPy bool arrays instead, if NumPy is
+installed. Direction, loops and parallel edges are all ignored.
+"""
+
+# This file is part of Graphine.
+#
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+def maximal_cliques(graph, min_size=1, dense=False):
+	"""Yields each maximal clique in graph as a list of nodes.
+
+	Only cliques of at least min_size nodes are produced, and
+	branches of the search that cannot reach that size are cut off
+	early, so raising it can save a great deal of work.
+
+	If dense is True, neighbourhoods are held as NumPy bool arrays
+	rather than int bitsets, which picks pivots with one vectorized
+	operation instead of a Python loop. That only pays for itself on
+	large, nearly complete graphs; measure before turning it on.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+		>>> sorted(sorted(n.name for n in c) for c in maximal_cliques(g))
+		[['a', 'b', 'c'], ['c', 'd']]
+	"""
+	search = _search(graph, dense)
+	search.min_size = min_size
+	nodes = search.nodes
+	for clique in search.cliques():
+		yield [nodes[i] for i in clique]
+
+def maximum_clique(graph):
+	"""Returns a largest clique in graph as a list of nodes.
+
+	This always works on int bitsets: each branch greedily colours
+	its candidates, and since a clique needs a different colour for
+	every node, branches whose colour count cannot beat the best
+	clique so far are abandoned. The empty graph gives an empty list.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+		>>> sorted(n.name for n in maximum_clique(g))
+		['a', 'b', 'c']
+	"""
+	search = _search(graph, False)
+	nodes = search.nodes
+	return [nodes[i] for i in search.maximum()]
+
+def _search(graph, dense):
+	"""Builds the right kind of search for the graph."""
+	snapshot = graph.snapshot(undirected=True)
+	neighbours = []
+	for i, adjacent in enumerate(snapshot.successor_lists()):
+		adjacent = set(adjacent)
+		adjacent.discard(i)
+		neighbours.append(adjacent)
+	if dense:
+		if numpy is None:
+			raise ValueError("dense cliques require NumPy")
+		return _ArraySearch(snapshot.nodes, neighbours)
+	return _BitsetSearch(snapshot.nodes, neighbours)
+
+def _degeneracy_order(neighbours):
+	"""Orders the nodes by repeatedly removing one of least degree."""
+	degree = [len(adjacent) for adjacent in neighbours]
+	heap = [(d, v) for v, d in enumerate(degree)]
+	heapq.heapify(heap)
+	removed = [False] * len(neighbours)
+	order = []
+	while heap:
+		d, v = heapq.heappop(heap)
+		if removed[v] or d != degree[v]: continue
+		removed[v] = True
+		order.append(v)
+		for u in neighbours[v]:
+			if not removed[u]:
+				degree[u] -= 1
+				heapq.heappush(heap, (degree[u], u))
+	return order
+
+class _BitsetSearch:
+	"""Bron-Kerbosch over neighbourhoods held as int bitsets.
+
+	Nodes are renumbered in reverse degeneracy order, so that the
+	densest part of the graph gets the lowest bits.
+	"""
+
+	def __init__(self, nodes, neighbours):
+		order = _degeneracy_order(neighbours)
+		order.reverse()
+		position = [0] * len(order)
+		for i, v in enumerate(order):
+			position[v] = i
+		self.nodes = [nodes[v] for v in order]
+		self.min_size = 1
+		self.masks = []
+		for v in order:
+			mask = 0
+			for u in neighbours[v]:
+				mask |= 1 << position[u]
+			self.masks.append(mask)
+
+	def cliques(self):
+		"""Yields each maximal clique meeting min_size as a list of ids."""
+		masks = self.masks
+		# walking down from the top bit follows the degeneracy order, so
+		# candidates come from the lower bits and exclusions the higher
+		for v in reversed(range(len(masks))):
+			earlier = (1 << v) - 1
+			candidates = masks[v] & earlier
+			if candidates.bit_count() + 1 < self.min_size: continue
+			yield from self._expand([v], candidates, masks[v] >> (v + 1) << (v + 1))
+
+	def _expand(self, clique, candidates, excluded):
+		"""Extends clique by every possible choice from candidates."""
+		if not candidates:
+			if not excluded and len(clique) >= self.min_size:
+				yield list(clique)
+			return
+		if len(clique) + candidates.bit_count() < self.min_size: return
+		masks = self.masks
+		# pivot on the node that leaves the fewest candidates to branch on
+		best = -1
+		choices = candidates | excluded
+		while choices:
+			low = choices & -choices
+			u = low.bit_length() - 1
+			choices ^= low
+			count = (candidates & masks[u]).bit_count()
+			if count > best:
+				best, pivot = count, u
+		branches = candidates & ~masks[pivot]
+		while branches:
+			low = branches & -branches
+			v = low.bit_length() - 1
+			branches ^= low
+			clique.append(v)
+			yield from self._expand(clique, candidates & masks[v], excluded & masks[v])
+			clique.pop()
+			candidates ^= low
+			excluded |= low
+			if len(clique) + candidates.bit_count() < self.min_size: return
+
+	def maximum(self):
+		"""Returns the ids of a largest clique."""
+		self.best = []
+		self._grow([], (1 << len(self.masks)) - 1)
+		return self.best
+
+	def _grow(self, clique, candidates):
+		"""Extends clique while it could still beat the best so far."""
+		if not candidates:
+			if len(clique) > len(self.best):
+				self.best = list(clique)
+			return
+		masks = self.masks
+		# colour the candidates greedily, keeping only the nodes whose
+		# colour is high enough to matter
+		needed = len(self.best) - len(clique) + 1
+		branches = []
+		uncoloured = candidates
+		colour = 0
+		while uncoloured:
+			colour += 1
+			available = uncoloured
+			while available:
+				low = available & -available
+				v = low.bit_length() - 1
+				available ^= low
+				available &= ~masks[v]
+				uncoloured ^= low
+				if colour >= needed:
+					branches.append((v, colour))
+		# and try the most colourful first
+		for v, colour in reversed(branches):
+			if len(clique) + colour <= len(self.best): return
+			clique.append(v)
+			self._grow(clique, candidates & masks[v])
+			clique.pop()
+			candidates &= ~(1 << v)
+
+class _ArraySearch:
+	"""Bron-Kerbosch over neighbourhoods held as NumPy bool arrays."""
+
+	def __init__(self, nodes, neighbours):
+		self.nodes = nodes
+		self.min_size = 1
+		self.order = _degeneracy_order(neighbours)
+		n = len(neighbours)
+		self.matrix = numpy.zeros((n, n), dtype=bool)
+		for v, adjacent in enumerate(neighbours):
+			self.matrix[v, list(adjacent)] = True
+
+	def cliques(self):
+		"""Yields each maximal clique meeting min_size as a list of ids."""
+		matrix = self.matrix
+		later = numpy.ones(len(matrix), dtype=bool)
+		for v in self.order:
+			later[v] = False
+			candidates = matrix[v] & later
+			if numpy.count_nonzero(candidates) + 1 < self.min_size: continue
+			excluded = matrix[v] & ~later
+			yield from self._expand([v], candidates, excluded)
+
+	def _expand(self, clique, candidates, excluded):
+		"""Extends clique by every possible choice from candidates."""
+		remaining = numpy.count_nonzero(candidates)
+		if not remaining:
+			if not excluded.any() and len(clique) >= self.min_size:
+				yield list(clique)
+			return
+		if len(clique) + remaining < self.min_size: return
+		matrix = self.matrix
+		# pivot on the node that leaves the fewest candidates to branch on
+		choices = numpy.flatnonzero(candidates | excluded)
+		counts = numpy.count_nonzero(matrix[choices] & candidates, axis=1)
+		pivot = choices[numpy.argmax(counts)]
+		candidates = candidates.copy()
+		excluded = excluded.copy()
+		for v in numpy.flatnonzero(candidates & ~matrix[pivot]).tolist():
+			clique.append(v)
+			yield from self._expand(clique, candidates & matrix[v], excluded & matrix[v])
+			clique.pop()
+			candidates[v] = False
+			excluded[v] = True
+			remaining -= 1
+			if len(clique) + remaining < self.min_size: return
@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+
+"""
+coloring.py
+
+Licensed under GPLv3
+
+This module contains greedy graph colorings for Graphine graphs,
+such as interference graphs in register or resource allocation.
+
+greedy_color() gives every node the smallest color, counting from
+zero, that none of its neighbours already has, and the strategy
+decides which node goes next:
+
+	largest_first: nodes in order of decreasing degree.
+	smallest_last: repeatedly remove a node of least remaining
+		degree, then color them in the reverse of that order.
+	dsatur: always the uncolored node with the most distinct colors
+		among its neighbours, breaking ties by degree.
+
+Each runs in O((V + E) log V) over a snapshot of the graph, keeping
+its priorities in a heap rather than rescanning the nodes. Direction,
+loops and parallel edges are all ignored.
+"""
+
+# This file is part of Graphine.
+#
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+
+def greedy_color(graph, strategy="dsatur", attribute=None):
+	"""Colors the nodes of graph so that no two neighbours match.
+
+	strategy is one of "largest_first", "smallest_last" or "dsatur".
+	Returns a dict mapping each node to its color, an int from zero.
+	If attribute is given, each node's color is also stored on it
+	under that name.
+
+	Raises ValueError for an unknown strategy.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('c', 'd')})
+		>>> colors = greedy_color(g, attribute="color")
+		>>> len(set(colors.values()))
+		3
+		>>> g['d'].color != g['c'].color
+		True
+	"""
+	if strategy not in _STRATEGIES:
+		raise ValueError("unknown coloring strategy %r" % (strategy,))
+	snapshot = graph.snapshot(undirected=True)
+	neighbours = []
+	for i, adjacent in enumerate(snapshot.successor_lists()):
+		adjacent = set(adjacent)
+		adjacent.discard(i)
+		neighbours.append(list(adjacent))
+	colors = _STRATEGIES[strategy](neighbours)
+	nodes = snapshot.nodes
+	if attribute is not None:
+		for node, color in zip(nodes, colors):
+			setattr(node, attribute, color)
+	return dict(zip(nodes, colors))
+
+def _color_in_order(neighbours, order):
+	"""Greedily colors the nodes in the given order."""
+	n = len(neighbours)
+	colors = [-1] * n
+	# taken[c] == v marks color c as used around node v
+	taken = [-1] * (n + 1)
+	for v in order:
+		for u in neighbours[v]:
+			if colors[u] >= 0:
+				taken[colors[u]] = v
+		color = 0
+		while taken[color] == v:
+			color += 1
+		colors[v] = color
+	return colors
+
+def _largest_first(neighbours):
+	"""Colors the nodes in order of decreasing degree."""
+	order = sorted(range(len(neighbours)), key=lambda v: len(neighbours[v]), reverse=True)
+	return _color_in_order(neighbours, order)
+
+def _smallest_last(neighbours):
+	"""Colors the nodes in reverse order of removing the least connected."""
+	degree = [len(adjacent) for adjacent in neighbours]
+	heap = [(d, v) for v, d in enumerate(degree)]
+	heapq.heapify(heap)
+	removed = [False] * len(neighbours)
+	order = []
+	while heap:
+		d, v = heapq.heappop(heap)
+		if removed[v] or d != degree[v]: continue
+		removed[v] = True
+		order.append(v)
+		for u in neighbours[v]:
+			if not removed[u]:
+				degree[u] -= 1
+				heapq.heappush(heap, (degree[u], u))
+	order.reverse()
+	return _color_in_order(neighbours, order)
+
+def _dsatur(neighbours):
+	"""Colors the most constrained node first, as per Brelaz."""
+	n = len(neighbours)
+	colors = [-1] * n
+	# the distinct colors around each node, and its uncolored degree
+	seen = [set() for i in range(n)]
+	degree = [len(adjacent) for adjacent in neighbours]
+	# entries are (-saturation, -degree, node), and go stale as they change
+	heap = [(0, -d, v) for v, d in enumerate(degree)]
+	heapq.heapify(heap)
+	taken = [-1] * (n + 1)
+	while heap:
+		saturation, d, v = heapq.heappop(heap)
+		if colors[v] >= 0 or -saturation != len(seen[v]) or -d != degree[v]: continue
+		for u in neighbours[v]:
+			if colors[u] >= 0:
+				taken[colors[u]] = v
+		color = 0
+		while taken[color] == v:
+			color += 1
+		colors[v] = color
+		for u in neighbours[v]:
+			if colors[u] < 0:
+				seen[u].add(color)
+				degree[u] -= 1
+				heapq.heappush(heap, (-len(seen[u]), -degree[u], u))
+	return colors
+
+_STRATEGIES = {
+	"largest_first": _largest_first,
+	"smallest_last": _smallest_last,
+	"dsatur": _dsatur,
+}
@@ -0,0 +1,223 @@
+#! /usr/bin/env python3
+
+"""
+community.py
+
+Licensed under GPLv3
+
+This module contains modularity-based community detection for
+Graphine graphs.
+
+louvain() runs the Louvain method over an integer-indexed weighted
+adjacency built from a Snapshot: it moves nodes between communities
+while that improves modularity, then collapses every community into a
+single node and repeats on the smaller graph. The collapsing is done
+for a whole partition at once in a single pass over the edges, rather
+than an edge at a time as Graph.contract_edge would; aggregate()
+exposes the same operation for Graphs.
+
+Communities are found on the undirected graph: edge direction is
+ignored, and parallel edges add their weights together.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import random
+from collections import namedtuple, defaultdict
+
+Communities = namedtuple("Communities", "labels graph modularity")
+Communities.__doc__ = """The result of louvain().
+
+labels maps each node to a community number, graph is the graph with
+each community collapsed into a node of that name, and modularity is
+the modularity of the partition.
+"""
+
+def louvain(graph, weight=None, resolution=1.0, seed=None):
+	"""Partitions graph into communities using the Louvain method.
+
+	weight, if given, should be a callable that accepts an edge and
+	returns its non-negative weight; otherwise each edge weighs 1.
+	Higher resolutions favour smaller communities. seed makes the
+	order in which nodes are visited, and so the result, reproducible.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a'), ('d', 'e'), ('e', 'f'), ('f', 'd'), ('c', 'd')})
+		>>> result = louvain(g, seed=1)
+		>>> result.labels[g['a']] == result.labels[g['b']] != result.labels[g['f']]
+		True
+		>>> result.graph.order
+		2
+	"""
+	nodes, original = _weighted_adjacency(graph, weight)
+	rng = random.Random(seed)
+	# labels[i] is the community of original node i
+	labels = list(range(len(nodes)))
+	adjacency = original
+	while True:
+		communities, moved = _move_nodes(adjacency, resolution, rng)
+		if not moved:
+			break
+		labels = [communities[c] for c in labels]
+		adjacency = _aggregate(adjacency, communities)
+	labels, count = _renumber(labels)
+	adjacency = _aggregate(original, labels, count)
+	return Communities({nodes[i]: labels[i] for i in range(len(nodes))}, _to_graph(type(graph), adjacency), _modularity(adjacency, resolution))
+
+def aggregate(graph, labels, weight=None):
+	"""Collapses each part of a partition of graph into a single node.
+
+	labels should map every node (or node name) to a hashable label;
+	the new graph has one node per label, named after it. Each pair of
+	parts joined by edges gets one undirected edge whose weight
+	attribute is their total weight, and the weight inside each part
+	becomes a loop. This takes a single pass over the edges.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c')})
+		>>> h = aggregate(g, {'a': 0, 'b': 0, 'c': 1})
+		>>> h[frozenset((0, 1))].weight
+		1
+	"""
+	if weight is None: weight = lambda e: 1
+	parts = {}
+	for node, label in labels.items():
+		parts[graph.get_node(node)] = label
+	totals = defaultdict(int)
+	for edge in graph.edges:
+		start = parts[edge.start]
+		end = parts[edge.end]
+		key = (start, end) if start == end else frozenset((start, end))
+		totals[key] += weight(edge)
+	g = type(graph)()
+	for label in set(parts.values()):
+		g.add_node(label)
+	for key, total in totals.items():
+		start, end = key
+		g.add_edge(start, end, key, is_directed=False, weight=total)
+	return g
+
+def modularity(graph, labels, weight=None, resolution=1.0):
+	"""Returns the modularity of the partition of graph given by labels.
+
+	labels maps nodes (or node names) to community labels, and weight
+	is as for louvain().
+	"""
+	nodes, adjacency = _weighted_adjacency(graph, weight)
+	index = {node: i for i, node in enumerate(nodes)}
+	partition = [None] * len(nodes)
+	for node, label in labels.items():
+		partition[index[graph.get_node(node)]] = label
+	partition, count = _renumber(partition)
+	return _modularity(_aggregate(adjacency, partition, count), resolution)
+
+def _weighted_adjacency(graph, weight):
+	"""Returns the nodes and a list of {neighbour id: weight} dicts.
+
+	Loops are stored with twice their weight, so that the sum of a
+	node's entries is its weighted degree.
+	"""
+	snapshot = graph.snapshot(get_weight=weight or (lambda e: 1), undirected=True)
+	offsets = snapshot.offsets
+	targets = snapshot.targets
+	weights = snapshot.weights
+	adjacency = []
+	for i in range(snapshot.order):
+		adjacent = defaultdict(float)
+		for slot in range(offsets[i], offsets[i+1]):
+			j = targets[slot]
+			adjacent[j] += weights[slot] * (2 if j == i else 1)
+		adjacency.append(adjacent)
+	return snapshot.nodes, adjacency
+
+def _move_nodes(adjacency, resolution, rng):
+	"""Moves nodes between communities while modularity improves.
+
+	Returns the community of each node, numbered from 0, and whether
+	any node ended up outside its starting community.
+	"""
+	n = len(adjacency)
+	degree = [sum(adjacent.values()) for adjacent in adjacency]
+	total = sum(degree)
+	community = list(range(n))
+	if not total:
+		return community, False
+	# the total degree of each community
+	totals = list(degree)
+	order = list(range(n))
+	moved = False
+	improved = True
+	while improved:
+		improved = False
+		rng.shuffle(order)
+		for i in order:
+			current = community[i]
+			# the weight from i to each neighbouring community
+			links = defaultdict(float)
+			for j, w in adjacency[i].items():
+				if j != i:
+					links[community[j]] += w
+			totals[current] -= degree[i]
+			factor = resolution * degree[i] / total
+			best = current
+			best_gain = links.get(current, 0.0) - factor * totals[current]
+			for c, w in links.items():
+				gain = w - factor * totals[c]
+				if gain > best_gain:
+					best, best_gain = c, gain
+			totals[best] += degree[i]
+			if best != current:
+				community[i] = best
+				improved = moved = True
+	community, count = _renumber(community)
+	return community, moved
+
+def _renumber(labels):
+	"""Renumbers labels to 0, 1, ... in order of first appearance."""
+	numbers = {}
+	renumbered = [numbers.setdefault(label, len(numbers)) for label in labels]
+	return renumbered, len(numbers)
+
+def _aggregate(adjacency, communities, count=None):
+	"""Collapses each community into one node in a single O(E) pass."""
+	if count is None: count = max(communities, default=-1) + 1
+	collapsed = [defaultdict(float) for c in range(count)]
+	for i, adjacent in enumerate(adjacency):
+		row = collapsed[communities[i]]
+		for j, w in adjacent.items():
+			row[communities[j]] += w
+	return collapsed
+
+def _modularity(adjacency, resolution):
+	"""Returns the modularity of an aggregated adjacency."""
+	degree = [sum(adjacent.values()) for adjacent in adjacency]
+	total = sum(degree)
+	if not total: return 0.0
+	inside = sum(adjacent.get(c, 0.0) for c, adjacent in enumerate(adjacency))
+	return inside / total - resolution * sum((d / total) ** 2 for d in degree)
+
+def _to_graph(graph_type, adjacency):
+	"""Turns an aggregated adjacency into a graph_type with weighted edges."""
+	g = graph_type()
+	for c in range(len(adjacency)):
+		g.add_node(c)
+	for c, adjacent in enumerate(adjacency):
+		for d, w in adjacent.items():
+			if c == d:
+				g.add_edge(c, c, (c, c), is_directed=False, weight=w / 2)
+			elif c < d:
+				g.add_edge(c, d, frozenset((c, d)), is_directed=False, weight=w)
+	return g
@@ -0,0 +1,273 @@
+#! /usr/bin/env python3
+
+"""
+flow.py
+
+Licensed under GPLv3
+
+This module contains maximum flow and minimum cut algorithms for
+Graphine graphs.
+
+maximum_flow() treats each edge as a pipe with a capacity, taken from
+an attribute or a callable, and finds how much can be sent from a
+source node to a sink. By default it uses Dinic's algorithm, which
+repeatedly builds a level graph by breadth first search and saturates
+it with a blocking flow; FIFO push-relabel is available as an
+alternative. Both work on integer-indexed residual arrays rather than
+on the graph itself.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple, deque
+
+Flow = namedtuple("Flow", "value flows partition")
+Flow.__doc__ = """The result of maximum_flow().
+
+value is the total flow from source to sink. flows maps every edge
+to the flow along it, which for an undirected edge is negative if it
+runs from the edge's end to its start. partition is a pair of sets of
+nodes, those on the source's side of a minimum cut and those on the
+sink's; the edges from the first to the second are saturated, and
+their capacities add up to value.
+"""
+
+def maximum_flow(graph, source, sink, capacity="capacity", method="dinic"):
+	"""Finds a maximum flow from source to sink and a minimum cut.
+
+	capacity is either the name of the edge attribute holding each
+	edge's capacity or a callable that accepts an edge and returns
+	it. Capacities must be non-negative. Undirected edges can carry
+	flow either way, up to their capacity.
+
+	method is "dinic" or "push-relabel".
+
+	Usage:
+		>>> g = Graph()
+		>>> for start, end, c in [('s', 'a', 3), ('s', 'b', 2), ('a', 'b', 1), ('a', 't', 2), ('b', 't', 3)]:
+		... 	e = g.add_edge(start, end, capacity=c)
+		>>> result = maximum_flow(g, 's', 't')
+		>>> result.value
+		5
+		>>> sorted(n.name for n in result.partition[0])
+		['s']
+	"""
+	if isinstance(capacity, str):
+		attribute = capacity
+		capacity = lambda edge: getattr(edge, attribute)
+	network = _Residual(graph, capacity)
+	s = network.index[graph.get_node(source)._name]
+	t = network.index[graph.get_node(sink)._name]
+	if s == t:
+		raise ValueError("source and sink must be different nodes")
+	if method == "dinic":
+		value = network.dinic(s, t)
+	elif method == "push-relabel":
+		value = network.push_relabel(s, t)
+	else:
+		raise ValueError("unknown maximum flow method %r" % method)
+	return Flow(value, network.edge_flows(), network.partition(s))
+
+
+class _Residual:
+	"""The residual network of a graph, held in flat lists.
+
+	Each edge becomes a pair of arcs 2i and 2i+1, each the other's
+	reverse, so arc a's reverse is a ^ 1. heads holds each arc's end
+	node, residual its remaining capacity, and the arcs leaving node
+	v are arcs[offsets[v]:offsets[v+1]].
+	"""
+
+	def __init__(self, graph, capacity):
+		self.nodes = list(graph.nodes)
+		self.index = {node._name: i for i, node in enumerate(self.nodes)}
+		self.edges = list(graph.edges)
+		n = len(self.nodes)
+		heads = []
+		residual = []
+		self.original = []
+		for edge in self.edges:
+			c = capacity(edge)
+			if c < 0:
+				raise ValueError("%s has a negative capacity" % edge)
+			start, end = self.index[edge._start._name], self.index[edge._end._name]
+			heads += [end, start]
+			if start == end:
+				# loops can never carry useful flow
+				residual += [0, 0]
+			else:
+				# an undirected edge can carry its capacity either way
+				residual += [c, c if not edge._directed else 0]
+			self.original.append(c)
+		self.heads = heads
+		self.residual = residual
+		# group the arcs by the node they leave
+		tails = [heads[a ^ 1] for a in range(len(heads))]
+		counts = [0] * (n + 1)
+		for v in tails:
+			counts[v + 1] += 1
+		for v in range(n):
+			counts[v + 1] += counts[v]
+		self.offsets = counts[:]
+		arcs = [0] * len(heads)
+		for a, v in enumerate(tails):
+			arcs[counts[v]] = a
+			counts[v] += 1
+		self.arcs = arcs
+
+	def _levels(self, s, t):
+		"""Labels nodes with their BFS distance from s in the residual graph."""
+		level = [-1] * len(self.nodes)
+		level[s] = 0
+		queue = deque([s])
+		heads, residual, arcs, offsets = self.heads, self.residual, self.arcs, self.offsets
+		while queue:
+			v = queue.popleft()
+			for a in arcs[offsets[v]:offsets[v+1]]:
+				w = heads[a]
+				if level[w] < 0 and residual[a] > 0:
+					level[w] = level[v] + 1
+					if w == t: return level
+					queue.append(w)
+		return level
+
+	def dinic(self, s, t):
+		"""Runs Dinic's algorithm and returns the value of the flow."""
+		heads, residual, arcs, offsets = self.heads, self.residual, self.arcs, self.offsets
+		value = 0
+		while True:
+			level = self._levels(s, t)
+			if level[t] < 0: return value
+			# the next untried arc of each node, in arcs
+			current = offsets[:-1]
+			path = []
+			v = s
+			while True:
+				if v == t:
+					# push the bottleneck along the path
+					pushed = min(residual[a] for a in path)
+					for a in path:
+						residual[a] -= pushed
+						residual[a ^ 1] += pushed
+					value += pushed
+					# back up to the tail of the first saturated arc
+					k = next(i for i, a in enumerate(path) if not residual[a])
+					del path[k:]
+					v = heads[path[-1]] if path else s
+					continue
+				end = offsets[v+1]
+				i = current[v]
+				while i < end:
+					a = arcs[i]
+					w = heads[a]
+					if residual[a] > 0 and level[w] == level[v] + 1:
+						break
+					i += 1
+				current[v] = i
+				if i < end:
+					path.append(arcs[i])
+					v = heads[arcs[i]]
+				elif path:
+					# v is a dead end for this phase
+					level[v] = -1
+					a = path.pop()
+					v = heads[a ^ 1]
+					current[v] += 1
+				else:
+					break
+
+	def push_relabel(self, s, t):
+		"""Runs FIFO push-relabel and returns the value of the flow.
+
+		With float capacities, subtraction leaves crumbs of excess and
+		residual capacity behind, which would otherwise be pushed back
+		and forth forever; anything within epsilon of zero is treated
+		as zero.
+		"""
+		heads, residual, arcs, offsets = self.heads, self.residual, self.arcs, self.offsets
+		n = len(self.nodes)
+		# far below the smallest unit any integer capacity can have
+		epsilon = 1e-12 * sum(self.original)
+		height = [0] * n
+		height[s] = n
+		excess = [0] * n
+		current = offsets[:-1]
+		active = deque()
+		for a in arcs[offsets[s]:offsets[s+1]]:
+			pushed = residual[a]
+			if pushed <= epsilon: continue
+			w = heads[a]
+			residual[a] = 0
+			residual[a ^ 1] += pushed
+			excess[w] += pushed
+			excess[s] -= pushed
+			if w != s and w != t and excess[w] == pushed:
+				active.append(w)
+		while active:
+			v = active.popleft()
+			end = offsets[v+1]
+			while excess[v] > epsilon:
+				i = current[v]
+				if i == end:
+					# relabel to just above the lowest residual neighbour
+					lowest = min((height[heads[a]] for a in arcs[offsets[v]:end] if residual[a] > epsilon), default=None)
+					if lowest is None:
+						# only rounding error can strand excess like this
+						break
+					height[v] = 1 + lowest
+					current[v] = offsets[v]
+					continue
+				a = arcs[i]
+				w = heads[a]
+				if residual[a] > epsilon and height[v] == height[w] + 1:
+					pushed = min(excess[v], residual[a])
+					residual[a] -= pushed
+					if residual[a] <= epsilon: residual[a] = 0
+					residual[a ^ 1] += pushed
+					excess[v] -= pushed
+					if w != s and w != t and excess[w] <= epsilon:
+						active.append(w)
+					excess[w] += pushed
+				else:
+					current[v] = i + 1
+		return excess[t]
+
+	def edge_flows(self):
+		"""Maps each edge to the flow it carries from start to end."""
+		flows = {}
+		for i, edge in enumerate(self.edges):
+			if edge._start is edge._end:
+				flows[edge] = 0
+			else:
+				flows[edge] = self.original[i] - self.residual[2 * i]
+		return flows
+
+	def partition(self, s):
+		"""Splits the nodes by whether s still reaches them in the residual graph."""
+		seen = [False] * len(self.nodes)
+		seen[s] = True
+		stack = [s]
+		heads, residual, arcs, offsets = self.heads, self.residual, self.arcs, self.offsets
+		while stack:
+			v = stack.pop()
+			for a in arcs[offsets[v]:offsets[v+1]]:
+				w = heads[a]
+				if not seen[w] and residual[a] > 0:
+					seen[w] = True
+					stack.append(w)
+		near = {node for node, reached in zip(self.nodes, seen) if reached}
+		far = {node for node, reached in zip(self.nodes, seen) if not reached}
+		return near, far
@@ -0,0 +1,199 @@
+#! /usr/bin/env python3
+
+"""
+hyperanf.py
+
+Licensed under GPLv3
+
+This module contains HyperANF, the approximate neighbourhood function
+of Boldi, Rosa and Vigna, for Graphine graphs. It requires NumPy.
+
+The neighbourhood function N(h) counts the pairs of nodes (x, y) for
+which y can be reached from x in at most h steps. Computing it
+exactly takes a breadth first search from every node; HyperANF
+instead gives each node a HyperLogLog counter of the nodes it can
+reach, and grows them all one step at a time by taking the union of
+each node's counter with those of its successors. A union of two
+HyperLogLog counters is just the elementwise maximum of their
+registers, so each step is a handful of vectorized NumPy operations
+over the CSR arrays of a snapshot, and the whole computation needs
+two bytes per register per node.
+
+From N(h) come the distance distribution and so the average distance
+and effective diameter. Several independent runs are averaged, and
+their spread gives bounds on both.
+"""
+
+# This file is part of Graphine.
+#
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+
+import numpy
+
+from graph.extras.arrays import csr
+
+# the most adjacency entries gathered at once while taking unions
+BLOCK = 1 << 16
+
+Estimate = namedtuple("Estimate", "value low high")
+Estimate.__doc__ = """An estimate together with its lower and upper bounds."""
+
+NeighbourhoodFunction = namedtuple("NeighbourhoodFunction", "counts average_distance effective_diameter relative_error")
+NeighbourhoodFunction.__doc__ = """The result of hyperanf().
+
+counts[h] is the estimated number of pairs within distance h, so
+counts[0] is about the number of nodes and counts[-1] the number of
+reachable pairs. average_distance and effective_diameter are
+Estimates over the pairs at distance one or more, and relative_error
+is the standard error of each count as a fraction of it.
+"""
+
+def hyperanf(graph, registers=64, runs=4, quantile=0.9, z=2.0, max_distance=None, undirected=False, seed=None):
+	"""Approximates the neighbourhood function of graph.
+
+	registers is the number of HyperLogLog registers per node, a power
+	of two of at least 16. Each run hashes the nodes differently, and
+	the counts are averaged over runs, so their relative standard
+	error is about 1.04 / sqrt(registers * runs). Runs are made one
+	after another, so memory use is two bytes per register per node
+	whatever their number.
+
+	The effective diameter is the distance within which the given
+	quantile of reachable pairs lie, interpolated between whole
+	distances. The bounds on it and on the average distance are z
+	standard errors either side of their mean over the runs, so need
+	at least two runs; with one they collapse onto the estimate.
+
+	Iteration stops when no counter changes, or after max_distance
+	steps. If undirected is True, every edge can be followed either
+	way. seed makes the hashing reproducible.
+
+	Raises ValueError if registers is not a power of two of at least
+	16, or if runs is less than one.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'd')})
+		>>> result = hyperanf(g, seed=1)
+		>>> [round(count) for count in result.counts]
+		[4, 7, 9, 10]
+	"""
+	if registers < 16 or registers & (registers - 1):
+		raise ValueError("registers must be a power of two of at least 16")
+	if runs < 1:
+		raise ValueError("there must be at least one run")
+	arrays = csr(graph, undirected=undirected)
+	salts = numpy.random.SeedSequence(seed).generate_state(runs, dtype=numpy.uint64)
+	results = [_run(arrays, registers, salt, max_distance) for salt in salts]
+	# pad the shorter runs with their final count, and average them
+	length = max(len(counts) for counts in results)
+	results = numpy.array([counts + counts[-1:] * (length - len(counts)) for counts in results])
+	counts = results.mean(axis=0)
+	summaries = numpy.array([_summarize(row, quantile) for row in results])
+	estimates = []
+	for value, column in zip(_summarize(counts, quantile), summaries.T):
+		spread = float(z * column.std(ddof=1) / numpy.sqrt(runs)) if runs > 1 else 0.0
+		estimates.append(Estimate(value, value - spread, value + spread))
+	error = 1.04 / numpy.sqrt(registers * runs)
+	return NeighbourhoodFunction(counts.tolist(), estimates[0], estimates[1], float(error))
+
+def _run(arrays, registers, salt, max_distance):
+	"""Returns the neighbourhood function counts for one hashing."""
+	offsets, targets = arrays.offsets, arrays.targets
+	counters = _initialize(arrays.snapshot.order, registers, salt)
+	# 2 ** -r for every possible register value
+	powers = numpy.ldexp(1.0, -numpy.arange(66))
+	counts = [_count(counters, powers)]
+	blocks = _blocks(offsets)
+	while max_distance is None or len(counts) <= max_distance:
+		updated = counters.copy()
+		for first, last in blocks:
+			start, end = offsets[first], offsets[last]
+			if start == end: continue
+			# each node's union is the maximum over its successors' rows
+			degrees = numpy.diff(offsets[first:last+1])
+			busy = numpy.flatnonzero(degrees) + first
+			unions = numpy.maximum.reduceat(counters[targets[start:end]], offsets[busy] - start, axis=0)
+			numpy.maximum(updated[busy], unions, out=unions)
+			updated[busy] = unions
+		if numpy.array_equal(updated, counters): break
+		counters = updated
+		counts.append(_count(counters, powers))
+	return counts
+
+def _initialize(n, registers, salt):
+	"""Returns one HyperLogLog counter per node, each holding that node."""
+	bits = registers.bit_length() - 1
+	with numpy.errstate(over="ignore"):
+		# splitmix64 of each node id, offset by the salt
+		x = numpy.arange(n, dtype=numpy.uint64) + salt
+		x += numpy.uint64(0x9E3779B97F4A7C15)
+		x = (x ^ (x >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+		x = (x ^ (x >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+		x ^= x >> numpy.uint64(31)
+	# the top bits pick the register, and the rest give the rank
+	index = (x >> numpy.uint64(64 - bits)).astype(numpy.int64)
+	rest = x << numpy.uint64(bits)
+	# count the leading zeros of the rest by binary search
+	zeros = numpy.zeros(n, dtype=numpy.int64)
+	for shift in (32, 16, 8, 4, 2, 1):
+		empty = (rest >> numpy.uint64(64 - shift)) == 0
+		zeros += numpy.where(empty, shift, 0)
+		rest = numpy.where(empty, rest << numpy.uint64(shift), rest)
+	zeros += ((rest >> numpy.uint64(63)) == 0).astype(numpy.int64)
+	counters = numpy.zeros((n, registers), dtype=numpy.uint8)
+	counters[numpy.arange(n), index] = numpy.minimum(zeros, 64 - bits) + 1
+	return counters
+
+def _count(counters, powers):
+	"""Sums the HyperLogLog estimates of all the counters."""
+	n, m = counters.shape
+	if not n: return 0.0
+	if m == 16: alpha = 0.673
+	elif m == 32: alpha = 0.697
+	elif m == 64: alpha = 0.709
+	else: alpha = 0.7213 / (1 + 1.079 / m)
+	estimates = alpha * m * m / powers[counters].sum(axis=1)
+	# small cardinalities are better estimated by linear counting
+	zeros = numpy.count_nonzero(counters == 0, axis=1)
+	small = (estimates <= 2.5 * m) & (zeros > 0)
+	estimates[small] = m * numpy.log(m / zeros[small])
+	return float(estimates.sum())
+
+def _blocks(offsets):
+	"""Splits the nodes into ranges with about BLOCK entries each."""
+	n = len(offsets) - 1
+	blocks = []
+	first = 0
+	while first < n:
+		last = int(numpy.searchsorted(offsets, offsets[first] + BLOCK, side="right")) - 1
+		last = min(max(last, first + 1), n)
+		blocks.append((first, last))
+		first = last
+	return blocks
+
+def _summarize(counts, quantile):
+	"""Returns the average distance and effective diameter from counts."""
+	span = counts[-1] - counts[0]
+	if span <= 0:
+		return 0.0, 0.0
+	# the fraction of pairs at distance one or more lying within h
+	fraction = numpy.clip((numpy.asarray(counts) - counts[0]) / span, 0.0, 1.0)
+	average = float((1 - fraction[:-1]).sum())
+	h = int(numpy.searchsorted(fraction, quantile))
+	if h == 0:
+		return average, 0.0
+	below, above = fraction[h-1], fraction[h]
+	return average, h - 1 + float((quantile - below) / (above - below))
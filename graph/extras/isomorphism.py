@@ -0,0 +1,251 @@
+#! /usr/bin/env python3
+
+"""
+isomorphism.py
+
+Licensed under GPLv3
+
+This module contains structural pattern matching for Graphine graphs.
+
+Graph.contains only compares names; Matcher finds every place a small
+pattern graph occurs in a larger one regardless of what things are
+called. It is a subgraph monomorphism search in the style of VF2++:
+each pattern node's candidates are pruned by degree and by a
+compatibility predicate up front, the pattern is matched in an order
+that keeps each new node connected to those already matched, and
+candidates are drawn from the neighbourhood of a node that is already
+mapped rather than from the whole graph.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+class _Structure:
+	"""Integer-indexed adjacency of a graph, split by edge kind.
+
+	outgoing[i], incoming[i] and undirected[i] map neighbour ids to
+	the list of edges of that kind joining them to node i.
+	"""
+
+	def __init__(self, graph):
+		self.nodes = list(graph.nodes)
+		index = {node._name: i for i, node in enumerate(self.nodes)}
+		n = len(self.nodes)
+		self.outgoing = [{} for i in range(n)]
+		self.incoming = [{} for i in range(n)]
+		self.undirected = [{} for i in range(n)]
+		for edge in graph.edges:
+			start = index[edge._start._name]
+			end = index[edge._end._name]
+			if edge._directed:
+				self.outgoing[start].setdefault(end, []).append(edge)
+				self.incoming[end].setdefault(start, []).append(edge)
+			else:
+				self.undirected[start].setdefault(end, []).append(edge)
+				if start != end:
+					self.undirected[end].setdefault(start, []).append(edge)
+
+	def degrees(self, i):
+		"""Returns the numbers of distinct out, in and undirected neighbours of i."""
+		return len(self.outgoing[i]), len(self.incoming[i]), len(self.undirected[i])
+
+
+class Matcher:
+	"""Finds the occurrences of a pattern graph inside a larger graph.
+
+	An occurrence maps each pattern node to a different graph node
+	such that every pattern edge has a counterpart of the same kind
+	(directed the same way, or undirected) between the corresponding
+	graph nodes. The graph may have extra edges, ie, the occurrence
+	need not be an induced subgraph. Parallel pattern edges each
+	need a graph edge of their own: no single graph edge can stand
+	in for two of them.
+
+	node_match, if given, is called with a pattern node and a graph
+	node and should return True if they are compatible; edge_match
+	does the same for edges. Use them to match on types or other
+	attributes.
+
+	Usage:
+		>>> pattern = Graph(edges={('x', 'y'), ('y', 'z'), ('z', 'x')})
+		>>> g = Graph(edges={(1, 2), (2, 3), (3, 1), (3, 4)})
+		>>> matcher = Matcher(pattern, g)
+		>>> matcher.count()
+		3
+		>>> m = next(matcher.matches())
+		>>> sorted(n.name for n in m.values())
+		[1, 2, 3]
+	"""
+
+	def __init__(self, pattern, graph, node_match=None, edge_match=None):
+		"""Indexes both graphs and works out the matching order."""
+		self.pattern = _Structure(pattern)
+		self.graph = _Structure(graph)
+		self.edge_match = edge_match
+		self._domains = self._get_domains(node_match)
+		self._plan = self._get_plan()
+
+	def _get_domains(self, node_match):
+		"""Marks the graph nodes each pattern node could map to."""
+		p, g = self.pattern, self.graph
+		graph_degrees = [g.degrees(v) for v in range(len(g.nodes))]
+		domains = []
+		for u, pattern_node in enumerate(p.nodes):
+			out, inc, und = p.degrees(u)
+			domain = set()
+			for v, (g_out, g_inc, g_und) in enumerate(graph_degrees):
+				if g_out < out or g_inc < inc or g_und < und: continue
+				if node_match is None or node_match(pattern_node, g.nodes[v]):
+					domain.add(v)
+			domains.append(domain)
+		return domains
+
+	def _get_plan(self):
+		"""Chooses the order in which to match the pattern nodes.
+
+		Each step is (u, anchor, checks): anchor is None or the
+		(step, kind) of an earlier node whose graph neighbours of that
+		kind supply u's candidates, and checks lists, for each earlier
+		step joined to u, the pattern edges that must be mirrored.
+		"""
+		p = self.pattern
+		n = len(p.nodes)
+		degree = [sum(p.degrees(u)) for u in range(n)]
+		placed = {}
+		plan = []
+		while len(placed) < n:
+			# prefer nodes tied to many placed nodes, then rare, then busy ones
+			def priority(u):
+				links = sum(1 for v in placed if v in p.outgoing[u] or v in p.incoming[u] or v in p.undirected[u])
+				return (-links, len(self._domains[u]), -degree[u])
+			u = min((u for u in range(n) if u not in placed), key=priority)
+			anchor = None
+			checks = []
+			for v, step in placed.items():
+				out = p.outgoing[u].get(v, [])
+				inc = p.incoming[u].get(v, [])
+				und = p.undirected[u].get(v, [])
+				if not (out or inc or und): continue
+				checks.append((step, out, inc, und))
+				if anchor is None:
+					# u's candidates are v's graph neighbours the other way round
+					kind = "incoming" if out else "outgoing" if inc else "undirected"
+					anchor = (step, kind)
+			loops = (p.outgoing[u].get(u, []), p.undirected[u].get(u, []))
+			placed[u] = len(plan)
+			plan.append((u, anchor, checks, loops))
+		return plan
+
+	def _covers(self, pattern_edges, graph_edges):
+		"""Checks that graph_edges can stand in for pattern_edges.
+
+		With edge_match, this needs a matching that gives every
+		pattern edge a different compatible graph edge, found by
+		augmenting paths; there are rarely more than a few of either.
+		"""
+		if not pattern_edges: return True
+		if graph_edges is None or len(graph_edges) < len(pattern_edges): return False
+		if self.edge_match is None: return True
+		match = self.edge_match
+		if len(pattern_edges) == 1:
+			return any(match(pattern_edges[0], f) for f in graph_edges)
+		options = [[j for j, f in enumerate(graph_edges) if match(e, f)] for e in pattern_edges]
+		# the pattern edge each graph edge has been given to
+		owner = {}
+		def assign(i, seen):
+			for j in options[i]:
+				if j in seen: continue
+				seen.add(j)
+				if j not in owner or assign(owner[j], seen):
+					owner[j] = i
+					return True
+			return False
+		return all(assign(i, set()) for i in range(len(options)))
+
+	def _candidates(self, step, mapping, used):
+		"""Yields the graph nodes that the pattern node at step can map to."""
+		u, anchor, checks, loops = self._plan[step]
+		g = self.graph
+		domain = self._domains[u]
+		if anchor is None:
+			pool = domain
+		else:
+			pool = getattr(g, anchor[1])[mapping[anchor[0]]]
+		covers = self._covers
+		for v in pool:
+			if v in used or v not in domain: continue
+			if not covers(loops[0], g.outgoing[v].get(v)): continue
+			if not covers(loops[1], g.undirected[v].get(v)): continue
+			for earlier, out, inc, und in checks:
+				w = mapping[earlier]
+				if not covers(out, g.outgoing[v].get(w)): break
+				if not covers(inc, g.incoming[v].get(w)): break
+				if not covers(und, g.undirected[v].get(w)): break
+			else:
+				yield v
+
+	def matches(self):
+		"""Lazily yields each occurrence as a dict of pattern node -> graph node."""
+		plan = self._plan
+		if not plan:
+			yield {}
+			return
+		p_nodes, g_nodes = self.pattern.nodes, self.graph.nodes
+		mapping = [None] * len(plan)
+		used = set()
+		# an explicit stack of candidate iterators, one per step
+		stack = [self._candidates(0, mapping, used)]
+		while stack:
+			step = len(stack) - 1
+			if mapping[step] is not None:
+				used.discard(mapping[step])
+				mapping[step] = None
+			v = next(stack[-1], None)
+			if v is None:
+				stack.pop()
+				continue
+			mapping[step] = v
+			used.add(v)
+			if step + 1 == len(plan):
+				yield {p_nodes[plan[s][0]]: g_nodes[mapping[s]] for s in range(len(plan))}
+			else:
+				stack.append(self._candidates(step + 1, mapping, used))
+
+	def count(self):
+		"""Returns the number of occurrences without building any mappings."""
+		plan = self._plan
+		if not plan: return 1
+		mapping = [None] * len(plan)
+		used = set()
+		last = len(plan) - 1
+		total = 0
+		stack = [self._candidates(0, mapping, used)]
+		while stack:
+			step = len(stack) - 1
+			if mapping[step] is not None:
+				used.discard(mapping[step])
+				mapping[step] = None
+			if step == last:
+				# the last step's candidates need only be counted
+				total += sum(1 for v in stack.pop())
+				continue
+			v = next(stack[-1], None)
+			if v is None:
+				stack.pop()
+				continue
+			mapping[step] = v
+			used.add(v)
+			stack.append(self._candidates(step + 1, mapping, used))
+		return total
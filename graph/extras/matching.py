@@ -0,0 +1,292 @@
+#! /usr/bin/env python3
+
+"""
+matching.py
+
+Licensed under GPLv3
+
+This module contains matching and assignment algorithms for
+bipartite Graphine graphs, such as jobs on one side and the workers
+that can take them on the other.
+
+maximum_matching() pairs up as many nodes as possible using the
+Hopcroft-Karp algorithm, and minimum_cost_assignment() finds the
+cheapest of those largest matchings by successive shortest
+augmenting paths. Both work on a snapshot of the graph, and treat
+every edge as undirected.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import heapq
+from collections import deque
+
+def maximum_matching(graph, partition=None):
+	"""Returns a largest set of edges no two of which share a node.
+
+	partition says which nodes are on the left. It may be an iterable
+	of nodes or node names, or the name of a node attribute, in which
+	case nodes with a false value (such as 0) are on the left and the
+	rest on the right. If it is not given the graph is two-coloured,
+	and a ValueError is raised if it is not bipartite; a ValueError
+	is also raised if an edge joins two nodes on the same side.
+
+	The result maps each matched left node to the edge that matches
+	it. Where parallel edges join a pair, the first one is used.
+
+	This is Hopcroft-Karp, so it runs in O(E * sqrt(V)) time.
+
+	Usage:
+		>>> g = Graph(edges={('job1', 'ann'), ('job1', 'bob'), ('job2', 'ann')})
+		>>> matching = maximum_matching(g, ['job1', 'job2'])
+		>>> sorted((job.name, edge.end.name) for job, edge in matching.items())
+		[('job1', 'bob'), ('job2', 'ann')]
+	"""
+	snapshot = graph.snapshot(undirected=True)
+	left, adjacency = _bipartite(snapshot, partition)
+	n = snapshot.order
+	mate = [-1] * n
+	# the arc joining each left node to each neighbour
+	joins = [{} for i in range(n)]
+	for u in left:
+		for v, arc in adjacency[u]:
+			joins[u].setdefault(v, arc)
+	neighbours = [list(j) for j in joins]
+	while True:
+		# lay out the shortest augmenting paths from every free left node
+		distance = [-1] * n
+		queue = deque()
+		for u in left:
+			if mate[u] < 0:
+				distance[u] = 0
+				queue.append(u)
+		found = False
+		while queue:
+			u = queue.popleft()
+			for v in neighbours[u]:
+				w = mate[v]
+				if w < 0:
+					found = True
+				elif distance[w] < 0:
+					distance[w] = distance[u] + 1
+					queue.append(w)
+		if not found: break
+		# then augment along vertex disjoint paths through the layers
+		current = [0] * n
+		for root in left:
+			if mate[root] >= 0: continue
+			path = [root]
+			while path:
+				u = path[-1]
+				options = neighbours[u]
+				advanced = False
+				while current[u] < len(options):
+					v = options[current[u]]
+					current[u] += 1
+					w = mate[v]
+					if w < 0:
+						# flip the matching along the path
+						for x in reversed(path):
+							v, mate[x] = mate[x], v
+							mate[mate[x]] = x
+						path = []
+						advanced = True
+						break
+					if distance[w] == distance[u] + 1:
+						path.append(w)
+						advanced = True
+						break
+				if not advanced:
+					distance[u] = -1
+					path.pop()
+	nodes, edges, edge_ids = snapshot.nodes, snapshot.edges, snapshot.edge_ids
+	return {nodes[u]: edges[edge_ids[joins[u][mate[u]]]] for u in left if mate[u] >= 0}
+
+def minimum_cost_assignment(graph, get_weight, partition=None):
+	"""Returns the cheapest of the largest matchings, and its cost.
+
+	get_weight should be a callable that accepts an edge and returns
+	its cost, which may be negative. partition is as for
+	maximum_matching. Where parallel edges join a pair only the
+	cheapest is considered.
+
+	The result is a (cost, matching) pair, where matching maps each
+	matched left node to its edge.
+
+	This grows the matching along shortest augmenting paths, keeping
+	node potentials so that Dijkstra can be used despite the negative
+	costs of matched edges, and flips every disjoint shortest path it
+	finds in a round rather than just one.
+
+	Usage:
+		>>> g = Graph()
+		>>> for job, worker, cost in [('j1', 'w1', 4), ('j1', 'w2', 1), ('j2', 'w1', 2), ('j2', 'w2', 2)]:
+		... 	e = g.add_edge(job, worker, cost=cost)
+		>>> cost, matching = minimum_cost_assignment(g, lambda e: e.cost, ['j1', 'j2'])
+		>>> cost
+		3.0
+	"""
+	snapshot = graph.snapshot(get_weight=get_weight, undirected=True)
+	left, adjacency = _bipartite(snapshot, partition)
+	weights = snapshot.weights
+	n = snapshot.order
+	# the cheapest edge joining each left node to each neighbour
+	cheapest = [{} for i in range(n)]
+	for u in left:
+		for v, arc in adjacency[u]:
+			entry = cheapest[u].get(v)
+			if entry is None or weights[arc] < entry[0]:
+				cheapest[u][v] = (weights[arc], arc)
+	arcs = [[(v, w) for v, (w, arc) in c.items()] for c in cheapest]
+	# potentials keeping every reduced cost non-negative, including
+	# those of the arcs from a virtual source to the free left nodes
+	# and from the free right nodes to a virtual sink, which gets id n
+	potential = [0] * (n + 1)
+	right = set()
+	for u in left:
+		for v, w in arcs[u]:
+			if v not in right or w < potential[v]:
+				potential[v] = w
+				right.add(v)
+	sink = n
+	potential[sink] = min((potential[v] for v in right), default=0)
+	source = 0
+	mate = [-1] * n
+	is_right = [False] * n
+	for v in right:
+		is_right[v] = True
+	infinity = float("inf")
+	while True:
+		# shortest augmenting path lengths from the source, by Dijkstra
+		distance = [infinity] * (n + 1)
+		done = [False] * (n + 1)
+		heap = []
+		for u in left:
+			if mate[u] < 0:
+				distance[u] = source - potential[u]
+				heap.append((distance[u], u))
+		heapq.heapify(heap)
+		settled = []
+		while heap:
+			d, x = heapq.heappop(heap)
+			if done[x]: continue
+			done[x] = True
+			settled.append(x)
+			if x == sink: break
+			if is_right[x]:
+				if mate[x] < 0:
+					# free, so it can finish the path
+					u, new = sink, d + potential[x] - potential[sink]
+				else:
+					# otherwise the only way on is back along its match
+					u, new = mate[x], d
+				if new < distance[u]:
+					distance[u] = new
+					heapq.heappush(heap, (new, u))
+				continue
+			for v, w in arcs[x]:
+				new = d + w + potential[x] - potential[v]
+				if new < distance[v] and v != mate[x]:
+					distance[v] = new
+					heapq.heappush(heap, (new, v))
+		if not done[sink]: break
+		bound = distance[sink]
+		# augment along as many disjoint shortest paths as can be found
+		# among the settled nodes, not just the one Dijkstra stopped on
+		for root in settled:
+			if root == sink or is_right[root] or mate[root] >= 0: continue
+			path = [root]
+			positions = [0]
+			while path:
+				x = path[-1]
+				options = arcs[x]
+				while positions[-1] < len(options):
+					v, w = options[positions[-1]]
+					positions[-1] += 1
+					if not done[v] or v == mate[x]: continue
+					if distance[x] + w + potential[x] - potential[v] != distance[v]: continue
+					# and clear the flag, so no two paths share a node
+					done[v] = False
+					u = mate[v]
+					if u < 0:
+						if distance[v] + potential[v] - potential[sink] != bound: continue
+						# flip the matching along the path
+						for u in reversed(path):
+							v, mate[u] = mate[u], v
+							mate[mate[u]] = u
+						path = []
+						break
+					if not done[u] or distance[u] != distance[v]: continue
+					done[u] = False
+					path.append(u)
+					positions.append(0)
+					break
+				else:
+					path.pop()
+					positions.pop()
+		for x in settled:
+			potential[x] += distance[x] - bound
+		source -= bound
+	nodes, edges, edge_ids = snapshot.nodes, snapshot.edges, snapshot.edge_ids
+	matching = {}
+	cost = 0
+	for u in left:
+		if mate[u] >= 0:
+			w, arc = cheapest[u][mate[u]]
+			matching[nodes[u]] = edges[edge_ids[arc]]
+			cost += w
+	return cost, matching
+
+def _bipartite(snapshot, partition):
+	"""Returns the left node ids and their (neighbour, arc) lists."""
+	n = snapshot.order
+	nodes = snapshot.nodes
+	if partition is None:
+		side = _two_colour(snapshot)
+	elif isinstance(partition, str):
+		side = [bool(getattr(node, partition)) for node in nodes]
+	else:
+		side = [True] * n
+		for item in partition:
+			side[snapshot.get_id(item)] = False
+	offsets, targets = snapshot.offsets, snapshot.targets
+	left = [u for u in range(n) if not side[u]]
+	adjacency = [[] for i in range(n)]
+	for u in range(n):
+		for j in range(offsets[u], offsets[u+1]):
+			v = targets[j]
+			if side[u] == side[v]:
+				raise ValueError("%s and %s are on the same side" % (nodes[u], nodes[v]))
+			if not side[u]:
+				adjacency[u].append((v, j))
+	return left, adjacency
+
+def _two_colour(snapshot):
+	"""Splits the nodes into two sides by breadth first search."""
+	side = [None] * snapshot.order
+	for root in range(snapshot.order):
+		if side[root] is not None: continue
+		side[root] = False
+		queue = deque([root])
+		while queue:
+			u = queue.popleft()
+			for v in snapshot.successors(u):
+				if side[v] is None:
+					side[v] = not side[u]
+					queue.append(v)
+				elif side[v] == side[u]:
+					raise ValueError("the graph is not bipartite")
+	return side
@@ -0,0 +1,236 @@
+#! /usr/bin/env python3
+
+"""
+parallel.py
+
+Licensed under GPLv3
+
+This module contains the machinery the extras use to spread work
+over several processes without copying the graph into each of them.
+
+SharedSnapshot copies a Snapshot's arrays into shared memory once.
+The object itself pickles down to the names of those blocks, so it
+can be handed to a multiprocessing.Pool initializer cheaply, and each
+worker maps the same read-only memory. run() wraps the usual pattern
+of starting such a pool and mapping a function over chunks of work,
+and Workers keeps a pool running for algorithms that need many
+rounds of it.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+
+class SharedSnapshot:
+	"""A Snapshot's adjacency arrays, held in shared memory.
+
+	offsets, targets and edge_ids are memoryviews of signed 64 bit
+	ints and weights is a memoryview of doubles (or None), laid out
+	exactly as in the Snapshot. The nodes and edges themselves stay
+	in the parent process; workers deal only in integer ids.
+
+	The process that creates a SharedSnapshot owns the memory and
+	should call close() when it is done, or use it as a context
+	manager.
+
+	Usage:
+		>>> with SharedSnapshot(g.snapshot()) as shared:
+		... 	results = run(work, chunk(range(g.order), 16), shared, processes=4)
+	"""
+
+	ARRAYS = (("offsets", "q"), ("targets", "q"), ("edge_ids", "q"), ("weights", "d"))
+
+	def __init__(self, snapshot):
+		"""Copies the snapshot's arrays into new shared memory blocks."""
+		self.order = snapshot.order
+		self._owner = True
+		self._specs = {}
+		self._blocks = {}
+		for name, code in self.ARRAYS:
+			array = getattr(snapshot, name)
+			if array is None:
+				self._specs[name] = None
+				continue
+			data = memoryview(array).cast("B")
+			block = SharedMemory(create=True, size=max(len(data), 1))
+			block.buf[:len(data)] = data
+			self._specs[name] = (block.name, len(array), code)
+			self._blocks[name] = block
+		self._attach()
+
+	def _attach(self):
+		"""Maps each block as a typed memoryview attribute."""
+		for name, spec in self._specs.items():
+			if spec is None:
+				setattr(self, name, None)
+				continue
+			block_name, length, code = spec
+			if name not in self._blocks:
+				self._blocks[name] = SharedMemory(name=block_name)
+			view = self._blocks[name].buf[:length * 8].cast(code)
+			setattr(self, name, view)
+
+	def __getstate__(self):
+		"""Pickles down to the names of the shared blocks."""
+		return {"order": self.order, "_specs": self._specs}
+
+	def __setstate__(self, state):
+		"""Attaches to the parent's shared blocks."""
+		self.__dict__.update(state)
+		self._owner = False
+		self._blocks = {}
+		self._attach()
+
+	def successor_lists(self):
+		"""Returns a list of successor lists, like Snapshot.successor_lists."""
+		targets = self.targets.tolist()
+		offsets = self.offsets
+		return [targets[offsets[i]:offsets[i+1]] for i in range(self.order)]
+
+	def close(self):
+		"""Releases this process's mapping, freeing the memory if it owns it."""
+		for name, spec in self._specs.items():
+			view = getattr(self, name, None)
+			if view is not None:
+				view.release()
+			setattr(self, name, None)
+		for block in self._blocks.values():
+			block.close()
+			if self._owner:
+				block.unlink()
+		self._blocks = {}
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+# the state each worker process builds from the shared snapshot, and
+# the barrier that lets a broadcast reach every worker exactly once
+_state = None
+_barrier = None
+
+def _initialize(shared, setup, barrier=None):
+	"""Pool initializer: builds this worker's state from the snapshot."""
+	global _state, _barrier
+	_state = shared if setup is None else setup(shared)
+	_barrier = barrier
+
+def _call(args):
+	"""Runs one chunk of work against this worker's state."""
+	function, chunk = args
+	return function(_state, chunk)
+
+def _call_everywhere(args):
+	"""Runs a broadcast in this worker, then waits for all the others.
+
+	A worker held at the barrier can't pick up a second copy of the
+	broadcast, so with one copy per worker each runs exactly one.
+	"""
+	function, argument = args
+	function(_state, argument)
+	_barrier.wait()
+
+def chunk(items, pieces):
+	"""Splits items into at most pieces lists of nearly equal length."""
+	items = list(items)
+	pieces = max(1, min(pieces, len(items)))
+	size, extra = divmod(len(items), pieces)
+	chunks = []
+	start = 0
+	for i in range(pieces):
+		end = start + size + (i < extra)
+		chunks.append(items[start:end])
+		start = end
+	return [c for c in chunks if c]
+
+class Workers:
+	"""A set of worker processes that keep their state between calls.
+
+	Each worker builds its state from shared with setup, as in run(),
+	once when the pool starts; map() can then be called as often as
+	needed, which suits algorithms that hand out many small rounds
+	of work. Where the rounds change the state, broadcast() sends
+	each worker the changes rather than starting over. With
+	processes=1 no pool is started and map() runs in the calling
+	process.
+
+	Usage:
+		>>> with SharedSnapshot(s) as shared, Workers(shared, 4, setup) as workers:
+		... 	while frontier:
+		... 		frontier = merge(workers.map(expand, chunk(frontier, 4)))
+	"""
+
+	def __init__(self, shared, processes=1, setup=None):
+		"""Starts the pool, or builds the local state for processes=1."""
+		self.processes = processes
+		if processes == 1:
+			self._pool = None
+			self._state = shared if setup is None else setup(shared)
+		else:
+			barrier = multiprocessing.Barrier(processes)
+			self._pool = multiprocessing.Pool(processes, _initialize, (shared, setup, barrier))
+
+	def map(self, function, chunks):
+		"""Calls function(state, chunk) for each chunk and returns the results."""
+		if self._pool is None:
+			return [function(self._state, c) for c in chunks]
+		return self._pool.map(_call, [(function, c) for c in chunks])
+
+	def broadcast(self, function, argument):
+		"""Calls function(state, argument) once in every worker.
+
+		function should update the state in place. With processes=1
+		it is called on the local state, which is shared itself if no
+		setup was given.
+		"""
+		if self._pool is None:
+			function(self._state, argument)
+		else:
+			self._pool.map(_call_everywhere, [(function, argument)] * self.processes, chunksize=1)
+
+	def close(self):
+		"""Shuts the worker processes down."""
+		if self._pool is not None:
+			self._pool.terminate()
+			self._pool.join()
+			self._pool = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+def run(function, chunks, shared, processes=1, setup=None):
+	"""Calls function(state, chunk) for each chunk and returns the results.
+
+	state is whatever setup(shared) returns, or shared itself if no
+	setup is given. setup is called once per worker before any work
+	is done, which makes it the place to build per-worker structures
+	like successor lists. function and setup must be module-level
+	functions so that they can be sent to worker processes.
+
+	With processes=1 everything runs in the calling process and no
+	pool is started, so shared may just as well be a plain Snapshot,
+	which has the same attributes.
+	"""
+	with Workers(shared, processes, setup) as workers:
+		return workers.map(function, chunks)
@@ -0,0 +1,576 @@
+#! /usr/bin/env python3
+
+"""
+routing.py
+
+Licensed under GPLv3
+
+This module contains structures for answering many point-to-point
+distance queries on a graph that rarely changes.
+
+DistanceOracle implements ALT (A*, Landmarks and the Triangle
+inequality): it precomputes the distances to and from a handful of
+landmark nodes, and uses them to give A* a lower bound on the
+remaining distance from any node to the target. More landmarks give
+tighter bounds, and so faster queries, at the cost of two arrays of
+distances per landmark.
+
+ContractionHierarchy goes further for large graphs that are queried
+far more often than they change. An offline pass contracts the nodes
+one by one, adding shortcut edges that preserve distances, so that a
+query only has to search upwards through the hierarchy from both ends.
+The result can be saved and loaded without the original graph.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+import hashlib
+import heapq
+import os
+import pickle
+import random
+import time
+from array import array
+
+from graph.base import GraphElement
+from graph.extras.parallel import SharedSnapshot, Workers, run, chunk
+
+INFINITY = float("inf")
+
+class DistanceOracle:
+	"""Answers shortest path queries with landmark-guided A*.
+
+	The oracle works on a snapshot taken when it is built, so it
+	must be rebuilt if the graph changes. Undirected edges can be
+	followed either way.
+
+	landmarks is either the number of landmarks to pick at random
+	(seed makes the choice reproducible) or an iterable of nodes or
+	node names to use. get_weight, if given, should be a callable
+	that accepts an edge and returns a non-negative weight; otherwise
+	every edge counts as 1. processes sets how many worker processes
+	compute the landmark distances.
+
+	After building, preprocessing_time holds the number of seconds
+	the precomputation took.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('a', 'c'), ('c', 'd')})
+		>>> oracle = DistanceOracle(g, landmarks=2, seed=1)
+		>>> oracle.distance('a', 'd')
+		2
+		>>> oracle.shortest_path('a', 'd')
+		(2, [Edge(name=('a', 'c')), Edge(name=('c', 'd'))])
+	"""
+
+	def __init__(self, graph, landmarks=8, get_weight=None, processes=1, seed=None):
+		"""Picks the landmarks and computes their distance arrays."""
+		began = time.perf_counter()
+		self.snapshot = snapshot = graph.snapshot(get_weight=get_weight)
+		self._successors, self._weights = _adjacency(snapshot)
+		if isinstance(landmarks, int):
+			count = min(landmarks, snapshot.order)
+			ids = random.Random(seed).sample(range(snapshot.order), count)
+		else:
+			ids = [snapshot.get_id(landmark) for landmark in landmarks]
+		self.landmarks = [snapshot.nodes[i] for i in ids]
+		# each job is a landmark and whether to search the reversed graph
+		jobs = [(i, reverse) for i in ids for reverse in (False, True)]
+		chunks = chunk(jobs, processes)
+		if processes == 1:
+			results = run(_distances, chunks, snapshot, 1, _setup)
+		else:
+			with SharedSnapshot(snapshot) as shared:
+				results = run(_distances, chunks, shared, processes, _setup)
+		arrays = [a for result in results for a in result]
+		# distances from each landmark, and to each landmark
+		self._from = arrays[0::2]
+		self._to = arrays[1::2]
+		self.preprocessing_time = time.perf_counter() - began
+
+	def lower_bound(self, start, end):
+		"""Returns the landmarks' lower bound on the distance from start to end."""
+		return self._heuristic(self.snapshot.get_id(end))(self.snapshot.get_id(start))
+
+	def _heuristic(self, t):
+		"""Returns a function bounding the distance from a node id to t."""
+		bounds = [(d, d[t], r, r[t]) for d, r in zip(self._from, self._to)]
+		def heuristic(v):
+			best = 0
+			for d, dt, r, rt in bounds:
+				dv, rv = d[v], r[v]
+				# d(L, t) <= d(L, v) + d(v, t)
+				if dt != INFINITY:
+					if dv != INFINITY and dt - dv > best:
+						best = dt - dv
+				elif dv != INFINITY:
+					return INFINITY
+				# d(v, L) <= d(v, t) + d(t, L)
+				if rv != INFINITY:
+					if rt != INFINITY and rv - rt > best:
+						best = rv - rt
+				elif rt != INFINITY:
+					return INFINITY
+			return best
+		return heuristic
+
+	def _search(self, start, end):
+		"""Runs A* from start to end, returning the distance and parent links."""
+		s = self.snapshot.get_id(start)
+		t = self.snapshot.get_id(end)
+		heuristic = self._heuristic(t)
+		successors, weights, edge_ids = self._successors, self._weights, self._edge_ids()
+		distance = {s: 0}
+		parents = {s: None}
+		settled = set()
+		heap = [(heuristic(s), 0, s)]
+		while heap:
+			estimate, d, v = heapq.heappop(heap)
+			if v in settled: continue
+			if v == t:
+				return d, parents, t
+			settled.add(v)
+			for w, weight, e in zip(successors[v], weights[v], edge_ids[v]):
+				new = d + weight
+				if w in settled or new >= distance.get(w, INFINITY): continue
+				bound = heuristic(w)
+				if bound == INFINITY: continue
+				distance[w] = new
+				parents[w] = (v, e)
+				heapq.heappush(heap, (new + bound, new, w))
+		return INFINITY, parents, None
+
+	def _edge_ids(self):
+		"""Returns per-node lists of edge ids, built on first use."""
+		if not hasattr(self, "_edges"):
+			snapshot = self.snapshot
+			ids = snapshot.edge_ids.tolist()
+			offsets = snapshot.offsets
+			self._edges = [ids[offsets[i]:offsets[i+1]] for i in range(snapshot.order)]
+		return self._edges
+
+	def distance(self, start, end):
+		"""Returns the length of the shortest path from start to end, or inf."""
+		return self._search(start, end)[0]
+
+	def shortest_path(self, start, end):
+		"""Returns (distance, edges) for the shortest path from start to end.
+
+		If end cannot be reached the result is (inf, []), as in the
+		table returned by Graph.get_shortest_paths(pretty=False).
+		"""
+		d, parents, t = self._search(start, end)
+		if t is None:
+			return d, []
+		edges = self.snapshot.edges
+		path = []
+		while parents[t] is not None:
+			t, e = parents[t]
+			path.append(edges[e])
+		path.reverse()
+		return d, path
+
+
+def _adjacency(snapshot):
+	"""Returns per-node successor and weight lists for a snapshot."""
+	successors = snapshot.successor_lists()
+	if snapshot.weights is None:
+		weights = [[1] * len(s) for s in successors]
+	else:
+		values = snapshot.weights.tolist()
+		offsets = snapshot.offsets
+		weights = [values[offsets[i]:offsets[i+1]] for i in range(snapshot.order)]
+	return successors, weights
+
+def _setup(shared):
+	"""Builds the forward and reverse adjacency a worker searches over."""
+	successors, weights = _adjacency(shared)
+	predecessors = [[] for s in successors]
+	reverse_weights = [[] for s in successors]
+	for v, (targets, costs) in enumerate(zip(successors, weights)):
+		for w, cost in zip(targets, costs):
+			predecessors[w].append(v)
+			reverse_weights[w].append(cost)
+	return (successors, weights), (predecessors, reverse_weights)
+
+def _distances(state, jobs):
+	"""Returns the distance array for each (landmark, reverse) job."""
+	return [_dijkstra(*state[reverse], landmark) for landmark, reverse in jobs]
+
+def _dijkstra(successors, weights, s):
+	"""Returns an array of the distances from s to every node."""
+	distance = array("d", [INFINITY]) * len(successors)
+	distance[s] = 0
+	settled = set()
+	heap = [(0, s)]
+	while heap:
+		d, v = heapq.heappop(heap)
+		if v in settled: continue
+		settled.add(v)
+		for w, weight in zip(successors[v], weights[v]):
+			new = d + weight
+			if new < distance[w]:
+				distance[w] = new
+				heapq.heappush(heap, (new, w))
+	return distance
+
+
+class ContractionHierarchy:
+	"""Answers shortest path queries with a bidirectional upward search.
+
+	Building the hierarchy contracts every node in turn, cheapest
+	first, adding a shortcut between each pair of its neighbours
+	whose shortest path ran through it. Each round contracts a set of
+	nodes that are not adjacent to each other, so the searches for
+	their shortcuts are independent; processes sets how many worker
+	processes share them out. The workers are started once, each
+	with its own copy of the graph, and are sent only the changes
+	each round makes to it.
+
+	If checkpoint is given it names a file that the build saves its
+	progress to every checkpoint_interval seconds, and resumes from
+	if it already exists. The checkpoint records a hash of the
+	structure and weights of the graph it came from, and a
+	ValueError is raised if it does not match.
+
+	get_weight, if given, should be a callable that accepts an edge
+	and returns a non-negative weight; otherwise every edge counts as
+	1. Undirected edges can be followed either way.
+
+	The finished hierarchy knows nodes only by name, so it can be
+	saved and loaded independently of the graph.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'd'), ('a', 'd')})
+		>>> ch = ContractionHierarchy(g)
+		>>> ch.distance('a', 'c')
+		2.0
+		>>> import os, tempfile
+		>>> with tempfile.TemporaryDirectory() as directory:
+		...	path = os.path.join(directory, 'hierarchy.ch')
+		...	ch.save(path)
+		...	ContractionHierarchy.load(path).shortest_path('b', 'd')
+		(2.0, ['b', 'c', 'd'])
+	"""
+
+	# how many nodes a witness search may settle before giving up
+	WITNESS_LIMIT = 500
+
+	def __init__(self, graph, get_weight=None, processes=1, checkpoint=None, checkpoint_interval=300):
+		"""Contracts the graph into a hierarchy."""
+		began = time.perf_counter()
+		state = _initial_state(graph, get_weight)
+		state["fingerprint"] = _fingerprint(state)
+		if checkpoint is not None and os.path.exists(checkpoint):
+			with open(checkpoint, "rb") as f:
+				saved_state = pickle.load(f)
+			if saved_state.get("fingerprint") != state["fingerprint"]:
+				raise ValueError("checkpoint %s was made from a different graph" % checkpoint)
+			state = saved_state
+		saved = time.perf_counter()
+		adjacency = (state["out"], state["into"], self.WITNESS_LIMIT)
+		with Workers(adjacency, processes) as workers:
+			while state["remaining"]:
+				_contract_round(state, workers)
+				if checkpoint is not None and time.perf_counter() - saved > checkpoint_interval:
+					_save_state(state, checkpoint)
+					saved = time.perf_counter()
+		if checkpoint is not None:
+			_save_state(state, checkpoint)
+		self.names = state["names"]
+		self.ranks = array("q", state["ranks"])
+		self.up = _pack(state["up"])
+		self.down = _pack(state["down"])
+		self._index()
+		self.preprocessing_time = time.perf_counter() - began
+
+	def _index(self):
+		"""Builds the name lookup and shortcut table used by queries."""
+		self._ids = {name: i for i, name in enumerate(self.names)}
+		self._middles = {}
+		for (offsets, targets, weights, middles), forward in ((self.up, True), (self.down, False)):
+			for v in range(len(self.names)):
+				for j in range(offsets[v], offsets[v+1]):
+					arc = (v, targets[j]) if forward else (targets[j], v)
+					self._middles[arc] = middles[j]
+
+	def save(self, path):
+		"""Writes the hierarchy to path."""
+		with open(path, "wb") as f:
+			pickle.dump((self.names, self.ranks, self.up, self.down), f, pickle.HIGHEST_PROTOCOL)
+
+	@classmethod
+	def load(cls, path):
+		"""Reads a hierarchy written by save()."""
+		hierarchy = cls.__new__(cls)
+		with open(path, "rb") as f:
+			hierarchy.names, hierarchy.ranks, hierarchy.up, hierarchy.down = pickle.load(f)
+		hierarchy._index()
+		hierarchy.preprocessing_time = None
+		return hierarchy
+
+	def _get_id(self, item):
+		"""Takes a node or a node name and returns its integer id."""
+		if isinstance(item, GraphElement):
+			item = item._name
+		return self._ids[item]
+
+	def _search(self, start, end):
+		"""Searches upwards from both ends and returns the distance and meeting node."""
+		s, t = self._get_id(start), self._get_id(end)
+		distances = ({s: 0}, {t: 0})
+		parents = ({s: None}, {t: None})
+		settled = (set(), set())
+		heaps = ([(0, s)], [(0, t)])
+		best, meeting = INFINITY, None
+		if s == t:
+			best, meeting = 0, s
+		while heaps[0] or heaps[1]:
+			# stop once neither search can improve on the best meeting
+			if min(heaps[0][0][0] if heaps[0] else INFINITY, heaps[1][0][0] if heaps[1] else INFINITY) >= best:
+				break
+			side = 0 if heaps[0] and (not heaps[1] or heaps[0][0][0] <= heaps[1][0][0]) else 1
+			d, v = heapq.heappop(heaps[side])
+			if v in settled[side]: continue
+			settled[side].add(v)
+			other = distances[1 - side].get(v)
+			if other is not None and d + other < best:
+				best, meeting = d + other, v
+			offsets, targets, weights, middles = self.up if side == 0 else self.down
+			distance, parent = distances[side], parents[side]
+			for j in range(offsets[v], offsets[v+1]):
+				w = targets[j]
+				new = d + weights[j]
+				if new < distance.get(w, INFINITY):
+					distance[w] = new
+					parent[w] = v
+					heapq.heappush(heaps[side], (new, w))
+		return best, meeting, parents
+
+	def distance(self, start, end):
+		"""Returns the length of the shortest path from start to end, or inf."""
+		return self._search(start, end)[0]
+
+	def shortest_path(self, start, end):
+		"""Returns (distance, names) for the shortest path from start to end.
+
+		names lists the names of the nodes along the path, including
+		both ends. If end cannot be reached the result is (inf, []).
+		"""
+		d, meeting, (forward, backward) = self._search(start, end)
+		if meeting is None:
+			return d, []
+		ids = []
+		v = meeting
+		while v is not None:
+			ids.append(v)
+			v = forward[v]
+		ids.reverse()
+		v = backward[meeting]
+		while v is not None:
+			ids.append(v)
+			v = backward[v]
+		path = [ids[0]]
+		for u, w in zip(ids, ids[1:]):
+			path.extend(self._unpack(u, w))
+		return d, [self.names[v] for v in path]
+
+	def _unpack(self, u, w):
+		"""Returns the original path from u to w, excluding u."""
+		path = []
+		stack = [(u, w)]
+		while stack:
+			u, w = stack.pop()
+			middle = self._middles[(u, w)]
+			if middle < 0:
+				path.append(w)
+			else:
+				stack.append((middle, w))
+				stack.append((u, middle))
+		return path
+
+
+def _initial_state(graph, get_weight):
+	"""Returns the uncontracted state of a graph as plain, picklable data.
+
+	out[v] and into[v] map each neighbour to the (weight, middle) of
+	the cheapest arc joining them, where middle is the node a
+	shortcut was made for, or -1 for an original edge.
+	"""
+	nodes = list(graph.nodes)
+	index = {node._name: i for i, node in enumerate(nodes)}
+	n = len(nodes)
+	out = [{} for i in range(n)]
+	into = [{} for i in range(n)]
+	for edge in graph.edges:
+		weight = 1 if get_weight is None else get_weight(edge)
+		start, end = index[edge._start._name], index[edge._end._name]
+		if start == end: continue
+		arcs = [(start, end)] if edge._directed else [(start, end), (end, start)]
+		for u, w in arcs:
+			if weight < out[u].get(w, (INFINITY,))[0]:
+				out[u][w] = into[w][u] = (weight, -1)
+	return {
+		"names": [node._name for node in nodes],
+		"out": out,
+		"into": into,
+		"remaining": set(range(n)),
+		"dirty": set(range(n)),
+		"priority": [0] * n,
+		"deleted": [0] * n,
+		"ranks": [-1] * n,
+		"next_rank": 0,
+		"up": [None] * n,
+		"down": [None] * n,
+	}
+
+def _fingerprint(state):
+	"""Hashes the names, arcs and weights of an uncontracted state.
+
+	Arcs are hashed in sorted order, so the result does not depend on
+	the order the graph's elements were added in.
+	"""
+	names, out = state["names"], state["out"]
+	digest = hashlib.sha256()
+	for line in sorted(repr(name) for name in names):
+		digest.update(line.encode() + b"\n")
+	arcs = sorted(repr((names[u], names[w], weight)) for u in range(len(names)) for w, (weight, middle) in out[u].items())
+	for line in arcs:
+		digest.update(line.encode() + b"\n")
+	return (len(names), len(arcs), digest.hexdigest())
+
+def _save_state(state, path):
+	"""Atomically replaces the checkpoint at path with state."""
+	with open(path + ".tmp", "wb") as f:
+		pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+	os.replace(path + ".tmp", path)
+
+def _contract_round(state, workers):
+	"""Contracts one independent set of the cheapest remaining nodes."""
+	out, into = state["out"], state["into"]
+	pieces = 4 * workers.processes
+	# reprioritise the nodes whose neighbourhood changed
+	dirty = sorted(state["dirty"])
+	results = workers.map(_find_shortcuts, [(c, frozenset()) for c in chunk(dirty, pieces)])
+	priority, deleted = state["priority"], state["deleted"]
+	for v, found in zip(dirty, (s for result in results for s in result)):
+		priority[v] = len(found) - len(out[v]) - len(into[v]) + deleted[v]
+	state["dirty"] = set()
+	# a node is contracted when it is cheaper than all its neighbours
+	key = lambda v: (priority[v], v)
+	chosen = [v for v in state["remaining"] if all(key(v) < key(w) for w in _neighbours(out, into, v))]
+	# witnesses may not pass through any node contracted alongside v,
+	# or contracting that node could remove them
+	avoid = frozenset(chosen)
+	results = workers.map(_find_shortcuts, [(c, avoid) for c in chunk(chosen, pieces)])
+	shortcuts = [s for result in results for s in result]
+	ranks, up, down = state["ranks"], state["up"], state["down"]
+	# the arcs this round sets, for the workers to replay
+	writes = []
+	for v, found in zip(chosen, shortcuts):
+		ranks[v] = state["next_rank"]
+		state["next_rank"] += 1
+		up[v] = [(w, weight, middle) for w, (weight, middle) in out[v].items()]
+		down[v] = [(u, weight, middle) for u, (weight, middle) in into[v].items()]
+		for w in _neighbours(out, into, v):
+			deleted[w] += 1
+			state["dirty"].add(w)
+		_remove(out, into, v)
+		for u, w, weight in found:
+			if weight < out[u].get(w, (INFINITY,))[0]:
+				out[u][w] = into[w][u] = (weight, v)
+				writes.append((u, w, (weight, v)))
+	# with one process the workers' adjacency is this one
+	if workers.processes > 1:
+		workers.broadcast(_replay, (chosen, writes))
+	state["remaining"].difference_update(chosen)
+	state["dirty"].intersection_update(state["remaining"])
+
+def _remove(out, into, v):
+	"""Cuts v out of the adjacency."""
+	for w in _neighbours(out, into, v):
+		out[w].pop(v, None)
+		into[w].pop(v, None)
+	out[v] = into[v] = None
+
+def _replay(adjacency, changes):
+	"""Applies a round's contractions to a worker's copy of the adjacency.
+
+	The contracted nodes are never adjacent to each other, so none of
+	the arcs written for one can be cut by removing another.
+	"""
+	out, into, limit = adjacency
+	contracted, writes = changes
+	for v in contracted:
+		_remove(out, into, v)
+	for u, w, arc in writes:
+		out[u][w] = into[w][u] = arc
+
+def _neighbours(out, into, v):
+	"""Returns the remaining nodes joined to v in either direction."""
+	return out[v].keys() | into[v].keys()
+
+def _find_shortcuts(adjacency, job):
+	"""Returns, for each node, the shortcuts contracting it would need."""
+	out, into, limit = adjacency
+	nodes, avoid = job
+	return [_shortcuts(out, into, v, limit, avoid) for v in nodes]
+
+def _shortcuts(out, into, v, limit, avoid):
+	"""Returns (u, w, weight) for each path u -> v -> w with no witness.
+
+	A witness is a path from u to w that avoids v and the nodes in
+	avoid, and is no longer than the one through v. Searches give up
+	after settling limit nodes, which can only add shortcuts, never
+	lose a distance.
+	"""
+	found = []
+	for u, (to_v, _) in into[v].items():
+		targets = {w: to_v + weight for w, (weight, _) in out[v].items() if w != u}
+		if not targets: continue
+		bound = max(targets.values())
+		distance = {u: 0}
+		settled = 0
+		heap = [(0, u)]
+		pending = set(targets)
+		while heap and pending and settled < limit:
+			d, x = heapq.heappop(heap)
+			if d > distance[x]: continue
+			if d > bound: break
+			settled += 1
+			pending.discard(x)
+			for y, (weight, _) in out[x].items():
+				if y == v or y in avoid: continue
+				new = d + weight
+				if new < distance.get(y, INFINITY):
+					distance[y] = new
+					heapq.heappush(heap, (new, y))
+		for w, through in targets.items():
+			if distance.get(w, INFINITY) > through:
+				found.append((u, w, through))
+	return found
+
+def _pack(arcs):
+	"""Packs per-node lists of (target, weight, middle) into arrays."""
+	offsets = array("q", [0])
+	targets, weights, middles = array("q"), array("d"), array("q")
+	for node_arcs in arcs:
+		for target, weight, middle in node_arcs:
+			targets.append(target)
+			weights.append(weight)
+			middles.append(middle)
+		offsets.append(len(targets))
+	return offsets, targets, weights, middles
@@ -0,0 +1,197 @@
+#! /usr/bin/env python3
+
+"""
+sssp.py
+
+Licensed under GPLv3
+
+This module contains a parallel single source shortest path search
+for large graphs.
+
+delta_stepping() settles nodes in buckets of width delta rather than
+one at a time as Dijkstra's algorithm does. Every node in a bucket
+can be expanded at once, so each round of edge relaxations is a
+handful of vectorized NumPy operations over a snapshot's arrays, and
+the rounds are split between worker processes that map the same
+shared memory copy of the snapshot.
+
+examples/sssp_benchmark.py times it against Dijkstra's algorithm
+with different numbers of workers.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+
+import numpy
+
+from graph.base import Snapshot
+from graph.extras.arrays import _view
+from graph.extras.parallel import SharedSnapshot, Workers, chunk
+
+ShortestPaths = namedtuple("ShortestPaths", "snapshot distances predecessors")
+ShortestPaths.__doc__ = """The result of delta_stepping().
+
+distances is an array holding each node's distance from the source,
+or inf if it cannot be reached, and predecessors holds the id of the
+edge (an index into snapshot.edges) that reaches each node on a
+shortest path, or -1 for the source and unreachable nodes.
+"""
+
+def delta_stepping(graph, source, delta=None, get_weight=None, processes=1):
+	"""Finds the distance from source to every node with delta-stepping.
+
+	graph can be a Graph or a Snapshot. get_weight, if given, should
+	be a callable that accepts an edge and returns a non-negative
+	weight; otherwise every edge counts as 1. Snapshots use their own
+	weights, if any. Undirected edges can be followed either way.
+
+	delta is the bucket width. Edges no heavier than delta are light
+	and may be relaxed repeatedly within a bucket; heavier ones are
+	relaxed once when it is done. Small values approach Dijkstra's
+	algorithm and large ones Bellman-Ford's; the default is the mean
+	edge weight. The distances are the same whatever delta is.
+
+	processes sets how many worker processes share each round of
+	relaxations.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('a', 'c')})
+		>>> result = delta_stepping(g, 'a')
+		>>> float(result.distances[result.snapshot.get_id('c')])
+		1.0
+	"""
+	if isinstance(graph, Snapshot):
+		snapshot = graph
+	else:
+		snapshot = graph.snapshot(get_weight=get_weight)
+	s = snapshot.get_id(source)
+	if processes == 1:
+		return _search(snapshot, s, delta, Workers(snapshot, 1, _setup))
+	with SharedSnapshot(snapshot) as shared, Workers(shared, processes, _setup) as workers:
+		return _search(snapshot, s, delta, workers)
+
+def _setup(shared):
+	"""Builds a worker's NumPy views of the snapshot."""
+	offsets = _view(shared.offsets, numpy.int64)
+	targets = _view(shared.targets, numpy.int64)
+	if shared.weights is None:
+		weights = numpy.ones(len(targets))
+	else:
+		weights = _view(shared.weights, numpy.float64)
+	return offsets, targets, weights
+
+def _search(snapshot, s, delta, workers):
+	"""Runs delta-stepping from s, sharing rounds among workers."""
+	offsets, targets, weights = _setup(snapshot)
+	n = snapshot.order
+	if len(weights) and weights.min() < 0:
+		raise ValueError("delta-stepping needs non-negative weights")
+	if delta is None:
+		delta = float(weights.mean()) if len(weights) else 1.0
+	if delta <= 0:
+		delta = 1.0
+	pieces = workers.processes
+	distances = numpy.full(n, numpy.inf)
+	distances[s] = 0.0
+	# nodes whose edges have not been relaxed since their distance last fell
+	pending = numpy.zeros(n, dtype=bool)
+	pending[s] = True
+	while pending.any():
+		candidates = numpy.flatnonzero(pending)
+		bucket = numpy.floor(distances[candidates].min() / delta)
+		limit = (bucket + 1) * delta
+		settled = []
+		frontier = candidates[distances[candidates] < limit]
+		# relax light edges until the bucket stops changing
+		while len(frontier):
+			pending[frontier] = False
+			settled.append(frontier)
+			improved = _relax(workers, distances, frontier, delta, True, pieces)
+			pending[improved] = True
+			frontier = improved[distances[improved] < limit]
+		# then the heavy edges of everything settled in it, once
+		settled = numpy.unique(numpy.concatenate(settled))
+		improved = _relax(workers, distances, settled, delta, False, pieces)
+		pending[improved] = True
+	return ShortestPaths(snapshot, distances, _predecessors(snapshot, offsets, targets, weights, distances, s))
+
+def _relax(workers, distances, frontier, delta, light, pieces):
+	"""Relaxes the light or heavy edges leaving frontier.
+
+	Returns the ids of the nodes whose distances fell.
+	"""
+	chunks = [(nodes, distances[nodes], delta, light) for nodes in numpy.array_split(frontier, pieces) if len(nodes)]
+	results = workers.map(_requests, chunks)
+	ends = numpy.concatenate([r[0] for r in results])
+	proposed = numpy.concatenate([r[1] for r in results])
+	ends, proposed = _minimum_by_target(ends, proposed)
+	better = proposed < distances[ends]
+	ends = ends[better]
+	distances[ends] = proposed[better]
+	return ends
+
+def _requests(state, work):
+	"""Returns the best (targets, distances) offered by one chunk's edges."""
+	offsets, targets, weights = state
+	nodes, base, delta, light = work
+	entries, counts = _expand(offsets, nodes)
+	w = weights[entries]
+	keep = w <= delta if light else w > delta
+	proposed = numpy.repeat(base, counts)[keep] + w[keep]
+	return _minimum_by_target(targets[entries[keep]], proposed)
+
+def _expand(offsets, nodes):
+	"""Returns the index of every entry leaving nodes, and their counts."""
+	first = offsets[nodes]
+	counts = offsets[nodes + 1] - first
+	entries = numpy.repeat(first - numpy.cumsum(counts) + counts, counts) + numpy.arange(counts.sum())
+	return entries, counts
+
+def _minimum_by_target(ends, proposed):
+	"""Keeps only the smallest proposed distance for each target."""
+	if not len(ends):
+		return ends, proposed
+	order = numpy.lexsort((proposed, ends))
+	ends, proposed = ends[order], proposed[order]
+	first = numpy.ones(len(ends), dtype=bool)
+	first[1:] = ends[1:] != ends[:-1]
+	return ends[first], proposed[first]
+
+def _predecessors(snapshot, offsets, targets, weights, distances, s):
+	"""Picks an edge on a shortest path into every reached node.
+
+	An edge is tight if it lies on some shortest path. Searching
+	breadth first from s along tight edges only, rather than picking
+	any tight edge into each node, keeps zero weight cycles from
+	being taken for paths.
+	"""
+	sources = numpy.repeat(numpy.arange(snapshot.order, dtype=numpy.int64), numpy.diff(offsets))
+	tight = distances[sources] + weights == distances[targets]
+	edge_ids = _view(snapshot.edge_ids, numpy.int64)
+	predecessors = numpy.full(snapshot.order, -1, dtype=numpy.int64)
+	reached = numpy.zeros(snapshot.order, dtype=bool)
+	reached[s] = True
+	frontier = numpy.array([s], dtype=numpy.int64)
+	while len(frontier):
+		entries = _expand(offsets, frontier)[0]
+		entries = entries[tight[entries] & ~reached[targets[entries]]]
+		ends, first = numpy.unique(targets[entries], return_index=True)
+		predecessors[ends] = edge_ids[entries[first]]
+		reached[ends] = True
+		frontier = ends
+	return predecessors
+
@@ -0,0 +1,216 @@
+#! /usr/bin/env python3
+
+"""
+walks.py
+
+Licensed under GPLv3
+
+This module contains a batched random walk sampler, meant for
+building DeepWalk and node2vec style training corpora.
+
+Rather than walking one node at a time through the generator
+protocol of Graph.walk_nodes, random_walks() advances every walk in a
+batch together with NumPy operations on a snapshot's arrays. Weighted
+steps are drawn from per-node alias tables in constant time, and the
+node2vec return and in-out parameters are applied by rejection
+sampling on top of them, which needs no more memory than the tables
+themselves.
+"""
+
+# This file is part of Graphine.
+# 
+# Graphine is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Graphine is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with Graphine.  If not, see <http://www.gnu.org/licenses/>.
+
+from collections import namedtuple
+
+import numpy
+
+from graph.base import Snapshot
+from graph.extras.arrays import _view
+from graph.extras.parallel import SharedSnapshot, run
+
+Walks = namedtuple("Walks", "snapshot paths")
+Walks.__doc__ = """The result of random_walks().
+
+paths is a 2-D array with a row of node ids for each walk, starting
+with its start node; snapshot.nodes maps the ids back to nodes. A
+walk that reaches a node with no way out, including one whose edges
+all have zero weight, stops there, and the rest of its row is filled
+with -1.
+"""
+
+# the number of walks generated from each random stream, which keeps
+# the results the same however many processes share them out
+BLOCK = 4096
+
+def random_walks(graph, starts, length, p=1.0, q=1.0, weight=None, seed=None, processes=1):
+	"""Returns a batch of random walks of the given length.
+
+	graph can be a Graph or a Snapshot, and starts is a sequence of
+	the node ids to start from, one walk per entry; to start several
+	walks from every node, use numpy.repeat(numpy.arange(n), count).
+	length is the number of nodes in each walk, including the start.
+
+	weight, if given, should be a callable that accepts an edge and
+	returns a non-negative weight, and each step follows an edge with
+	probability proportional to its weight; otherwise all edges are
+	equally likely. Snapshots use their own weights, if any.
+	Undirected edges can be followed either way.
+
+	p and q are node2vec's return and in-out parameters: after
+	stepping from t to v, a step back to t is weighted by 1/p, one to
+	a neighbour of t by 1, and any other by 1/q. The defaults give
+	plain DeepWalk walks.
+
+	seed makes the walks reproducible, and processes sets how many
+	worker processes generate them; the same seed gives the same
+	walks whatever processes is.
+
+	Usage:
+		>>> g = Graph(edges={('a', 'b'), ('b', 'c'), ('c', 'a')})
+		>>> s = g.snapshot()
+		>>> walks = random_walks(s, [s.get_id('a')] * 2, 4, seed=1)
+		>>> [[s.nodes[i].name for i in row] for row in walks.paths]
+		[['a', 'b', 'c', 'a'], ['a', 'b', 'c', 'a']]
+	"""
+	if p <= 0 or q <= 0:
+		raise ValueError("p and q must be positive")
+	if isinstance(graph, Snapshot):
+		snapshot = graph
+	else:
+		snapshot = graph.snapshot(get_weight=weight)
+	starts = numpy.asarray(starts, dtype=numpy.int64)
+	blocks = [starts[i:i + BLOCK] for i in range(0, len(starts), BLOCK)]
+	streams = numpy.random.SeedSequence(seed).spawn(len(blocks))
+	# one block per chunk, so that each keeps its own random stream
+	chunks = [(block, stream, length, p, q) for block, stream in zip(blocks, streams)]
+	if processes == 1:
+		results = run(_walk, chunks, snapshot, 1, _setup)
+	else:
+		with SharedSnapshot(snapshot) as shared:
+			results = run(_walk, chunks, shared, processes, _setup)
+	if results:
+		paths = numpy.concatenate(results)
+	else:
+		paths = numpy.zeros((0, length), dtype=numpy.int64)
+	return Walks(snapshot, paths)
+
+def _alias_tables(offsets, weights):
+	"""Builds Vose alias tables for every node's outgoing entries.
+
+	Returns (probability, alias) arrays parallel to the targets: a
+	step from v picks an entry j of v uniformly, then keeps it with
+	probability[j] or takes v's alias[j]th entry instead.
+	"""
+	probability = numpy.ones(len(weights))
+	alias = numpy.zeros(len(weights), dtype=numpy.int64)
+	for v in range(len(offsets) - 1):
+		start, end = offsets[v], offsets[v+1]
+		degree = end - start
+		if degree < 2: continue
+		total = weights[start:end].sum()
+		# walks stop at nodes with nothing to choose from
+		if not total: continue
+		scaled = weights[start:end] * (degree / total)
+		prob = scaled.tolist()
+		small = [i for i, x in enumerate(prob) if x < 1]
+		large = [i for i, x in enumerate(prob) if x >= 1]
+		table = [0] * degree
+		while small and large:
+			s, l = small.pop(), large.pop()
+			table[s] = l
+			prob[l] -= 1 - prob[s]
+			(small if prob[l] < 1 else large).append(l)
+		for i in small + large:
+			prob[i] = 1.0
+		probability[start:end] = prob
+		alias[start:end] = table
+	return probability, alias
+
+def _setup(shared):
+	"""Builds a worker's arrays and alias tables from the snapshot."""
+	offsets = _view(shared.offsets, numpy.int64)
+	targets = _view(shared.targets, numpy.int64)
+	degrees = numpy.diff(offsets)
+	state = {"offsets": offsets, "targets": targets, "alias": None, "exits": degrees > 0}
+	if shared.weights is not None:
+		weights = _view(shared.weights, numpy.float64)
+		# a node whose edges all weigh nothing is a dead end
+		busy = numpy.flatnonzero(degrees)
+		totals = numpy.zeros(len(degrees))
+		if len(busy):
+			totals[busy] = numpy.add.reduceat(weights, offsets[busy])
+		state["exits"] = totals > 0
+		# uniform weights need no tables
+		if len(weights) and not numpy.all(weights == weights[0]):
+			state["alias"] = _alias_tables(offsets, weights)
+	return state
+
+def _edge_keys(state):
+	"""Returns the sorted source * n + target keys used to test adjacency."""
+	if "keys" not in state:
+		offsets, targets = state["offsets"], state["targets"]
+		n = len(offsets) - 1
+		sources = numpy.repeat(numpy.arange(n, dtype=numpy.int64), numpy.diff(offsets))
+		state["keys"] = numpy.unique(sources * n + targets)
+	return state["keys"]
+
+def _step(state, nodes, rng):
+	"""Draws a first order step from each of the given nodes."""
+	offsets = state["offsets"]
+	first = offsets[nodes]
+	entries = first + rng.integers(0, offsets[nodes + 1] - first)
+	if state["alias"] is not None:
+		probability, alias = state["alias"]
+		keep = rng.random(len(nodes)) < probability[entries]
+		entries = numpy.where(keep, entries, first + alias[entries])
+	return state["targets"][entries]
+
+def _walk(state, work):
+	"""Generates the walks for one block of start nodes."""
+	starts, stream, length, p, q = work
+	rng = numpy.random.default_rng(stream)
+	offsets, exits = state["offsets"], state["exits"]
+	n = len(offsets) - 1
+	paths = numpy.full((len(starts), length), -1, dtype=numpy.int64)
+	if length:
+		paths[:, 0] = starts
+	biased = p != 1 or q != 1
+	if biased:
+		keys = _edge_keys(state)
+		# the largest of the three biases bounds the acceptance ratio
+		bound = max(1.0, 1.0 / p, 1.0 / q)
+	walking = numpy.arange(len(starts))
+	for step in range(1, length):
+		current = paths[walking, step - 1]
+		walking = walking[exits[current]]
+		if not len(walking): break
+		current = paths[walking, step - 1]
+		if not biased or step == 1:
+			paths[walking, step] = _step(state, current, rng)
+			continue
+		previous = paths[walking, step - 2]
+		# propose first order steps until each walk accepts one
+		pending = numpy.arange(len(walking))
+		while len(pending):
+			proposal = _step(state, current[pending], rng)
+			back = previous[pending]
+			key = back * n + proposal
+			found = numpy.searchsorted(keys, key)
+			adjacent = keys[numpy.minimum(found, len(keys) - 1)] == key
+			bias = numpy.where(proposal == back, 1.0 / p, numpy.where(adjacent, 1.0, 1.0 / q))
+			accepted = rng.random(len(pending)) * bound < bias
+			paths[walking[pending[accepted]], step] = proposal[accepted]
+			pending = pending[~accepted]
+	return paths
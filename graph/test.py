@@ -33,8 +33,35 @@ This contains all the test data for Graphine.
 import unittest
 import timeit
 import copy
-
-from base import Graph, Node, Edge, GraphElement
+import operator
+import random
+import os
+import sys
+import pickle
+import tempfile
+from collections import defaultdict
+
+import numpy
+
+from base import Graph, Node, Edge, GraphElement, GraphObserver, Snapshot, ReachabilityIndex, TopologicalOrder
+from extras.flow import maximum_flow
+from extras.matching import maximum_matching, minimum_cost_assignment
+from extras.isomorphism import Matcher
+from extras.community import louvain, aggregate, modularity
+from extras.cliques import maximal_cliques, maximum_clique
+from extras.coloring import greedy_color
+
+# the extras built on snapshots import the package by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graph.base import Graph as PackageGraph
+from graph.extras.sssp import delta_stepping
+from graph.extras.parallel import SharedSnapshot, Workers, run, chunk
+from graph.extras.centrality import betweenness_centrality
+from graph.extras.pagerank import pagerank, personalized_pagerank
+from graph.extras.arrays import csr
+from graph.extras.walks import random_walks
+from graph.extras.hyperanf import hyperanf
+from graph.extras.routing import DistanceOracle, ContractionHierarchy, _initial_state, _fingerprint, _contract_round, _save_state
 
 #########################################################################################
 #      				     COMPONENT TESTS					#	
@@ -46,6 +73,13 @@ class BaseGraphTest(unittest.TestCase):
 		return Graph()
 
 
+class PackageGraphTest(BaseGraphTest):
+
+	# those extras check for the package's own classes
+	def build_graph(self):
+		return PackageGraph()
+
+
 class GraphCreationTest(BaseGraphTest):
 
 	def testGraphCreation(self):
@@ -499,6 +533,39 @@ class GetElementsTest(BaseGraphTest):
 		self.failUnless(all(edge in self.g.edges for edge in {self.j_to_t, self.t_to_d, self.d_to_p}))
 		self.failUnlessEqual([e for e in self.g.search_edges(distance=2850)], [self.d_to_p])
 
+	def testResolvers(self):
+		self.failUnless(self.g.get_node(self.jimmy.name) is self.jimmy)
+		self.failUnless(self.g.get_node(self.jimmy) is self.jimmy)
+		self.failUnless(self.g.get_edge(self.j_to_t.name) is self.j_to_t)
+		self.failUnless(self.g.get_edge(self.j_to_t) is self.j_to_t)
+		self.failUnlessRaises(KeyError, self.g.get_node, self.j_to_t)
+		self.failUnlessRaises(KeyError, self.g.get_edge, self.jimmy)
+		self.failUnlessRaises(KeyError, self.g.get_node, "nobody")
+		# a node and an edge sharing a name are told apart
+		shared = self.g.add_edge(self.ted, self.paul, self.dan.name)
+		self.failUnless(self.g.get_node(self.dan.name) is self.dan)
+		self.failUnless(self.g.get_edge(self.dan.name) is shared)
+		self.failUnless(self.g[self.dan.name] is self.dan)
+		self.failUnless(self.g.get_element(self.dan.name) is shared)
+
+	def testFalsyElements(self):
+		class Empty(Graph.Node):
+			def __len__(self):
+				return 0
+		class EmptyGraph(Graph):
+			Node = Empty
+		g = EmptyGraph()
+		a = g.add_node("a")
+		self.failIf(a)
+		self.failUnless(g["a"] is a)
+		self.failUnless(g.get_element("a") is a)
+		self.failUnless(g.get_node(a) is a)
+		e = g.add_edge("a", "b", "ab")
+		self.failUnless(e.start is a)
+		self.failUnlessEqual(g.order, 2)
+		g.move_edge(e, start=g["b"], end=a)
+		self.failUnless(e.start is g["b"] and e.end is a)
+
 
 class TraversalTest(BaseGraphTest):
 
@@ -814,6 +881,47 @@ class GraphCorrectnessTest(BaseGraphTest):
 		paths = g.get_shortest_paths(n1, get_weight=lambda e: e.weight, pretty=False)
 		self.failUnlessEqual(paths, {n1: (0, []), n2: (5, [e1]), n3: (6, [e1, e2])})
 
+	def testGetShortestPathsQueues(self):
+		# the same shape weighted to exercise each priority queue
+		for scale in (1, 10 ** 6, 0.5):
+			g = self.build_graph()
+			n1, n2, n3, n4 = (g.add_node(name) for name in "ABCD")
+			e1 = g.add_edge(n1, n2, weight=4 * scale)
+			e2 = g.add_edge(n1, n3, weight=1 * scale)
+			e3 = g.add_edge(n3, n2, weight=2 * scale)
+			e4 = g.add_edge(n2, n4, weight=0, is_directed=False)
+			e5 = g.add_edge(n4, n1, weight=1 * scale)
+			paths = g.get_shortest_paths(n1, get_weight=lambda e: e.weight, pretty=False)
+			expected = {n1: (0, []), n2: (3 * scale, [e2, e3]), n3: (scale, [e2]), n4: (3 * scale, [e2, e3, e4])}
+			self.failUnlessEqual(dict(paths), expected)
+			self.failUnlessEqual(paths[g.add_node("E")], (float("inf"), []))
+
+	def testKShortestPaths(self):
+		g = self.build_graph()
+		e1 = g.add_edge("A", "B", "AB", weight=1)
+		e2 = g.add_edge("B", "D", "BD", weight=1)
+		e3 = g.add_edge("A", "C", "AC", weight=2)
+		e4 = g.add_edge("C", "D", "CD", weight=2)
+		e5 = g.add_edge("B", "C", "BC", weight=1, is_directed=False)
+		e6 = g.add_edge("A", "D", "AD", weight=5)
+		e7 = g.add_edge("D", "A", "DA", weight=1)
+		get_weight = lambda e: e.weight
+		paths = list(g.k_shortest_paths("A", "D", get_weight=get_weight))
+		expected = [(2, [e1, e2]), (4, [e1, e5, e4]), (4, [e3, e5, e2]), (4, [e3, e4]), (5, [e6])]
+		self.failUnlessEqual([length for length, path in paths], [2, 4, 4, 4, 5])
+		self.failUnlessEqual(sorted(paths, key=lambda p: (p[0], [e.name for e in p[1]])), expected)
+		# only as many as asked for, and lazily
+		self.failUnlessEqual(list(g.k_shortest_paths("A", "D", 1, get_weight)), [(2, [e1, e2])])
+		w = g.k_shortest_paths("A", "D", 10, get_weight)
+		self.failUnlessEqual(next(w), (2, [e1, e2]))
+		# degenerate cases
+		self.failUnlessEqual(list(g.k_shortest_paths("A", "A", 3)), [(0, [])])
+		self.failUnlessEqual(list(g.k_shortest_paths("A", "D", 0, get_weight)), [])
+		self.failUnlessEqual(list(g.k_shortest_paths("A", "D", -1, get_weight)), [])
+		g.add_node("E")
+		self.failUnlessEqual(list(g.k_shortest_paths("A", "E", 3)), [])
+		self.failUnlessRaises(KeyError, list, g.k_shortest_paths("A", "F", 3))
+
 	def testStronglyConnectedComponents(self):
 		g = self.build_graph()
 		n1 = g.add_node(value=1)
@@ -841,6 +949,1570 @@ class GraphCorrectnessTest(BaseGraphTest):
 		self.failUnlessEqual(set([frozenset([n1, n2, n3]), frozenset([n4, n5, n6])]), {frozenset(i) for i in comp})
 
 
+class SnapshotTest(BaseGraphTest):
+
+	def setUp(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab", weight=2)
+		self.g.add_edge("b", "c", "bc", False, weight=3)
+		self.g.add_edge("c", "c", "cc", weight=4)
+
+	def successors(self, s, name):
+		return sorted(s.nodes[i].name for i in s.successors(s.get_id(name)))
+
+	def testSnapshot(self):
+		s = self.g.snapshot(get_weight=lambda e: e.weight)
+		self.failUnlessEqual((s.order, s.size), (3, 3))
+		self.failUnlessEqual(self.successors(s, "a"), ["b"])
+		self.failUnlessEqual(self.successors(s, "b"), ["c"])
+		self.failUnlessEqual(self.successors(s, "c"), ["b", "c"])
+		a = s.get_id("a")
+		self.failUnlessEqual(s.edges[s.edge_ids[s.offsets[a]]], self.g["ab"])
+		self.failUnlessEqual(s.weights[s.offsets[a]], 2)
+		self.failUnlessRaises(KeyError, s.get_id, "d")
+
+	def testTranspose(self):
+		s = self.g.snapshot().transpose()
+		self.failUnlessEqual(self.successors(s, "a"), [])
+		self.failUnlessEqual(self.successors(s, "b"), ["a", "c"])
+		self.failUnlessEqual(self.successors(s, "c"), ["b", "c"])
+
+	def testUndirected(self):
+		s = self.g.snapshot(undirected=True)
+		self.failUnlessEqual(self.successors(s, "a"), ["b"])
+		self.failUnlessEqual(self.successors(s, "b"), ["a", "c"])
+
+
+class ObserverTest(BaseGraphTest):
+
+	class Recorder(GraphObserver):
+		def __init__(self):
+			self.events = []
+		def node_added(self, node):
+			self.events.append(("node_added", node.name))
+		def node_removed(self, node):
+			self.events.append(("node_removed", node.name))
+		def edge_added(self, edge):
+			self.events.append(("edge_added", edge.name))
+		def edge_removed(self, edge):
+			self.events.append(("edge_removed", edge.name))
+
+	class Veto(GraphObserver):
+		def edge_added(self, edge):
+			raise ValueError("no more edges")
+
+	def testNotification(self):
+		g = self.build_graph()
+		recorder = g.add_observer(self.Recorder())
+		g.add_edge("a", "b", "ab")
+		g.remove_node("a")
+		self.failUnlessEqual(recorder.events, [("node_added", "a"), ("node_added", "b"), ("edge_added", "ab"), ("edge_removed", "ab"), ("node_removed", "a")])
+		g.remove_observer(recorder)
+		g.add_node("c")
+		self.failUnlessEqual(len(recorder.events), 5)
+
+	def testVeto(self):
+		g = self.build_graph()
+		ab = g.add_edge("a", "b", "ab")
+		g.add_observer(self.Veto())
+		self.failUnlessRaises(ValueError, g.add_edge, "b", "a", "ba")
+		self.failIf("ba" in g)
+		self.failUnlessRaises(ValueError, g.move_edge, ab, start=g["b"], end=g["a"])
+		self.failUnlessEqual((ab.start, ab.end), (g["a"], g["b"]))
+		self.failUnlessEqual(g["a"].outgoing, [ab])
+
+	def testVetoRollsBack(self):
+		g = self.build_graph()
+		ab = g.add_edge("a", "b", "ab")
+		g.add_observer(self.Veto())
+		# endpoints made for a vetoed edge are removed again
+		self.failUnlessRaises(ValueError, g.add_edge, "x", "y", "xy")
+		self.failUnlessRaises(ValueError, g.add_edge, "a", "z", "az")
+		self.failUnlessEqual(sorted(n.name for n in g.nodes), ["a", "b"])
+		# and an edge it would have replaced is put back
+		self.failUnlessRaises(ValueError, g.add_edge, "b", "a", "ab")
+		self.failUnless(g["ab"] is ab)
+		self.failUnlessEqual(g["a"].outgoing, [ab])
+		self.failUnlessEqual(g["b"].incoming, [ab])
+
+	def testOverwriteIsNotVetoed(self):
+		g = self.build_graph()
+		g.add_edge("a", "b", "ab")
+		order = TopologicalOrder(g)
+		recorder = g.add_observer(self.Recorder())
+		# reversing the only edge can't make a cycle
+		g.add_edge("b", "a", "ab")
+		self.failUnlessEqual([n.name for n in order], ["b", "a"])
+		self.failUnlessEqual(recorder.events, [("edge_removed", "ab"), ("edge_added", "ab")])
+		self.failUnlessEqual(g.size, 1)
+
+	def testLaterVetoUndoesEarlierObservers(self):
+		class Picky(GraphObserver):
+			def node_added(self, node):
+				if node.name == "bad": raise ValueError("bad node")
+			def edge_added(self, edge):
+				if edge.name == "bad": raise ValueError("bad edge")
+		g = self.build_graph()
+		g.add_edge("a", "b")
+		g.add_edge("c", "d")
+		index = ReachabilityIndex(g)
+		recorder = g.add_observer(self.Recorder())
+		g.add_observer(Picky())
+		self.failUnlessRaises(ValueError, g.add_edge, "b", "c", "bad")
+		self.failIf("bad" in g)
+		self.failIf(index.can_reach("a", "d"))
+		self.failUnlessEqual(recorder.events, [("edge_added", "bad"), ("edge_removed", "bad")])
+		del recorder.events[:]
+		self.failUnlessRaises(ValueError, g.add_node, "bad")
+		self.failIf("bad" in g)
+		self.failUnlessEqual(recorder.events, [("node_added", "bad"), ("node_removed", "bad")])
+
+
+class ReachabilityIndexTest(BaseGraphTest):
+
+	def setUp(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b")
+		self.g.add_edge("b", "c")
+		self.g.add_edge("c", "b")
+		self.g.add_edge("c", "d")
+		self.g.add_edge("e", "d", is_directed=False)
+		self.g.add_node("f")
+
+	def check(self, index):
+		g = self.g
+		for a in g.nodes:
+			reachable = set(g.depth_first_traversal(a))
+			for b in g.nodes:
+				self.failUnlessEqual(index.can_reach(a, b), b in reachable)
+
+	def testQueries(self):
+		index = ReachabilityIndex(self.g)
+		self.failUnless(index.can_reach("a", "d"))
+		self.failUnless(index.can_reach("c", "b"))
+		self.failUnless(index.can_reach("d", "e"))
+		self.failIf(index.can_reach("d", "a"))
+		self.failIf(index.can_reach(self.g["f"], "a"))
+		self.failUnless(index.can_reach("f", "f"))
+		self.failUnlessRaises(KeyError, index.can_reach, "a", "z")
+		self.check(index)
+
+	def testIntervalLabels(self):
+		index = ReachabilityIndex(self.g)
+		index.BITSET_LIMIT = 0
+		index.rebuild()
+		self.check(index)
+		self.g.add_edge("f", "a")
+		self.check(index)
+
+	def testUpdates(self):
+		index = ReachabilityIndex(self.g)
+		self.g.add_edge("d", "g")
+		self.failIf(index.stale)
+		self.check(index)
+		self.g.add_edge("d", "a")
+		self.failUnless(index.stale)
+		self.check(index)
+		self.g.remove_edge(("b", "c"))
+		self.check(index)
+		self.g.remove_node("e")
+		self.check(index)
+		index.detach()
+		self.g.add_edge("g", "f")
+		self.failIf(index.can_reach("g", "f"))
+
+
+class TopologicalOrderTest(BaseGraphTest):
+
+	def setUp(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b")
+		self.g.add_edge("a", "c")
+		self.g.add_edge("b", "d")
+		self.g.add_edge("c", "d")
+		self.g.add_node("e")
+		self.order = TopologicalOrder(self.g)
+
+	def check(self):
+		positions = {node: pos for pos, node in enumerate(self.order)}
+		self.failUnlessEqual(set(positions), set(self.g.nodes))
+		for edge in self.g.edges:
+			self.failUnless(positions[edge.start] < positions[edge.end])
+
+	def testInitialOrder(self):
+		self.check()
+		self.failUnlessEqual(len(self.order), 5)
+		self.failUnlessEqual(list(self.g.topological_traversal()), list(self.order))
+		g = self.build_graph()
+		g.add_edge("a", "b")
+		g.add_edge("b", "a")
+		self.failUnlessRaises(ValueError, TopologicalOrder, g)
+
+	def testInsertion(self):
+		self.g.add_edge("d", "e")
+		self.check()
+		self.g.add_edge("e", "f")
+		self.g.add_edge("g", "a")
+		self.check()
+		self.g.remove_node("b")
+		self.g.add_edge("g", "e")
+		self.check()
+
+	def testCycleDetection(self):
+		self.failUnlessRaises(ValueError, self.g.add_edge, "d", "a", "da")
+		self.failIf("da" in self.g)
+		self.failUnlessRaises(ValueError, self.g.add_edge, "e", "e")
+		self.failUnlessRaises(ValueError, self.g.add_edge, "d", "e", is_directed=False)
+		try:
+			self.g.add_edge("d", "a")
+		except ValueError as error:
+			self.failUnless("d -> a -> " in str(error))
+		self.check()
+
+	def testRemovalAndTranspose(self):
+		self.g.remove_edge(("a", "b"))
+		self.g.add_edge("b", "a")
+		self.check()
+		self.g.transpose()
+		self.check()
+		self.order.detach()
+		self.g.add_edge("d", "a")
+		self.failUnlessEqual(len(self.order), 5)
+
+
+class DominatorTest(BaseGraphTest):
+
+	def setUp(self):
+		# a loop inside an if-else
+		self.g = self.build_graph()
+		for start, end in [("entry", "if"), ("if", "then"), ("if", "else"), ("then", "join"), ("else", "join"),
+				   ("join", "loop"), ("loop", "body"), ("body", "loop"), ("loop", "exit")]:
+			self.g.add_edge(start, end)
+		self.g.add_node("dead")
+
+	def names(self, mapping):
+		return {k.name: v.name if isinstance(v, Node) else v and {n.name for n in v} for k, v in mapping.items()}
+
+	def testDominators(self):
+		expected = {"entry": None, "if": "entry", "then": "if", "else": "if", "join": "if", "loop": "join", "body": "loop", "exit": "loop"}
+		self.failUnlessEqual(self.names(self.g.get_dominators("entry")), expected)
+		self.failUnlessEqual(self.names(self.g.snapshot().get_dominators(self.g["entry"])), expected)
+		self.failUnlessRaises(KeyError, self.g.get_dominators, "nowhere")
+
+	def testPostDominators(self):
+		expected = {"exit": None, "loop": "exit", "body": "loop", "join": "loop", "then": "join", "else": "join", "if": "join", "entry": "if"}
+		self.failUnlessEqual(self.names(self.g.get_dominators("exit", reverse=True)), expected)
+
+	def testDominanceFrontiers(self):
+		frontiers = self.names(self.g.get_dominance_frontiers("entry"))
+		self.failUnlessEqual(frontiers["then"], {"join"})
+		self.failUnlessEqual(frontiers["else"], {"join"})
+		self.failUnlessEqual(frontiers["body"], {"loop"})
+		self.failUnlessEqual(frontiers["loop"], {"loop"})
+		self.failUnlessEqual(frontiers["if"], set())
+		self.failIf("dead" in frontiers)
+
+
+class BiconnectivityTest(BaseGraphTest):
+
+	def setUp(self):
+		# two triangles joined at c, a tail off e, and a doubled edge
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b")
+		self.g.add_edge("b", "c", is_directed=False)
+		self.g.add_edge("c", "a")
+		self.g.add_edge("c", "d")
+		self.g.add_edge("d", "e")
+		self.g.add_edge("e", "c")
+		self.g.add_edge("e", "f", "ef")
+		self.g.add_edge("f", "g", "fg1")
+		self.g.add_edge("g", "f", "fg2")
+		self.g.add_edge("g", "g", "gg")
+		self.g.add_node("h")
+
+	def testArticulationPoints(self):
+		self.failUnlessEqual({n.name for n in self.g.get_articulation_points()}, {"c", "e", "f"})
+		self.failUnlessEqual(self.build_graph().get_articulation_points(), set())
+
+	def testBridges(self):
+		self.failUnlessEqual({e.name for e in self.g.get_bridges()}, {"ef"})
+		self.g.remove_edge("fg2")
+		self.failUnlessEqual({e.name for e in self.g.get_bridges()}, {"ef", "fg1"})
+
+	def testBiconnectedComponents(self):
+		components = {frozenset(n.name for n in c) for c in self.g.get_biconnected_components()}
+		expected = {frozenset("abc"), frozenset("cde"), frozenset("ef"), frozenset("fg")}
+		self.failUnlessEqual(components, expected)
+
+
+class ClusteringTest(BaseGraphTest):
+
+	def setUp(self):
+		# a k4 with a triangle hanging off it, a tail, and some noise
+		self.g = self.build_graph()
+		for i in range(4):
+			for j in range(i + 1, 4):
+				self.g.add_edge(i, j, is_directed=(i + j) % 2 == 0)
+		self.g.add_edge(3, 4)
+		self.g.add_edge(4, 5)
+		self.g.add_edge(5, 3)
+		self.g.add_edge(5, 6)
+		self.g.add_edge(4, 3, "parallel")
+		self.g.add_edge(6, 6, "loop")
+		self.g.add_node(7)
+
+	def named(self, mapping):
+		return {n.name: v for n, v in mapping.items()}
+
+	def testTriangleCounts(self):
+		expected = {0: 3, 1: 3, 2: 3, 3: 4, 4: 1, 5: 1, 6: 0, 7: 0}
+		self.failUnlessEqual(self.named(self.g.get_triangle_counts()), expected)
+
+	def testClusteringCoefficients(self):
+		coefficients = self.named(self.g.get_clustering_coefficients())
+		self.failUnlessEqual(coefficients[0], 1.0)
+		self.failUnlessEqual(coefficients[3], 0.4)
+		self.failUnlessEqual(coefficients[5], 1.0 / 3)
+		self.failUnlessEqual(coefficients[6], 0.0)
+		self.failUnlessEqual(coefficients[7], 0.0)
+
+	def testCoreNumbers(self):
+		expected = {0: 3, 1: 3, 2: 3, 3: 3, 4: 2, 5: 2, 6: 1, 7: 0}
+		self.failUnlessEqual(self.named(self.g.get_core_numbers()), expected)
+		self.failUnlessEqual(self.build_graph().get_core_numbers(), {})
+
+
+class WalkerTest(BaseGraphTest):
+
+	def setUp(self):
+		# a directed triangle with an undirected spur
+		self.g = self.build_graph()
+		self.g.add_edge("A", "B", "AB")
+		self.g.add_edge("B", "C", "BC")
+		self.g.add_edge("C", "A", "CA")
+		self.g.add_edge("C", "D", "CD", is_directed=False)
+
+	def names(self, elements):
+		return [e.name for e in elements]
+
+	def testNodeWalk(self):
+		w = self.g.walk("A", lambda candidates: candidates[0])
+		self.failUnlessEqual(self.names(w.take(4)), ["B", "C", "A", "B"])
+		self.failUnlessEqual(w.position.name, "B")
+		self.failUnlessEqual(self.names(next(w) for i in range(2)), ["C", "A"])
+
+	def testPathWalk(self):
+		w = self.g.walk("B", lambda candidates: candidates[-1], edges=True)
+		self.failUnlessEqual(self.names(w.take(3)), ["BC", "CD", "CD"])
+		self.failUnlessEqual(w.position.name, "C")
+
+	def testEdgeWalk(self):
+		w = self.g.walk("AB", lambda candidates: candidates[0])
+		self.failUnlessEqual(self.names(w.take(2)), ["BC", "CA"])
+
+	def testReverseWalk(self):
+		w = self.g.walk("A", lambda candidates: candidates[0], reverse=True)
+		self.failUnlessEqual(self.names(w.take(3)), ["C", "B", "A"])
+
+	def testReverseEdgeWalk(self):
+		directed = lambda candidates: [e for e in candidates if e.is_directed][0]
+		w = self.g.walk("C", directed, edges=True, reverse=True)
+		self.failUnlessEqual(self.names(w.take(3)), ["BC", "AB", "CA"])
+		self.failUnlessEqual(w.position.name, "C")
+		# an undirected edge can be walked back either way
+		w.move(self.g["CD"])
+		self.failUnlessEqual(w.position.name, "D")
+		w.move(self.g["CD"])
+		self.failUnlessEqual(w.position.name, "C")
+		w = self.g.walk("CA", directed, reverse=True)
+		self.failUnlessEqual(self.names(w.take(2)), ["BC", "AB"])
+		w = self.g.walk_path("C", reverse=True)
+		candidates = next(w)
+		self.failUnlessEqual(sorted(self.names(candidates)), ["BC", "CD"])
+		w.send(self.g["BC"])
+		self.failUnlessEqual(self.names(next(w)), ["AB"])
+
+	def testSelectorEndsWalk(self):
+		choices = iter([self.g["B"], self.g["C"], None])
+		w = self.g.walk("A", lambda candidates: next(choices))
+		self.failUnlessEqual(self.names(w), ["B", "C"])
+		self.failUnlessEqual(w.position.name, "C")
+		w = self.g.walk("A", lambda candidates: None)
+		self.failUnlessEqual(w.take(5), [])
+
+	def testDeadEnd(self):
+		self.g.add_edge("D", "E")
+		w = self.g.walk("C", lambda candidates: candidates[-1])
+		self.failUnlessEqual(self.names(w.take(2)), ["D", "C"])
+		w = self.g.walk("D", lambda candidates: candidates[0])
+		self.failUnlessEqual(self.names(w.take(10)), ["E"])
+
+	def testAdjacencyView(self):
+		w = self.g.walk("C")
+		view = w.candidates
+		self.failUnlessEqual(len(view), 2)
+		self.failUnlessEqual(self.names(view), ["A", "D"])
+		self.failUnlessEqual(self.names(view[:]), ["A", "D"])
+		self.failUnless(self.g["D"] in view)
+		self.failIf(self.g["B"] in view)
+		# the view is live and follows the walker
+		w.move(self.g["D"])
+		self.failUnlessEqual(self.names(view), ["C"])
+		self.failUnlessRaises(IndexError, view.__getitem__, 1)
+
+	def testMissingStart(self):
+		self.failUnlessRaises(KeyError, self.g.walk, "Z")
+
+	def testOldProtocol(self):
+		w = self.g.walk_nodes("A")
+		visited = []
+		for candidates in w:
+			if len(visited) == 3: break
+			visited.append(candidates[0].name)
+			w.send(candidates[0])
+		self.failUnlessEqual(visited, ["B", "C", "A"])
+
+class TransitivityTest(BaseGraphTest):
+
+	def setUp(self):
+		# a diamond with shortcuts, a doubled edge, and a loose node
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab", cost=1)
+		self.g.add_edge("a", "c", "ac")
+		self.g.add_edge("b", "d", "bd")
+		self.g.add_edge("c", "d", "cd")
+		self.g.add_edge("a", "d", "ad")
+		self.g.add_edge("d", "e", "de1")
+		self.g.add_edge("d", "e", "de2")
+		self.g.add_edge("b", "e", "be")
+		self.g.add_node("f")
+
+	def pairs(self, view):
+		return {(start.name, end.name) for start, end in view}
+
+	def testClosureView(self):
+		closure = self.g.transitive_closure(view=True)
+		expected = {("a", x) for x in "bcde"} | {("b", "d"), ("b", "e"), ("c", "d"), ("c", "e"), ("d", "e")}
+		self.failUnlessEqual(self.pairs(closure), expected)
+		self.failUnlessEqual(len(closure), len(expected))
+		self.failUnless(("a", "e") in closure)
+		self.failUnless((self.g["c"], self.g["e"]) in closure)
+		self.failIf(("e", "a") in closure)
+		self.failIf(("a", "z") in closure)
+		self.failIf("a" in closure)
+		self.failUnlessEqual({n.name for n in closure.get_ends("c")}, {"d", "e"})
+
+	def testClosureGraph(self):
+		closure = self.g.transitive_closure()
+		self.failUnlessEqual(closure.order, 6)
+		self.failUnlessEqual(closure.size, 9)
+		# existing edges are copied with their data
+		self.failUnlessEqual(closure["ab"].cost, 1)
+		self.failUnless(closure["f"])
+		self.failUnlessEqual(self.g.size, 8)
+
+	def testReduction(self):
+		reduction = self.g.transitive_reduction(view=True)
+		expected = {("a", "b"), ("a", "c"), ("b", "d"), ("c", "d"), ("d", "e")}
+		self.failUnlessEqual(self.pairs(reduction), expected)
+		g = self.g.transitive_reduction()
+		self.failUnlessEqual({e.name for e in g.edges}, {"ab", "ac", "bd", "cd", "de1"})
+		self.failUnlessEqual(g["ab"].cost, 1)
+		# and the reduction has the same closure
+		self.failUnlessEqual(self.pairs(g.transitive_closure(view=True)), self.pairs(self.g.transitive_closure(view=True)))
+
+	def testCycles(self):
+		self.g.add_edge("e", "a")
+		self.failUnlessRaises(ValueError, self.g.transitive_closure)
+		self.failUnlessRaises(ValueError, self.g.transitive_reduction, True)
+		g = self.build_graph()
+		g.add_edge("a", "b", is_directed=False)
+		self.failUnlessRaises(ValueError, g.transitive_closure)
+
+class EulerianTest(BaseGraphTest):
+
+	def follow(self, start, edges):
+		# walks the route, crossing undirected edges either way
+		position = self.g[start]
+		for edge in edges:
+			if edge.start is position:
+				position = edge.end
+			else:
+				self.failIf(edge.is_directed)
+				self.failUnless(edge.end is position)
+				position = edge.start
+		return position.name
+
+	def testDirectedCircuit(self):
+		self.g = self.build_graph()
+		for start, end in ["ab", "bc", "ca", "cd", "de", "ec", "aa"]:
+			self.g.add_edge(start, end, start + end)
+		route = list(self.g.eulerian_circuit("c"))
+		self.failUnlessEqual(len(route), 7)
+		self.failUnlessEqual(len(set(route)), 7)
+		self.failUnlessEqual(route[0].start.name, "c")
+		self.failUnlessEqual(self.follow("c", route), "c")
+
+	def testMixedCircuit(self):
+		# only works if the undirected edges go d->a and b->d
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab")
+		self.g.add_edge("a", "d", "ad", is_directed=False)
+		self.g.add_edge("b", "d", "bd", is_directed=False)
+		self.g.add_edge("b", "c", "bc", is_directed=False)
+		self.g.add_edge("c", "b", "cb")
+		route = list(self.g.eulerian_circuit("a"))
+		self.failUnlessEqual(len(route), 5)
+		self.failUnlessEqual(self.follow("a", route), "a")
+
+	def testParallelPath(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab1", is_directed=False)
+		self.g.add_edge("a", "b", "ab2", is_directed=False)
+		self.g.add_edge("a", "b", "ab3", is_directed=False)
+		self.g.add_edge("b", "c", "bc")
+		route = list(self.g.eulerian_path())
+		self.failUnlessEqual(len(route), 4)
+		self.failUnlessEqual(self.follow("a", route), "c")
+		self.failUnlessRaises(ValueError, self.g.eulerian_circuit)
+
+	def testDirectedPath(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab")
+		self.g.add_edge("b", "c", "bc")
+		self.g.add_edge("c", "a", "ca")
+		self.g.add_edge("b", "d", "bd")
+		route = list(self.g.eulerian_path())
+		self.failUnlessEqual(self.follow("b", route), "d")
+		# the wrong way round, there is no route
+		self.g.remove_edge("bd")
+		self.g.add_edge("d", "b", "db")
+		self.g.add_edge("e", "b", "eb")
+		self.failUnlessRaises(ValueError, self.g.eulerian_path)
+
+	def testFailures(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b", "ab")
+		self.g.add_edge("b", "a", "ba")
+		self.g.add_edge("c", "d", "cd")
+		self.g.add_edge("d", "c", "dc")
+		self.failUnlessRaises(ValueError, self.g.eulerian_circuit)
+		self.g.remove_node("c")
+		self.g.remove_node("d")
+		self.g.add_node("e")
+		self.failUnlessEqual(len(list(self.g.eulerian_circuit("b"))), 2)
+		self.failUnlessRaises(ValueError, self.g.eulerian_circuit, "e")
+		self.failUnlessRaises(KeyError, self.g.eulerian_circuit, "z")
+		self.failUnlessEqual(list(self.build_graph().eulerian_circuit()), [])
+
+class CacheTest(BaseGraphTest):
+
+	def build(self):
+		self.g = self.build_graph()
+		for start, end in ["ab", "bc", "ca", "cd"]:
+			self.g.add_edge(start, end, start + end)
+		return self.g.enable_cache(maxsize=2)
+
+	def testDisabledByDefault(self):
+		self.g = self.build_graph()
+		self.g.add_edge("a", "b")
+		self.failUnlessEqual(self.g.cache_info(), None)
+		components = self.g.get_connected_components()
+		self.failIf(components is self.g.get_connected_components())
+		components[0].add("z")
+
+	def testHitsAndMisses(self):
+		self.build()
+		components = self.g.get_connected_components()
+		self.failUnless(components is self.g.get_connected_components())
+		self.failUnlessEqual(self.g.cache_info(), (1, 1, 2, 1))
+		get_weight = lambda e: 1
+		paths = self.g.get_shortest_paths("a", get_weight)
+		self.failUnless(paths is self.g.get_shortest_paths("a", get_weight))
+		self.failIf(paths is self.g.get_shortest_paths("b", get_weight))
+		self.failUnlessEqual(self.g.cache_info(), (2, 3, 2, 2))
+		# the results of generators are replayed
+		self.g.remove_edge("ca")
+		order = list(self.g.topological_traversal())
+		self.failUnlessEqual(order, list(self.g.topological_traversal()))
+		self.failUnlessEqual(self.g.cache_info().hits, 3)
+
+	def testInvalidation(self):
+		self.build()
+		version = self.g.version
+		self.failUnlessEqual(len(self.g.get_connected_components()), 1)
+		self.g.add_node("e")
+		self.failUnless(self.g.version > version)
+		self.failUnlessEqual(len(self.g.get_connected_components()), 2)
+		self.g.add_edge("d", "e", "de")
+		self.failUnlessEqual(len(self.g.get_connected_components()), 1)
+		self.g.remove_edge("de")
+		self.failUnlessEqual(len(self.g.get_connected_components()), 2)
+		self.g.remove_node("e")
+		self.failUnlessEqual(len(self.g.get_connected_components()), 1)
+		self.failUnlessEqual(self.g.cache_info().hits, 0)
+		self.g.remove_edge("ca")
+		self.failUnlessEqual([n.name for n in self.g.topological_traversal()], ["a", "b", "c", "d"])
+		self.g.transpose()
+		self.failUnlessEqual([n.name for n in self.g.topological_traversal()], ["d", "c", "b", "a"])
+		self.failUnlessEqual(self.g.cache_info().hits, 0)
+
+	def testEviction(self):
+		self.build()
+		self.g.get_shortest_paths("a")
+		self.g.get_shortest_paths("b")
+		self.g.get_shortest_paths("a")
+		self.g.get_shortest_paths("c")
+		self.failUnlessEqual(self.g.cache_info().currsize, 2)
+		# b was least recently used
+		self.g.get_shortest_paths("a")
+		self.g.get_shortest_paths("b")
+		self.failUnlessEqual(self.g.cache_info(), (2, 4, 2, 2))
+
+	def testImmutability(self):
+		self.build()
+		components = self.g.get_connected_components()
+		self.failUnless(isinstance(components, tuple))
+		self.failUnless(isinstance(components[0], frozenset))
+		paths = self.g.get_shortest_paths("a")
+		self.failUnlessRaises(TypeError, operator.setitem, paths, self.g["a"], None)
+		self.failUnlessRaises(TypeError, paths[self.g["c"]].add_node, "z")
+		paths = self.g.get_shortest_paths("a", pretty=False)
+		self.failUnless(isinstance(paths[self.g["c"]][1], tuple))
+		counts = self.g.get_triangle_counts()
+		self.failUnlessRaises(AttributeError, getattr, counts, "pop")
+		span = self.g.minimum_span()
+		self.failUnlessRaises(TypeError, span.add_node, "z")
+		self.failUnlessRaises(TypeError, span.remove_node, "a")
+		self.failUnlessRaises(TypeError, span.transpose)
+		self.failUnlessEqual(len(list(span.nodes)), 4)
+
+	def testStronglyConnectedIsReadOnly(self):
+		self.build()
+		components = self.g.get_connected_components()
+		version = self.g.version
+		strong = self.g.get_strongly_connected()
+		self.failUnlessEqual({frozenset(n.name for n in c) for c in strong}, {frozenset("abc"), frozenset("d")})
+		self.failUnlessEqual(self.g.version, version)
+		self.failUnless(components is self.g.get_connected_components())
+		self.failUnless(strong is self.g.get_strongly_connected())
+		# guarded results can be queried too
+		self.g.remove_edge("ca")
+		closure = self.g.transitive_closure()
+		self.failUnlessEqual(len(closure.get_strongly_connected()), 4)
+
+	def testArgumentsShareKeys(self):
+		self.build()
+		paths = self.g.get_shortest_paths("a")
+		self.failUnless(paths is self.g.get_shortest_paths(source="a"))
+		self.failUnless(paths is self.g.get_shortest_paths("a", pretty=True))
+		self.failUnlessEqual(self.g.cache_info().hits, 2)
+		self.failUnlessRaises(TypeError, self.g.get_shortest_paths, "a", nonsense=1)
+
+	def testConfiguration(self):
+		self.failUnlessRaises(ValueError, self.build_graph().enable_cache, 0)
+		self.build()
+		self.g.get_shortest_paths("a", pretty=True)
+		self.g.get_shortest_paths("a", pretty=True)
+		self.failUnlessEqual(self.g.cache_info().hits, 1)
+		self.g.disable_cache()
+		self.failUnlessEqual(self.g.cache_info(), None)
+
+class FlowTest(BaseGraphTest):
+
+	def build(self, directed, undirected):
+		g = self.build_graph()
+		for i in range(6):
+			g.add_node(i)
+		for start, end, capacity in directed:
+			g.add_edge(start, end, capacity=capacity, name=len(list(g.edges)))
+		for start, end, capacity in undirected:
+			g.add_edge(start, end, capacity=capacity, name=len(list(g.edges)), is_directed=False)
+		return g
+
+	def check(self, g):
+		expected = maximum_flow(g, 0, 5, method="dinic").value
+		result = maximum_flow(g, 0, 5, method="push-relabel")
+		self.failUnlessAlmostEqual(result.value, expected)
+		near, far = result.partition
+		cut = 0
+		for edge in g.edges:
+			if edge.start in near and edge.end in far:
+				cut += edge.capacity
+			elif not edge.is_directed and edge.end in near and edge.start in far:
+				cut += edge.capacity
+		self.failUnlessAlmostEqual(cut, expected)
+
+	def testFloatCapacities(self):
+		# these used to crash and hang respectively
+		self.check(self.build([(3, 0, 0.9), (0, 2, 1.2), (4, 0, 1.1), (0, 2, 2.7), (0, 3, 3.5), (0, 1, 4.0), (3, 1, 0.7)], [(1, 1, 0.4), (3, 4, 1.2)]))
+		self.check(self.build([(0, 1, 0.9), (0, 4, 0.9), (5, 3, 2.5), (2, 3, 3.5)], [(5, 2, 3.5), (0, 5, 1.2), (3, 1, 0.1)]))
+		rng = random.Random(42)
+		for trial in range(300):
+			directed = [(rng.randrange(6), rng.randrange(6), round(rng.uniform(0, 4), 1)) for i in range(rng.randrange(10))]
+			undirected = [(rng.randrange(6), rng.randrange(6), round(rng.uniform(0, 4), 1)) for i in range(rng.randrange(5))]
+			self.check(self.build(directed, undirected))
+
+class MatchingTest(BaseGraphTest):
+
+	def build(self, rng, left, right, size):
+		g = self.build_graph()
+		for i in range(left):
+			g.add_node(("l", i), side=0)
+		for i in range(right):
+			g.add_node(("r", i), side=1)
+		for i in range(size):
+			u, v = ("l", rng.randrange(left)), ("r", rng.randrange(right))
+			# edges may point either way, and pairs may repeat
+			if rng.random() < 0.3: u, v = v, u
+			g.add_edge(u, v, i, cost=rng.randint(-5, 9), is_directed=rng.random() < 0.5)
+		return g
+
+	def brute_force(self, g, get_weight):
+		"""Returns the size and least cost of the largest matchings."""
+		edges = [e for e in g.edges]
+		best = (0, 0)
+		def extend(i, used, size, cost):
+			nonlocal best
+			if (size, -cost) > (best[0], -best[1]):
+				best = (size, cost)
+			for j in range(i, len(edges)):
+				e = edges[j]
+				if e.start not in used and e.end not in used:
+					extend(j + 1, used | {e.start, e.end}, size + 1, cost + get_weight(e))
+		extend(0, frozenset(), 0, 0)
+		return best
+
+	def check(self, g, matching):
+		used = set()
+		for node, edge in matching.items():
+			self.failUnlessEqual(node.name[0], "l")
+			self.failUnless(node in (edge.start, edge.end))
+			self.failIf(edge.start in used or edge.end in used)
+			used |= {edge.start, edge.end}
+
+	def testMatchesBruteForce(self):
+		rng = random.Random(11)
+		get_weight = lambda e: e.cost
+		left = lambda g: [n for n in g.nodes if n.side == 0]
+		# balanced and unbalanced sides, sparse and dense
+		for left_size, right_size, size in ((3, 3, 5), (4, 4, 9), (5, 2, 7), (2, 5, 7), (4, 3, 11)):
+			for trial in range(10):
+				g = self.build(rng, left_size, right_size, size)
+				expected_size, expected_cost = self.brute_force(g, get_weight)
+				for partition in (left(g), "side"):
+					matching = maximum_matching(g, partition)
+					self.check(g, matching)
+					self.failUnlessEqual(len(matching), expected_size)
+					cost, matching = minimum_cost_assignment(g, get_weight, partition)
+					self.check(g, matching)
+					self.failUnlessEqual(len(matching), expected_size)
+					self.failUnlessEqual(cost, expected_cost)
+					self.failUnlessEqual(cost, sum(get_weight(e) for e in matching.values()))
+
+	def testParallelEdges(self):
+		g = self.build_graph()
+		first = g.add_edge("a", "x", "first", cost=5)
+		cheap = g.add_edge("x", "a", "cheap", cost=-2, is_directed=False)
+		g.add_edge("b", "x", "bx", cost=1)
+		g.add_edge("b", "y", "by", cost=4)
+		self.failUnlessEqual(len(maximum_matching(g, ["a", "b"])), 2)
+		cost, matching = minimum_cost_assignment(g, lambda e: e.cost, ["a", "b"])
+		self.failUnlessEqual(cost, 2)
+		self.failUnless(matching[g["a"]] is cheap)
+		# only the cheapest of a parallel pair is ever picked
+		g.remove_edge("by")
+		cost, matching = minimum_cost_assignment(g, lambda e: e.cost, ["a", "b"])
+		self.failUnlessEqual((cost, len(matching)), (-2, 1))
+
+	def testPartitions(self):
+		g = self.build_graph()
+		g.add_edge("a", "x")
+		g.add_edge("b", "x")
+		g.add_edge("b", "y")
+		g.add_node("lonely")
+		# worked out by two-colouring
+		self.failUnlessEqual(len(maximum_matching(g)), 2)
+		self.failUnlessEqual(minimum_cost_assignment(g, lambda e: 1)[0], 2)
+		self.failUnlessRaises(ValueError, maximum_matching, g, ["a", "x"])
+		self.failUnlessRaises(ValueError, minimum_cost_assignment, g, lambda e: 1, ["a", "x"])
+		g.add_edge("x", "y")
+		self.failUnlessRaises(ValueError, maximum_matching, g)
+		self.failUnlessRaises(ValueError, minimum_cost_assignment, g, lambda e: 1)
+		self.failUnlessEqual(maximum_matching(self.build_graph()), {})
+
+class MatcherTest(BaseGraphTest):
+
+	def testParallelEdgesNeedTheirOwnMatch(self):
+		pattern = self.build_graph()
+		pattern.add_edge("x", "y", "p1", kind="ab")
+		pattern.add_edge("x", "y", "p2", kind="a")
+		g = self.build_graph()
+		g.add_edge(1, 2, "g1", kind="a")
+		g.add_edge(1, 2, "g2", kind="c")
+		fits = lambda e, f: f.kind in e.kind
+		# g1 could stand in for either pattern edge, but not both
+		self.failUnlessEqual(Matcher(pattern, g, edge_match=fits).count(), 0)
+		# p1 has to give way to p2 for g1 to cover both
+		g.add_edge(1, 2, "g3", kind="b")
+		self.failUnlessEqual(Matcher(pattern, g, edge_match=fits).count(), 1)
+
+class DeltaSteppingTest(PackageGraphTest):
+
+	def build(self):
+		g = self.build_graph()
+		g.add_edge("a", "b", "ab", weight=4)
+		g.add_edge("a", "c", "ac", weight=1)
+		g.add_edge("c", "b", "cb", weight=2)
+		g.add_edge("b", "d", "bd", weight=5)
+		g.add_edge("d", "c", "dc", weight=0.5)
+		g.add_edge("c", "e", "ce", weight=7.5, is_directed=False)
+		g.add_edge("e", "d", "ed", weight=1, is_directed=False)
+		g.add_edge("f", "a", "fa", weight=1)
+		g.add_node("g")
+		return g
+
+	def check(self, g, source, **kwargs):
+		get_weight = lambda e: e.weight
+		expected = {node.name: length for node, (length, path) in g.get_shortest_paths(source, get_weight=get_weight, pretty=False).items()}
+		result = delta_stepping(g, source, get_weight=get_weight, **kwargs)
+		snapshot = result.snapshot
+		for i, node in enumerate(snapshot.nodes):
+			distance = result.distances[i]
+			predecessor = result.predecessors[i]
+			if node.name not in expected:
+				self.failUnlessEqual(distance, float("inf"))
+				self.failUnlessEqual(predecessor, -1)
+				continue
+			self.failUnlessAlmostEqual(distance, expected[node.name])
+			if node.name == source:
+				self.failUnlessEqual(predecessor, -1)
+				continue
+			# the predecessor edge must end a shortest path here
+			edge = snapshot.edges[predecessor]
+			if edge.end is node:
+				start = edge.start
+			else:
+				self.failIf(edge.is_directed)
+				start = edge.end
+			self.failUnlessAlmostEqual(expected[start.name] + edge.weight, distance)
+
+	def testMatchesDijkstra(self):
+		g = self.build()
+		for source in "abcdefg":
+			for delta in (None, 0.25, 1, 3, 100):
+				self.check(g, source, delta=delta)
+
+	def testProcesses(self):
+		g = self.build()
+		self.check(g, "a", processes=2)
+		self.check(g, "e", delta=1, processes=2)
+		rng = random.Random(3)
+		g = self.build_graph()
+		for i in range(40):
+			g.add_node(i)
+		for i in range(150):
+			g.add_edge(rng.randrange(40), rng.randrange(40), i, weight=rng.randint(1, 9), is_directed=rng.random() < 0.8)
+		for processes in (1, 2):
+			for delta in (None, 2, 20):
+				self.check(g, 0, delta=delta, processes=processes)
+
+	def testUnweightedAndSnapshots(self):
+		g = self.build()
+		result = delta_stepping(g, "a")
+		snapshot = result.snapshot
+		self.failUnlessEqual(result.distances[snapshot.get_id("d")], 2)
+		self.failUnlessEqual(result.distances[snapshot.get_id("f")], float("inf"))
+		# snapshots keep their own weights
+		snapshot = g.snapshot(get_weight=lambda e: e.weight)
+		result = delta_stepping(snapshot, "a")
+		self.failUnless(result.snapshot is snapshot)
+		self.failUnlessEqual(result.distances[snapshot.get_id("d")], 8)
+
+	def testNegativeWeights(self):
+		g = self.build()
+		g.add_edge("a", "g", "ag", weight=-1)
+		self.failUnlessRaises(ValueError, delta_stepping, g, "a", get_weight=lambda e: e.weight)
+
+class RoutingTest(PackageGraphTest):
+
+	def build(self, seed):
+		rng = random.Random(seed)
+		g = self.build_graph()
+		for i in range(30):
+			g.add_node(i)
+		for i in range(70):
+			g.add_edge(rng.randrange(25), rng.randrange(25), i, weight=rng.randint(1, 9), is_directed=rng.random() < 0.7)
+		# 25 to 29 can reach the rest, but not the other way round
+		for i in range(25, 30):
+			g.add_edge(i, rng.randrange(25), ("in", i), weight=rng.randint(1, 9))
+		return g
+
+	def expected(self, g):
+		get_weight = lambda e: e.weight
+		return {start.name: {end.name: length for end, (length, path) in g.get_shortest_paths(start, get_weight=get_weight, pretty=False).items()} for start in g.nodes}
+
+	def check_names(self, g, start, end, d, names):
+		"""Checks that names is a path from start to end of length d."""
+		self.failUnlessEqual((names[0], names[-1]), (start, end))
+		length = 0
+		for u, w in zip(names, names[1:]):
+			weights = [e.weight for e in g[u].outgoing if e.other_end(g[u]) is g[w]]
+			self.failUnless(weights, msg="%s-%s is not an edge" % (u, w))
+			length += min(weights)
+		self.failUnlessEqual(length, d)
+
+
+class ContractionHierarchyTest(RoutingTest):
+
+	def setUp(self):
+		self.directory = tempfile.TemporaryDirectory()
+		self.path = os.path.join(self.directory.name, "hierarchy.ch")
+
+	def tearDown(self):
+		self.directory.cleanup()
+
+	def check(self, g, ch):
+		expected = self.expected(g)
+		for start in range(30):
+			for end in range(30):
+				d, names = ch.shortest_path(start, end)
+				if end not in expected[start]:
+					self.failUnlessEqual((d, names), (float("inf"), []))
+					continue
+				self.failUnlessEqual(d, expected[start][end])
+				self.failUnlessEqual(ch.distance(g[start], g[end]), d)
+				self.check_names(g, start, end, d, names)
+
+	def testMatchesDijkstra(self):
+		for seed in range(3):
+			g = self.build(seed)
+			self.check(g, ContractionHierarchy(g, get_weight=lambda e: e.weight))
+		g = self.build(3)
+		self.check(g, ContractionHierarchy(g, get_weight=lambda e: e.weight, processes=2))
+
+	def testSaveAndLoad(self):
+		g = self.build(4)
+		ContractionHierarchy(g, get_weight=lambda e: e.weight).save(self.path)
+		self.check(g, ContractionHierarchy.load(self.path))
+
+	def testCheckpoint(self):
+		g = self.build(5)
+		get_weight = lambda e: e.weight
+		# stop a build after its first round
+		state = _initial_state(g, get_weight)
+		state["fingerprint"] = _fingerprint(state)
+		with Workers((state["out"], state["into"], ContractionHierarchy.WITNESS_LIMIT), 1) as workers:
+			_contract_round(state, workers)
+		self.failUnless(state["remaining"])
+		_save_state(state, self.path)
+		# and resume it
+		self.check(g, ContractionHierarchy(g, get_weight=get_weight, checkpoint=self.path))
+		with open(self.path, "rb") as f:
+			self.failIf(pickle.load(f)["remaining"])
+		# a checkpoint is only good for the graph it was made from
+		self.failUnlessRaises(ValueError, ContractionHierarchy, g, checkpoint=self.path)
+		g.add_edge(0, 29, "extra", weight=1)
+		self.failUnlessRaises(ValueError, ContractionHierarchy, g, get_weight=get_weight, checkpoint=self.path)
+
+class DistanceOracleTest(RoutingTest):
+
+	def check(self, g, oracle):
+		expected = self.expected(g)
+		for start in range(30):
+			for end in range(30):
+				d, edges = oracle.shortest_path(start, end)
+				if end not in expected[start]:
+					self.failUnlessEqual((d, edges), (float("inf"), []))
+					self.failUnlessEqual(oracle.distance(start, end), float("inf"))
+					continue
+				self.failUnlessEqual(d, expected[start][end])
+				self.failUnlessEqual(oracle.distance(g[start], g[end]), d)
+				self.failUnless(oracle.lower_bound(start, end) <= d)
+				self.failUnlessEqual(sum(e.weight for e in edges), d)
+				names = [start]
+				for e in edges:
+					names.append(e.other_end(g[names[-1]]).name)
+				self.check_names(g, start, end, d, names)
+
+	def testMatchesDijkstra(self):
+		get_weight = lambda e: e.weight
+		for seed in range(3):
+			g = self.build(seed)
+			self.check(g, DistanceOracle(g, landmarks=4, get_weight=get_weight, seed=seed))
+		g = self.build(3)
+		self.check(g, DistanceOracle(g, landmarks=4, get_weight=get_weight, processes=2, seed=3))
+
+	def testLandmarks(self):
+		g = self.build(4)
+		get_weight = lambda e: e.weight
+		oracle = DistanceOracle(g, landmarks=[0, 7, 29], get_weight=get_weight)
+		self.failUnlessEqual([n.name for n in oracle.landmarks], [0, 7, 29])
+		self.check(g, oracle)
+		oracle = DistanceOracle(g, landmarks=[g[3]], get_weight=get_weight)
+		self.failUnlessEqual([n.name for n in oracle.landmarks], [3])
+		self.check(g, oracle)
+		# no landmarks is just Dijkstra's algorithm
+		self.check(g, DistanceOracle(g, landmarks=[], get_weight=get_weight))
+		# more than there are nodes means every node
+		self.failUnlessEqual(len(DistanceOracle(g, landmarks=100).landmarks), 30)
+		self.failUnlessRaises(KeyError, DistanceOracle, g, landmarks=["missing"])
+
+class RandomWalksTest(PackageGraphTest):
+
+	def build(self):
+		rng = random.Random(7)
+		g = self.build_graph()
+		for i in range(20):
+			g.add_node(i)
+		for i in range(60):
+			g.add_edge(rng.randrange(18), rng.randrange(18), i, weight=rng.choice([0, 1, 2, 5]), is_directed=rng.random() < 0.7)
+		# 18 has no way out, and 19's only way out weighs nothing
+		g.add_edge(0, 18, "to 18", weight=3)
+		g.add_edge(1, 19, "to 19", weight=3)
+		g.add_edge(19, 2, "from 19", weight=0)
+		return g
+
+	def check(self, snapshot, walks, starts, length, weighted=True):
+		steps = set()
+		for i in range(snapshot.order):
+			for j in range(snapshot.offsets[i], snapshot.offsets[i+1]):
+				if not weighted or snapshot.weights[j] > 0:
+					steps.add((i, snapshot.targets[j]))
+		self.failUnlessEqual(walks.paths.shape, (len(starts), length))
+		for start, row in zip(starts, walks.paths.tolist()):
+			self.failUnlessEqual(row[0], start)
+			end = row.index(-1) if -1 in row else length
+			self.failUnless(all(v == -1 for v in row[end:]))
+			for u, v in zip(row[:end], row[1:end]):
+				self.failUnless((u, v) in steps, msg="%s-%s is not an edge" % (u, v))
+			# walks only stop early at dead ends
+			if end < length:
+				self.failIf(any(u == row[end-1] for u, v in steps))
+
+	def testStepsFollowEdges(self):
+		g = self.build()
+		weight = lambda e: e.weight
+		snapshot = g.snapshot(get_weight=weight)
+		starts = list(range(20)) * 20
+		for p, q in ((1, 1), (0.5, 2), (4, 0.25)):
+			self.check(snapshot, random_walks(snapshot, starts, 12, p=p, q=q, seed=1), starts, 12)
+			self.check(snapshot, random_walks(g, starts, 12, p=p, q=q, weight=weight, seed=1), starts, 12)
+		unweighted = g.snapshot()
+		self.check(unweighted, random_walks(unweighted, starts, 12, seed=1), starts, 12, weighted=False)
+
+	def testDeadEnds(self):
+		g = self.build()
+		snapshot = g.snapshot(get_weight=lambda e: e.weight)
+		for name in (18, 19):
+			walks = random_walks(snapshot, [snapshot.get_id(name)] * 3, 4, seed=2)
+			self.failUnlessEqual(walks.paths[:, 1:].tolist(), [[-1] * 3] * 3)
+		# without weights 19 can be left
+		snapshot = g.snapshot()
+		walks = random_walks(snapshot, [snapshot.get_id(19)], 2, seed=2)
+		self.failUnlessEqual(walks.paths[0, 1], snapshot.get_id(2))
+
+	def testReproducible(self):
+		g = self.build()
+		snapshot = g.snapshot(get_weight=lambda e: e.weight)
+		# enough walks to be split between processes
+		starts = list(range(20)) * 500
+		for p, q in ((1, 1), (0.5, 2)):
+			walks = random_walks(snapshot, starts, 8, p=p, q=q, seed=3)
+			self.failUnless((walks.paths == random_walks(snapshot, starts, 8, p=p, q=q, seed=3).paths).all())
+			self.failUnless((walks.paths == random_walks(snapshot, starts, 8, p=p, q=q, seed=3, processes=2).paths).all())
+			self.failIf((walks.paths == random_walks(snapshot, starts, 8, p=p, q=q, seed=4).paths).all())
+
+	def testBadParameters(self):
+		g = self.build()
+		for p, q in ((0, 1), (1, 0), (-1, 1), (1, -0.5)):
+			self.failUnlessRaises(ValueError, random_walks, g, [0], 4, p=p, q=q)
+		self.failUnlessEqual(random_walks(g, [], 4).paths.shape, (0, 4))
+
+class CommunityTest(BaseGraphTest):
+
+	def build(self):
+		# two cliques of five joined by a single bridge
+		g = self.build_graph()
+		for side in "ab":
+			for i in range(5):
+				for j in range(i + 1, 5):
+					g.add_edge((side, i), (side, j), is_directed=False)
+		g.add_edge(("a", 0), ("b", 0), "bridge", is_directed=False)
+		return g
+
+	def expected_modularity(self, g, labels, weight=lambda e: 1, resolution=1.0):
+		"""Newman's modularity, straight from its definition."""
+		m = sum(weight(e) for e in g.edges)
+		inside = defaultdict(float)
+		degrees = defaultdict(float)
+		for e in g.edges:
+			a, b = labels[e.start.name], labels[e.end.name]
+			if a == b:
+				inside[a] += weight(e)
+			degrees[a] += weight(e)
+			degrees[b] += weight(e)
+		return sum(inside[c] / m - resolution * (degrees[c] / (2 * m)) ** 2 for c in degrees)
+
+	def testTwoCliques(self):
+		g = self.build()
+		for seed in range(5):
+			result = louvain(g, seed=seed)
+			labels = {n.name: result.labels[n] for n in g.nodes}
+			self.failUnlessEqual(len(set(labels.values())), 2)
+			for i in range(5):
+				self.failUnlessEqual(labels[("a", i)], labels[("a", 0)])
+				self.failUnlessEqual(labels[("b", i)], labels[("b", 0)])
+			self.failUnless(result.modularity > 0)
+			self.failUnlessAlmostEqual(result.modularity, self.expected_modularity(g, labels))
+			self.failUnlessAlmostEqual(modularity(g, labels), result.modularity)
+			self.failUnless(isinstance(result.graph, type(g)))
+			self.failUnlessEqual(result.graph.order, 2)
+		# the same seed gives the same communities
+		self.failUnlessEqual(louvain(g, seed=3).labels, louvain(g, seed=3).labels)
+
+	def testWeightsAndResolution(self):
+		g = self.build()
+		for i, e in enumerate(sorted(g.edges, key=lambda e: repr(e.name))):
+			e.weight = i % 4 + 1
+		weight = lambda e: e.weight
+		for resolution in (0.5, 1.0, 2.0):
+			result = louvain(g, weight=weight, resolution=resolution, seed=1)
+			labels = {n.name: result.labels[n] for n in g.nodes}
+			self.failUnlessAlmostEqual(result.modularity, self.expected_modularity(g, labels, weight, resolution))
+			self.failUnlessAlmostEqual(modularity(g, labels, weight, resolution), result.modularity)
+		# everything in one community scores nothing
+		labels = {n.name: 0 for n in g.nodes}
+		self.failUnlessAlmostEqual(modularity(g, labels), 0)
+		self.failUnlessAlmostEqual(modularity(g, labels, weight), 0)
+
+	def testAggregate(self):
+		g = self.build()
+		g.add_edge(("a", 1), ("a", 1), "loop", is_directed=False)
+		g.add_edge(("b", 2), ("a", 3), "back")
+		labels = {n.name: n.name[0] for n in g.nodes}
+		h = aggregate(g, labels)
+		self.failUnless(isinstance(h, type(g)))
+		self.failUnlessEqual(sorted(n.name for n in h.nodes), ["a", "b"])
+		self.failUnlessEqual(h[("a", "a")].weight, 11)
+		self.failUnlessEqual(h[("b", "b")].weight, 10)
+		self.failUnlessEqual(h[frozenset("ab")].weight, 2)
+		self.failUnlessEqual(h.size, 3)
+		self.failIf(any(e.is_directed for e in h.edges))
+		# weights are added up, and nodes can be given by name or node
+		h = aggregate(g, {n: n.name[0] for n in g.nodes}, weight=lambda e: 0.5)
+		self.failUnlessEqual(h[frozenset("ab")].weight, 1)
+		self.failUnlessEqual(h[("a", "a")].weight, 5.5)
+
+class BetweennessTest(PackageGraphTest):
+
+	def build(self, seed):
+		rng = random.Random(seed)
+		g = self.build_graph()
+		for i in range(7):
+			g.add_node(i)
+		for i in range(14):
+			g.add_edge(rng.randrange(7), rng.randrange(7), i, weight=rng.randint(1, 3), is_directed=rng.random() < 0.6)
+		# a parallel edge, so some pairs have paths through both
+		e = next(e for e in g.edges if e.start is not e.end)
+		g.add_edge(e.start, e.end, "parallel", weight=e.weight, is_directed=e.is_directed)
+		return g
+
+	def brute_force(self, g, get_weight):
+		"""Counts the shortest paths through each node by listing every path."""
+		scores = {n: 0.0 for n in g.nodes}
+		for s in g.nodes:
+			paths = defaultdict(list)
+			def extend(node, visited, length):
+				paths[node].append((length, visited))
+				for e in node.outgoing:
+					other = e.other_end(node)
+					if other not in visited:
+						extend(other, visited + [other], length + get_weight(e))
+			extend(s, [s], 0)
+			for t, found in paths.items():
+				if t is s: continue
+				best = min(length for length, path in found)
+				shortest = [path for length, path in found if length == best]
+				for path in shortest:
+					for v in path[1:-1]:
+						scores[v] += 1.0 / len(shortest)
+		return scores
+
+	def check(self, g, get_weight, **kwargs):
+		expected = self.brute_force(g, get_weight or (lambda e: 1))
+		scores = betweenness_centrality(g, get_weight=get_weight, normalized=False, **kwargs)
+		self.failUnlessEqual(set(scores), set(g.nodes))
+		for node, score in scores.items():
+			self.failUnlessAlmostEqual(score, expected[node])
+		scores = betweenness_centrality(g, get_weight=get_weight, **kwargs)
+		for node, score in scores.items():
+			self.failUnlessAlmostEqual(score, expected[node] / 30)
+
+	def testMatchesBruteForce(self):
+		for seed in range(6):
+			g = self.build(seed)
+			self.check(g, None)
+			self.check(g, lambda e: e.weight)
+			snapshot = g.snapshot(get_weight=lambda e: e.weight)
+			self.failUnlessEqual(betweenness_centrality(snapshot), betweenness_centrality(g, get_weight=lambda e: e.weight))
+
+	def testProcesses(self):
+		g = self.build(6)
+		get_weight = lambda e: e.weight
+		self.check(g, get_weight, processes=2)
+		one = betweenness_centrality(g, get_weight=get_weight)
+		two = betweenness_centrality(g, get_weight=get_weight, processes=2)
+		for node in g.nodes:
+			self.failUnlessAlmostEqual(one[node], two[node])
+
+	def testSampling(self):
+		g = self.build(7)
+		first = betweenness_centrality(g, k=3, seed=5)
+		self.failUnlessEqual(first, betweenness_centrality(g, k=3, seed=5))
+		for node in g.nodes:
+			self.failUnlessAlmostEqual(first[node], betweenness_centrality(g, k=3, seed=5, processes=2)[node])
+		# asking for every node is the exact answer
+		self.failUnlessEqual(betweenness_centrality(g, k=7, seed=5), betweenness_centrality(g))
+
+
+class ParallelTest(PackageGraphTest):
+
+	def testChunk(self):
+		self.failUnlessEqual(chunk(range(7), 3), [[0, 1, 2], [3, 4], [5, 6]])
+		self.failUnlessEqual(chunk(range(2), 4), [[0], [1]])
+		self.failUnlessEqual(chunk([], 4), [])
+		self.failUnlessEqual(chunk(range(3), 0), [[0, 1, 2]])
+
+	def testSharedSnapshot(self):
+		g = self.build_graph()
+		g.add_edge("a", "b", weight=2)
+		g.add_edge("b", "c", weight=0.5, is_directed=False)
+		snapshot = g.snapshot(get_weight=lambda e: e.weight)
+		with SharedSnapshot(snapshot) as shared:
+			self.failUnlessEqual(shared.order, snapshot.order)
+			self.failUnlessEqual(shared.successor_lists(), snapshot.successor_lists())
+			self.failUnlessEqual(list(shared.weights), list(snapshot.weights))
+			# workers see the same arrays
+			self.failUnlessEqual(run(getattr, ["order"] * 4, shared, processes=2), [3] * 4)
+			self.failUnlessEqual(run(operator.getitem, [0, 1], shared.successor_lists(), processes=2), snapshot.successor_lists()[:2])
+		with SharedSnapshot(g.snapshot()) as shared:
+			self.failUnless(shared.weights is None)
+
+	def testWorkers(self):
+		for processes in (1, 2):
+			with Workers([], processes) as workers:
+				self.failUnlessEqual(workers.processes, processes)
+				# every worker gets each broadcast exactly once
+				workers.broadcast(list.append, "x")
+				workers.broadcast(list.append, "y")
+				self.failUnlessEqual(workers.map(operator.countOf, ["x", "y"] * 4), [1] * 8)
+				self.failUnlessEqual(workers.map(operator.getitem, [0, 1]), ["x", "y"])
+
+class PageRankTest(PackageGraphTest):
+
+	def build(self, seed, directed=0.7):
+		rng = random.Random(seed)
+		g = self.build_graph()
+		for i in range(12):
+			g.add_node(i)
+		for i in range(30):
+			g.add_edge(rng.randrange(10), rng.randrange(10), i, weight=rng.randint(1, 4), is_directed=rng.random() < directed)
+		# 10 is dangling, and only 11 leads to it
+		g.add_edge(11, 10, "dangle", weight=1)
+		g.add_edge(0, 11, "to 11", weight=1)
+		return g
+
+	def power_iteration(self, g, alpha=0.85, personalization=None, weight=lambda e: 1):
+		"""PageRank by iterating the dense Google matrix."""
+		nodes = sorted(g.nodes, key=lambda n: n.name)
+		index = {node: i for i, node in enumerate(nodes)}
+		n = len(nodes)
+		if personalization is None:
+			teleport = numpy.full(n, 1.0 / n)
+		else:
+			teleport = numpy.zeros(n)
+			for name, value in personalization.items():
+				teleport[index[g[name]]] = value
+			teleport /= teleport.sum()
+		links = numpy.zeros((n, n))
+		for e in g.edges:
+			links[index[e.start], index[e.end]] += weight(e)
+			if not e.is_directed and e.start is not e.end:
+				links[index[e.end], index[e.start]] += weight(e)
+		google = numpy.zeros((n, n))
+		for i in range(n):
+			total = links[i].sum()
+			google[i] = links[i] / total if total else teleport
+		google = alpha * google + (1 - alpha) * teleport
+		scores = teleport.copy()
+		for i in range(1000):
+			scores = scores @ google
+		return {node: scores[index[node]] for node in nodes}
+
+	def testPowerIteration(self):
+		for seed in range(3):
+			g = self.build(seed)
+			weight = lambda e: e.weight
+			for kwargs in ({}, {"weight": weight}, {"alpha": 0.5}, {"personalization": {3: 1, 10: 3}}):
+				result = pagerank(g, tol=1e-12, max_iter=1000, **kwargs)
+				self.failUnless(result.residual < 1e-12)
+				self.failUnlessAlmostEqual(sum(result.scores.values()), 1)
+				expected = self.power_iteration(g, **kwargs)
+				for node, score in result.scores.items():
+					self.failUnlessAlmostEqual(score, expected[node])
+				# unmentioned nodes get no teleports, but can still be reached
+				if "personalization" in kwargs:
+					self.failUnless(result.scores[g[10]] > 0)
+
+	def testSnapshotsAndLimits(self):
+		g = self.build(3)
+		snapshot = g.snapshot(get_weight=lambda e: e.weight)
+		self.failUnlessEqual(pagerank(snapshot).scores, pagerank(g, weight=lambda e: e.weight).scores)
+		result = pagerank(g, tol=0, max_iter=5)
+		self.failUnlessEqual(result.iterations, 5)
+		self.failUnless(result.residual > 0)
+		self.failUnlessEqual(pagerank(self.build_graph()).scores, {})
+		self.failUnlessRaises(ValueError, pagerank, g, personalization={3: 0})
+
+	def check_push(self, g, seed, epsilon, weight=None, per_node=True):
+		scores = personalized_pagerank(g, seed, epsilon=epsilon, weight=weight)
+		exact = pagerank(g, tol=1e-14, max_iter=1000, personalization={seed: 1}, weight=weight).scores
+		total = 0
+		for node in g.nodes:
+			error = exact[node] - scores.get(node, 0.0)
+			degree = len(node.outgoing)
+			self.failUnless(error > -1e-9)
+			if per_node:
+				self.failUnless(error <= epsilon * max(degree, 1) + 1e-9, msg="%s is off by %s" % (node, error))
+			total += error
+		self.failUnless(total <= epsilon * sum(max(len(n.outgoing), 1) for n in g.nodes) + 1e-9)
+
+	def testPush(self):
+		for seed in range(3):
+			g = self.build(seed, directed=0)
+			for epsilon in (1e-2, 1e-4, 1e-8):
+				self.check_push(g, 0, epsilon)
+				self.check_push(g, 4, epsilon)
+			g = self.build(seed)
+			for epsilon in (1e-2, 1e-4, 1e-8):
+				self.check_push(g, 0, epsilon, per_node=False)
+				self.check_push(g, 11, epsilon, lambda e: e.weight, per_node=False)
+		# the seed itself can be dangling
+		g = self.build(4)
+		self.failUnlessAlmostEqual(personalized_pagerank(g, 10, epsilon=1e-12)[g[10]], 1)
+
+	def testCSR(self):
+		g = self.build_graph()
+		g.add_edge("a", "b", "ab", weight=2)
+		g.add_edge("a", "c", "ac", weight=3)
+		g.add_edge("c", "b", "cb", weight=4, is_directed=False)
+		g.add_node("d")
+		arrays = csr(g, get_weight=lambda e: e.weight)
+		snapshot = arrays.snapshot
+		self.failUnlessEqual(arrays.offsets.tolist(), list(snapshot.offsets))
+		self.failUnlessEqual(arrays.targets.tolist(), list(snapshot.targets))
+		self.failUnlessEqual(arrays.edge_ids.tolist(), list(snapshot.edge_ids))
+		self.failUnlessEqual(arrays.weights.tolist(), list(snapshot.weights))
+		entries = set()
+		for source, target, edge_id, weight in zip(arrays.sources, arrays.targets, arrays.edge_ids, arrays.weights):
+			edge = snapshot.edges[edge_id]
+			entries.add((snapshot.nodes[source].name, snapshot.nodes[target].name, edge.name))
+			self.failUnlessEqual(weight, edge.weight)
+		self.failUnlessEqual(entries, {("a", "b", "ab"), ("a", "c", "ac"), ("c", "b", "cb"), ("b", "c", "cb")})
+		# undirected snapshots follow every edge both ways
+		arrays = csr(g, undirected=True)
+		self.failUnless(arrays.weights is None)
+		self.failUnlessEqual(len(arrays.targets), 6)
+		self.failUnless(csr(snapshot).snapshot is snapshot)
+		empty = csr(self.build_graph())
+		self.failUnlessEqual((len(empty.offsets), len(empty.targets), len(empty.sources)), (1, 0, 0))
+
+class CliqueTest(BaseGraphTest):
+
+	def build(self, rng, order, density):
+		g = self.build_graph()
+		for i in range(order):
+			g.add_node(i)
+		for i in range(order):
+			for j in range(order):
+				if i != j and rng.random() < density / 2:
+					g.add_edge(i, j, is_directed=rng.random() < 0.5)
+		# loops don't make anything adjacent
+		g.add_edge(0, 0)
+		return g
+
+	def brute_force(self, g):
+		"""Lists every maximal clique by checking every set of nodes."""
+		names = sorted(n.name for n in g.nodes)
+		adjacent = {(e.start.name, e.end.name) for e in g.edges}
+		adjacent |= {(b, a) for a, b in adjacent}
+		cliques = []
+		for mask in range(1, 1 << len(names)):
+			members = [n for i, n in enumerate(names) if mask >> i & 1]
+			if all((a, b) in adjacent for a in members for b in members if a != b):
+				cliques.append(frozenset(members))
+		return {c for c in cliques if not any(c < d for d in cliques)}
+
+	def testMatchesBruteForce(self):
+		rng = random.Random(5)
+		for order, density in ((1, 0), (6, 0.3), (8, 0.5), (9, 0.8), (10, 1.0)):
+			for trial in range(4):
+				g = self.build(rng, order, density)
+				expected = self.brute_force(g)
+				largest = max(len(c) for c in expected)
+				for dense in (False, True):
+					for min_size in (1, 2, 3, largest, largest + 1):
+						found = [frozenset(n.name for n in c) for c in maximal_cliques(g, min_size, dense)]
+						self.failUnlessEqual(len(found), len(set(found)))
+						self.failUnlessEqual(set(found), {c for c in expected if len(c) >= min_size})
+				clique = {n.name for n in maximum_clique(g)}
+				self.failUnlessEqual(len(clique), largest)
+				self.failUnless(any(clique <= c for c in expected))
+
+	def testEmpty(self):
+		g = self.build_graph()
+		self.failUnlessEqual(list(maximal_cliques(g)), [])
+		self.failUnlessEqual(list(maximal_cliques(g, dense=True)), [])
+		self.failUnlessEqual(maximum_clique(g), [])
+
+class ColoringTest(BaseGraphTest):
+
+	STRATEGIES = ("largest_first", "smallest_last", "dsatur")
+
+	def check(self, g, colors):
+		self.failUnlessEqual(set(colors), set(g.nodes))
+		for e in g.edges:
+			if e.start is not e.end:
+				self.failIfEqual(colors[e.start], colors[e.end])
+		used = set(colors.values())
+		self.failUnlessEqual(used, set(range(len(used))))
+
+	def testProperColorings(self):
+		rng = random.Random(9)
+		for trial in range(20):
+			g = self.build_graph()
+			for i in range(15):
+				g.add_node(i)
+			for i in range(rng.randrange(40)):
+				g.add_edge(rng.randrange(15), rng.randrange(15), is_directed=rng.random() < 0.5)
+			for strategy in self.STRATEGIES:
+				self.check(g, greedy_color(g, strategy))
+
+	def testKnownGraphs(self):
+		# an odd cycle needs three colours, and an even one two
+		for length, needed in ((7, 3), (8, 2)):
+			g = self.build_graph()
+			for i in range(length):
+				g.add_edge(i, (i + 1) % length)
+			for strategy in self.STRATEGIES:
+				colors = greedy_color(g, strategy)
+				self.check(g, colors)
+				if strategy == "dsatur":
+					self.failUnlessEqual(len(set(colors.values())), needed)
+		# a complete graph needs one per node
+		g = self.build_graph()
+		for i in range(5):
+			for j in range(i):
+				g.add_edge(i, j)
+		for strategy in self.STRATEGIES:
+			self.failUnlessEqual(sorted(greedy_color(g, strategy).values()), list(range(5)))
+		self.failUnlessEqual(greedy_color(self.build_graph()), {})
+
+	def testAttribute(self):
+		g = self.build_graph()
+		g.add_edge("a", "b")
+		g.add_edge("b", "c")
+		g.add_node("d")
+		for strategy in self.STRATEGIES:
+			colors = greedy_color(g, strategy, attribute="color")
+			for node, color in colors.items():
+				self.failUnlessEqual(node.color, color)
+		self.failUnlessRaises(ValueError, greedy_color, g, "random")
+		self.failUnlessRaises(ValueError, greedy_color, g, strategy=None)
+
+class HyperANFTest(PackageGraphTest):
+
+	def path(self, length):
+		g = self.build_graph()
+		for i in range(length - 1):
+			g.add_edge(i, i + 1)
+		return g
+
+	def exact(self, g, undirected=False):
+		"""The neighbourhood function, by breadth first search from every node."""
+		snapshot = g.snapshot(undirected=undirected)
+		successors = snapshot.successor_lists()
+		within = defaultdict(int)
+		for s in range(snapshot.order):
+			distance = {s: 0}
+			frontier = [s]
+			while frontier:
+				nxt = []
+				for v in frontier:
+					for w in successors[v]:
+						if w not in distance:
+							distance[w] = distance[v] + 1
+							nxt.append(w)
+				frontier = nxt
+			for d in distance.values():
+				within[d] += 1
+		counts = []
+		total = 0
+		for h in range(max(within) + 1):
+			total += within[h]
+			counts.append(total)
+		return counts
+
+	def check(self, g, result, undirected=False):
+		expected = self.exact(g, undirected)
+		self.failUnlessEqual(len(result.counts), len(expected))
+		for count, exact in zip(result.counts, expected):
+			self.failUnless(abs(count - exact) <= 4 * result.relative_error * exact, msg="%s is too far from %s" % (count, exact))
+
+	def testPath(self):
+		g = self.path(30)
+		for seed in range(3):
+			result = hyperanf(g, registers=256, runs=8, seed=seed)
+			self.check(g, result)
+			self.failUnlessAlmostEqual(result.relative_error, 1.04 / (256 * 8) ** 0.5)
+			# pairs on a path of 30 are 31/3 apart on average
+			average = result.average_distance
+			self.failUnless(average.low <= average.value <= average.high)
+			self.failUnless(abs(average.value - 31.0 / 3) < 1)
+			diameter = result.effective_diameter
+			self.failUnless(diameter.low <= diameter.value <= diameter.high)
+			self.failUnless(diameter.value <= 29)
+		self.check(g, hyperanf(g, registers=256, runs=8, undirected=True, seed=1), True)
+
+	def testRandomGraph(self):
+		rng = random.Random(2)
+		g = self.build_graph()
+		for i in range(60):
+			g.add_node(i)
+		for i in range(120):
+			g.add_edge(rng.randrange(60), rng.randrange(60), is_directed=rng.random() < 0.8)
+		self.check(g, hyperanf(g, registers=128, runs=8, seed=3))
+
+	def testOptions(self):
+		g = self.path(30)
+		self.failUnlessEqual(len(hyperanf(g, max_distance=5, seed=1).counts), 6)
+		single = hyperanf(g, runs=1, seed=1)
+		self.failUnlessEqual(single.average_distance.low, single.average_distance.high)
+		self.failUnlessEqual(hyperanf(self.build_graph()).counts, [0.0])
+
+	def testReproducible(self):
+		g = self.path(30)
+		self.failUnlessEqual(hyperanf(g, seed=4), hyperanf(g, seed=4))
+		self.failIfEqual(hyperanf(g, seed=4).counts, hyperanf(g, seed=5).counts)
+
+	def testBadParameters(self):
+		g = self.path(5)
+		for registers in (0, 8, 48, 100):
+			self.failUnlessRaises(ValueError, hyperanf, g, registers=registers)
+		for runs in (0, -1):
+			self.failUnlessRaises(ValueError, hyperanf, g, runs=runs)
+
 #########################################################################################################################################
 #								SCENARIO TESTS								#
 #########################################################################################################################################
@@ -2737,6 +4409,17 @@ class GraphPerformanceTest(BaseGraphTest):
 		self.failUnless(t1 < 5, msg="Performance check failed: it took %s seconds to iterate through 1M edges" % t1)
 		self.failUnless(t2 < 5, msg="Performance check failed: it took %s seconds to iterate through 1M edges" % t2)
 
+	def testElementResolutionPerformance(self):
+		g = Graph()
+		for i in range(1000):
+			g.add_edge(i, i + 1, "edge%s" % i)
+		names = {"g": g, "node": g.get_node(500), "edge": g.get_edge("edge500")}
+		# sub-microsecond calls are too noisy to compare against each
+		# other here, so this only guards against gross regressions
+		for stmt in ["g.get_node(500)", "g.get_node(node)", "g.get_edge('edge500')", "g.get_edge(edge)", "g[500]", "g.get_element(node)"]:
+			t = timeit.timeit(stmt, globals=names, number=100000)
+			self.failUnless(t < 1, msg="Performance check failed: it took %s seconds to run %s 100k times" % (t, stmt))
+
 	def testTraversalPerformance(self):
 		setup = self.graph_setup + "\nfor i in range(1000): \n\tg.add_edge(n, n, first_name='a')"
 		test = "[i for i in g.depth_first_traversal(n)]"
@@ -2773,6 +4456,31 @@ if __name__ == "__main__":
 	RemovalTest = unittest.TestLoader().loadTestsFromTestCase(RemovalTest)
 	OverwriteTest = unittest.TestLoader().loadTestsFromTestCase(OverwriteTest)
 	EdgeUnpackTest = unittest.TestLoader().loadTestsFromTestCase(EdgeUnpackTest)
+	SnapshotTest = unittest.TestLoader().loadTestsFromTestCase(SnapshotTest)
+	ObserverTest = unittest.TestLoader().loadTestsFromTestCase(ObserverTest)
+	ReachabilityIndexTest = unittest.TestLoader().loadTestsFromTestCase(ReachabilityIndexTest)
+	TopologicalOrderTest = unittest.TestLoader().loadTestsFromTestCase(TopologicalOrderTest)
+	DominatorTest = unittest.TestLoader().loadTestsFromTestCase(DominatorTest)
+	BiconnectivityTest = unittest.TestLoader().loadTestsFromTestCase(BiconnectivityTest)
+	ClusteringTest = unittest.TestLoader().loadTestsFromTestCase(ClusteringTest)
+	WalkerTest = unittest.TestLoader().loadTestsFromTestCase(WalkerTest)
+	TransitivityTest = unittest.TestLoader().loadTestsFromTestCase(TransitivityTest)
+	EulerianTest = unittest.TestLoader().loadTestsFromTestCase(EulerianTest)
+	CacheTest = unittest.TestLoader().loadTestsFromTestCase(CacheTest)
+	FlowTest = unittest.TestLoader().loadTestsFromTestCase(FlowTest)
+	MatchingTest = unittest.TestLoader().loadTestsFromTestCase(MatchingTest)
+	MatcherTest = unittest.TestLoader().loadTestsFromTestCase(MatcherTest)
+	DeltaSteppingTest = unittest.TestLoader().loadTestsFromTestCase(DeltaSteppingTest)
+	ContractionHierarchyTest = unittest.TestLoader().loadTestsFromTestCase(ContractionHierarchyTest)
+	DistanceOracleTest = unittest.TestLoader().loadTestsFromTestCase(DistanceOracleTest)
+	RandomWalksTest = unittest.TestLoader().loadTestsFromTestCase(RandomWalksTest)
+	CommunityTest = unittest.TestLoader().loadTestsFromTestCase(CommunityTest)
+	BetweennessTest = unittest.TestLoader().loadTestsFromTestCase(BetweennessTest)
+	ParallelTest = unittest.TestLoader().loadTestsFromTestCase(ParallelTest)
+	PageRankTest = unittest.TestLoader().loadTestsFromTestCase(PageRankTest)
+	CliqueTest = unittest.TestLoader().loadTestsFromTestCase(CliqueTest)
+	ColoringTest = unittest.TestLoader().loadTestsFromTestCase(ColoringTest)
+	HyperANFTest = unittest.TestLoader().loadTestsFromTestCase(HyperANFTest)
 	suites = [GraphCorrectnessTest, GraphCreationTest, NodeCreationTest, EdgeCreationTest, GraphPropertiesTest, GraphSearchTest, EdgeMovementTest, GetElementsTest]
 	suites += [ZeroNodeTest, RemovalTest, OverwriteTest, TraversalTest, InductionTest, GraphFailureTest, AdjacencyTest]
 	suites += [OneNodeDirectedTest]
@@ -2782,5 +4490,6 @@ if __name__ == "__main__":
 	suites += [TwoNodeUnconnectedTest]
 	suites += [ThreeNodeCycleTest]
 	suites += [EdgeUnpackTest]
+	suites += [SnapshotTest, ObserverTest, ReachabilityIndexTest, TopologicalOrderTest, DominatorTest, BiconnectivityTest, ClusteringTest, WalkerTest, TransitivityTest, EulerianTest, CacheTest, FlowTest, MatchingTest, MatcherTest, DeltaSteppingTest, ContractionHierarchyTest, DistanceOracleTest, RandomWalksTest, CommunityTest, BetweennessTest, ParallelTest, PageRankTest, CliqueTest, ColoringTest, HyperANFTest]
 	CorrectnessTest = unittest.TestSuite(suites)
 	unittest.main()